@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+PRコレクターのベンチマークスクリプト
+
+偽GitHub APIサーバーに対して PRCollector.update_pr_data（一覧＋詳細）と get_pull_requests（一覧のみ）を
+PR数・遅延・ワーカー数の組み合わせごとに実行し、スループットやリクエストの所要時間をJSONに書き出します。
+各シナリオは別プロセスで実行するため、ピークRSSはシナリオごとの値になります。
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import itertools
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import json_codec
+from src.utils.fake_github import FakeGitHubRepository, FakeGitHubServer
+
+
+MODES = ("update", "list")
+OWNER = "bench-owner"
+REPO = "bench-repo"
+
+
+def _parse_list(value, convert=int):
+    """カンマ区切りの値をリストに変換する"""
+    return [convert(item) for item in value.split(",") if item.strip()]
+
+
+def _peak_rss_mb():
+    """このプロセスのピークRSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxではキロバイト、macOSではバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(api_base_url, mode, workers, rate_limit_reserve, rate_limit_burst):
+    """1つのシナリオを実行して計測結果を返す（子プロセスで呼ばれる）"""
+    from src.collectors.pr_collector import PRCollector
+    from src.utils.github_api import (
+        CredentialProvider,
+        configure_rate_limiter,
+        configure_response_cache,
+        configure_session_pool,
+        get_rate_limiter,
+        get_session_stats,
+        load_config,
+        set_credential_provider,
+    )
+    from src.utils.rate_limiter import RateLimitScheduler
+
+    config = load_config()
+    config["github"].update({"api_base_url": api_base_url, "repo_owner": OWNER, "repo_name": REPO})
+    config["collectors"].update({"max_workers": workers, "backend": "rest", "incremental": False})
+    credentials = CredentialProvider(config, token="benchmark-token")
+    set_credential_provider(credentials)
+
+    configure_response_cache(None)
+    configure_session_pool(pool_connections=10, pool_maxsize=max(20, workers))
+    configure_rate_limiter(RateLimitScheduler(reserve=rate_limit_reserve, burst=rate_limit_burst))
+
+    collector = PRCollector(config, credentials)
+    with tempfile.TemporaryDirectory() as output_dir:
+        started = time.perf_counter()
+        if mode == "update":
+            prs = collector.update_pr_data(output_dir=output_dir, keep_details=False)
+        else:
+            prs = collector.get_pull_requests()
+        elapsed = time.perf_counter() - started
+
+    session_stats = get_session_stats()
+    rate_stats = get_rate_limiter().get_stats()
+
+    def to_ms(seconds):
+        return seconds * 1000 if seconds is not None else None
+
+    return {
+        "collected_prs": len(prs),
+        "elapsed_seconds": elapsed,
+        "prs_per_second": len(prs) / elapsed if elapsed > 0 else 0.0,
+        "requests": session_stats["requests"],
+        "requests_per_pr": session_stats["requests"] / len(prs) if prs else None,
+        "new_connections": session_stats["new_connections"],
+        "latency_p50_ms": to_ms(session_stats["latency_p50_seconds"]),
+        "latency_p95_ms": to_ms(session_stats["latency_p95_seconds"]),
+        "latency_p99_ms": to_ms(session_stats["latency_p99_seconds"]),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rate_limit_wait_seconds": rate_stats["total_wait_seconds"],
+        "rate_limit_waits": rate_stats["wait_count"],
+        "pipeline": collector.last_pipeline_stats,
+    }
+
+
+def _git_commit():
+    """現在のコミットのハッシュ（取得できない場合はNone）"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent.parent,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="PRコレクターのベンチマークを実行します")
+    parser.add_argument("--sizes", default="100,1000", help="PR数（カンマ区切り、例: 100,1000,10000,50000）")
+    parser.add_argument("--latencies-ms", default="0,20", help="偽サーバーの遅延（ミリ秒、カンマ区切り）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="遅延に加えるゆらぎの最大値（ミリ秒）")
+    parser.add_argument("--workers", default="1,10", help="collectors.max_workers（カンマ区切り）")
+    parser.add_argument("--modes", default="update,list", help=f"計測する処理（{', '.join(MODES)}）")
+    parser.add_argument("--rate-limit", type=int, default=10000000,
+                        help="偽サーバーの1時間あたりのリクエスト数（5000で実際のGitHubと同じ）")
+    parser.add_argument("--secondary-limit", type=int, help="偽サーバーが1秒あたりに受け付けるリクエスト数")
+    parser.add_argument("--rate-limit-reserve", type=int, default=100, help="api.rate_limit_reserve")
+    parser.add_argument("--rate-limit-burst", type=int, default=100, help="api.rate_limit_burst")
+    parser.add_argument("--seed", type=int, default=0, help="合成データと遅延のゆらぎに使う乱数の種")
+    parser.add_argument("--output", default="benchmark_results.json", help="結果を書き出すJSONファイル")
+    return parser.parse_args()
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+    modes = _parse_list(args.modes, str)
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        print(f"未対応の処理です: {', '.join(sorted(unknown))}")
+        return 1
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in _parse_list(args.sizes):
+        repository = FakeGitHubRepository.synthetic(OWNER, REPO, pr_count=size, seed=args.seed)
+        for latency_ms, workers, mode in itertools.product(
+            _parse_list(args.latencies_ms, float), _parse_list(args.workers), modes
+        ):
+            scenario = {"mode": mode, "prs": size, "latency_ms": latency_ms, "jitter_ms": args.jitter_ms,
+                        "workers": workers}
+            print(f"実行中: {scenario}")
+
+            server = FakeGitHubServer(
+                repository,
+                latency=latency_ms / 1000,
+                jitter=args.jitter_ms / 1000,
+                rate_limit=args.rate_limit,
+                secondary_limit=args.secondary_limit,
+                seed=args.seed,
+            )
+            with server, concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                measured = executor.submit(
+                    run_scenario, server.url, mode, workers, args.rate_limit_reserve, args.rate_limit_burst
+                ).result()
+                scenario["server"] = server.get_stats()
+
+            scenario.update(measured)
+            results.append(scenario)
+            print(f"  {measured['prs_per_second']:.1f} PR/秒, {measured['requests']}リクエスト, "
+                  f"p95 {measured['latency_p95_ms'] or 0:.1f}ms, ピークRSS {measured['peak_rss_mb']:.1f}MB")
+
+    report = {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "scenarios": results,
+    }
+    json_codec.dump_file(report, args.output)
+    print(f"ベンチマーク結果を {args.output} に保存しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+JSONバックエンドのベンチマークスクリプト
+
+保存済みのPRデータ（prs/<番号>.json）を使い、インストールされているJSONのバックエンドごとに
+読み込み・整形した書き出し・compact な書き出しの所要時間を計測してJSONに書き出します。
+整形した書き出しが標準ライブラリと同じバイト列になるかも確認します（異なるとPRデータのファイルが書き換わるため）。
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.json_codec import BACKEND_STDLIB, available_backends
+
+
+OPERATIONS = ("loads", "dumps", "dumps_compact")
+
+
+def load_records(input_dir, limit=None):
+    """PRデータのファイルを読み込み、(元のバイト列のリスト, PRデータのリスト) を返す"""
+    paths = sorted(
+        (path for path in Path(input_dir).glob("*.json") if path.stem.isdigit()), key=lambda path: int(path.stem)
+    )
+    if limit:
+        paths = paths[:limit]
+    raw = [path.read_bytes() for path in paths]
+    return raw, [json.loads(data) for data in raw]
+
+
+def _best_seconds(func, repeat):
+    """func を repeat 回実行した中で最も短い所要時間（秒）"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_backend(backend, raw, records, repeat):
+    """1つのバックエンドの計測結果を返す"""
+    operations = {
+        "loads": lambda: [backend.loads(data) for data in raw],
+        "dumps": lambda: [backend.dumps(record) for record in records],
+        "dumps_compact": lambda: [backend.dumps(record, compact=True) for record in records],
+    }
+    pretty = [backend.dumps(record) for record in records]
+    compact = [backend.dumps(record, compact=True) for record in records]
+    sizes = {"loads": sum(map(len, raw)), "dumps": sum(map(len, pretty)), "dumps_compact": sum(map(len, compact))}
+
+    results = {"backend": backend.name, "output_bytes": sizes["dumps"], "compact_bytes": sizes["dumps_compact"]}
+    for name in OPERATIONS:
+        seconds = _best_seconds(operations[name], repeat)
+        results[name] = {
+            "seconds": round(seconds, 6),
+            "records_per_second": round(len(records) / seconds, 1) if seconds else None,
+            "mb_per_second": round(sizes[name] / seconds / (1024 * 1024), 1) if seconds else None,
+        }
+    return results, pretty
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="JSONバックエンドのベンチマークスクリプト")
+    parser.add_argument("--input-dir", type=str, required=True, help="PRデータのディレクトリ（file_per_pr）")
+    parser.add_argument("--limit", type=int, help="使うPRデータの件数の上限")
+    parser.add_argument("--repeat", type=int, default=5, help="操作ごとの繰り返し回数（最も短い時間を使う）")
+    parser.add_argument("--output", type=str, default="json_codec_benchmark.json", help="結果を書き出すJSONファイル")
+    return parser.parse_args()
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+    raw, records = load_records(args.input_dir, args.limit)
+    if not records:
+        print(f"PRデータが見つかりません: {args.input_dir}")
+        return 1
+    print(f"{len(records)}件のPRデータ（{sum(map(len, raw)):,} バイト）で計測します")
+
+    backends = available_backends()
+    results = []
+    reference = None
+    for name in [BACKEND_STDLIB] + [name for name in backends if name != BACKEND_STDLIB]:
+        result, pretty = benchmark_backend(backends[name], raw, records, max(1, args.repeat))
+        if reference is None:
+            reference = pretty
+        result["identical_to_stdlib"] = pretty == reference
+        results.append(result)
+        print(f"{name}: " + " / ".join(
+            f"{operation} {result[operation]['seconds'] * 1000:.1f}ms ({result[operation]['mb_per_second']} MB/s)"
+            for operation in OPERATIONS
+        ) + ("" if result["identical_to_stdlib"] else "  ※標準ライブラリと出力が異なります"))
+
+    stdlib = results[0]
+    for result in results[1:]:
+        speedups = ", ".join(
+            f"{operation} {stdlib[operation]['seconds'] / result[operation]['seconds']:.1f}倍"
+            for operation in OPERATIONS if result[operation]["seconds"]
+        )
+        print(f"{result['backend']} の標準ライブラリに対する速度: {speedups}")
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "records": len(records),
+        "input_bytes": sum(map(len, raw)),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果を {args.output} に書き出しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
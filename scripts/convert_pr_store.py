@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+PRデータ保存先の変換スクリプト
+
+SQLiteの保存先から pr-data リポジトリ用の prs/<番号>.json の形式に書き出します（既定）。
+--from と --to を入れ替えると、既存のPRごとのファイルをSQLiteの保存先に取り込めます。
+--intern を指定すると変換先ではリポジトリ・ユーザー・ラベルの重複を除いて保存し、
+指定しない場合は参照を元のオブジェクトに戻したPRデータを書き出します。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.pr_store import (
+    SQLITE_FILENAME,
+    STORAGE_FILE_PER_PR,
+    STORAGE_SQLITE,
+    STORAGE_TYPES,
+    copy_prs,
+    create_pr_store,
+)
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="PRデータ保存先の変換スクリプト")
+    parser.add_argument(
+        "--input-dir", type=str, required=True, help="変換元の保存先のディレクトリ"
+    )
+    parser.add_argument(
+        "--output-dir", type=str, required=True, help="変換先の保存先のディレクトリ"
+    )
+    parser.add_argument(
+        "--from", dest="source_type", type=str, default=STORAGE_SQLITE, choices=STORAGE_TYPES,
+        help="変換元の storage_type"
+    )
+    parser.add_argument(
+        "--to", dest="target_type", type=str, default=STORAGE_FILE_PER_PR, choices=STORAGE_TYPES,
+        help="変換先の storage_type"
+    )
+    parser.add_argument(
+        "--intern", action="store_true", help="変換先ではリポジトリ・ユーザー・ラベルの重複を除いて保存する"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+
+    if Path(args.input_dir).resolve() == Path(args.output_dir).resolve() and args.source_type == args.target_type:
+        print("エラー: 変換元と変換先が同じです")
+        return 1
+    if args.source_type == STORAGE_SQLITE and not (Path(args.input_dir) / SQLITE_FILENAME).exists():
+        print(f"エラー: SQLiteのデータベースが見つかりません: {Path(args.input_dir) / SQLITE_FILENAME}")
+        return 1
+
+    source = create_pr_store(directory=args.input_dir, storage_type=args.source_type)
+    target = create_pr_store({"data": {"intern": args.intern}}, args.output_dir, args.target_type)
+    try:
+        count = copy_prs(source, target)
+    finally:
+        source.close()
+        target.close()
+
+    print(f"{count}件のPRデータを {args.source_type} から {args.target_type} ({args.output_dir}) に書き出しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
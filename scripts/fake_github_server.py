@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+偽GitHub APIサーバー起動スクリプト
+
+保存済みのPRデータ（--from-dir）または合成したデータ（--prs）をGitHub REST APIと同じ形式で返す
+ローカルサーバーを起動します。設定ファイルの github.api_base_url を表示されたURLに変更すると、
+コレクターをオフラインで実行・計測できます。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.fake_github import DEFAULT_RATE_LIMIT, FakeGitHubRepository, FakeGitHubServer
+from src.utils.pr_store import STORAGE_TYPES
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="偽GitHub APIサーバーを起動します")
+    parser.add_argument("--owner", default="team-mirai", help="リポジトリのオーナー")
+    parser.add_argument("--repo", default="policy", help="リポジトリ名")
+    parser.add_argument("--from-dir", help="返すPRデータのディレクトリ（PRCollectorの出力）")
+    parser.add_argument(
+        "--storage-type", choices=STORAGE_TYPES,
+        help="--from-dir の保存形式（省略時はSQLiteのデータベースがあれば sqlite、なければ file_per_pr）"
+    )
+    parser.add_argument("--prs", type=int, default=1000, help="合成するPRの数（--from-dir を指定しない場合）")
+    parser.add_argument("--seed", type=int, default=0, help="合成データと遅延のゆらぎに使う乱数の種")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるホスト")
+    parser.add_argument("--port", type=int, default=8000, help="待ち受けるポート")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="レスポンスごとの遅延（ミリ秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="遅延に加えるゆらぎの最大値（ミリ秒）")
+    parser.add_argument("--rate-limit", type=int, default=DEFAULT_RATE_LIMIT, help="トークンごとの1時間あたりのリクエスト数")
+    parser.add_argument("--secondary-limit", type=int, help="1秒あたりに受け付けるリクエスト数（省略時は無制限）")
+    args = parser.parse_args()
+
+    if args.from_dir:
+        repository = FakeGitHubRepository.from_pr_directory(
+            args.owner, args.repo, args.from_dir, args.storage_type
+        )
+    else:
+        repository = FakeGitHubRepository.synthetic(args.owner, args.repo, pr_count=args.prs, seed=args.seed)
+
+    server = FakeGitHubServer(
+        repository,
+        host=args.host,
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit,
+        secondary_limit=args.secondary_limit,
+        seed=args.seed,
+    )
+
+    print(f"{len(repository.prs)}件のPRを {server.url}/repos/{args.owner}/{args.repo} で提供します")
+    print(f"github.api_base_url に {server.url} を指定してください（Ctrl+Cで停止）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("停止しています...")
+    finally:
+        server.stop()
+        print(f"リクエスト統計: {server.get_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,18 +7,20 @@ team-mirai-volunteer/pr-data リポジトリのファイルごとのPRデータ
 """
 
 import argparse
-import json
 import os
 import sys
 from pathlib import Path
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import json_codec
+
 
 def load_json_file(file_path):
     """JSONファイルを読み込む"""
     try:
-        with open(file_path, encoding="utf-8") as f:
-            return json.load(f)
+        return json_codec.load_file(file_path)
     except Exception as e:
         print(f"Error loading {file_path}: {e}")
         return []
@@ -28,8 +30,7 @@ def save_json_file(data, file_path):
     """JSONファイルを保存する"""
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_codec.dump_file(data, file_path)
         print(f"データを保存しました: {file_path}")
         return True
     except Exception as e:
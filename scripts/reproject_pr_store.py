@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+保存済みPRデータの項目選択スクリプト
+
+migrate_data.py で作成したPRデータや、data.projection を有効にする前に収集したPRデータに
+設定ファイルの data.projection.keep の項目選択を適用し、分析に使わない項目を取り除きます。
+内容が変わらないPRは書き込みません。--raw-archive を指定すると、取り除く前のPRデータを
+<出力先>/raw/<番号>.json.gz に保存します。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.github_api import load_config
+from src.utils.pr_projection import PRProjection
+from src.utils.pr_store import STORAGE_TYPES, create_pr_store, serialize_pr_data
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="保存済みPRデータの項目選択スクリプト")
+    parser.add_argument(
+        "--input-dir", type=str, required=True, help="PRデータの保存先のディレクトリ"
+    )
+    parser.add_argument(
+        "--output-dir", type=str, help="項目を選んだPRデータの保存先のディレクトリ（省略時は --input-dir を書き換える）"
+    )
+    parser.add_argument(
+        "--storage-type", type=str, choices=STORAGE_TYPES, help="保存先の storage_type（省略時は設定ファイルの値）"
+    )
+    parser.add_argument(
+        "--raw-archive", action="store_true", help="項目を選ぶ前のPRデータを raw/<番号>.json.gz に保存する"
+    )
+    return parser.parse_args()
+
+
+def reproject_prs(source, target, projection, archive_dir=None):
+    """source のすべてのPRデータに項目選択を適用して target に保存する
+
+    戻り値は {"count", "changed", "bytes_before", "bytes_after"}（バイト数はJSONに書き出した場合の大きさ）。
+    """
+    stats = {"count": 0, "changed": 0, "bytes_before": 0, "bytes_after": 0}
+    for pr_data in source.iter_prs():
+        projected = projection.apply(pr_data)
+        before = len(serialize_pr_data(pr_data))
+        after = len(serialize_pr_data(projected))
+        if archive_dir is not None and after != before:
+            projection.archive(pr_data, archive_dir)
+        if target.save(projected):
+            stats["count"] += 1
+            stats["bytes_before"] += before
+            stats["bytes_after"] += after
+    target.flush()
+    stats["changed"] = len(target.pop_changes())
+    return stats
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+    config = load_config()
+    storage_type = args.storage_type or config["data"]["storage_type"]
+    output_dir = args.output_dir or args.input_dir
+
+    projection_config = config["data"].get("projection") or {}
+    projection = PRProjection(keep=projection_config.get("keep"), raw_archive=args.raw_archive)
+
+    source = create_pr_store(config, args.input_dir, storage_type)
+    target = source if Path(output_dir).resolve() == Path(args.input_dir).resolve() else create_pr_store(
+        config, output_dir, storage_type
+    )
+    try:
+        stats = reproject_prs(source, target, projection, output_dir if args.raw_archive else None)
+    finally:
+        source.close()
+        if target is not source:
+            target.close()
+
+    ratio = stats["bytes_before"] / stats["bytes_after"] if stats["bytes_after"] else 0
+    print(f"{stats['count']}件のPRデータのうち{stats['changed']}件を書き換えました: "
+          f"{stats['bytes_before']:,} バイト → {stats['bytes_after']:,} バイト ({ratio:.1f}分の1)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
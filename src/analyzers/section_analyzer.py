@@ -5,65 +5,30 @@ PRのセクション分析モジュール
 PRで変更されたマークダウンファイルのセクション（見出し）を分析します。
 """
 
-import json
 import os
-import re
-from pathlib import Path
 
-from ..utils.github_api import load_config
+from ..utils.github_api import get_credential_provider
+from ..utils.markdown_sections import extract_file_sections, extract_sections_from_patch
 
 
 class SectionAnalyzer:
     """PRのセクション分析を行うクラス"""
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, credentials=None):
         """初期化"""
-        self.config = config or load_config()
+        self.credentials = credentials or get_credential_provider()
+        self.config = config or self.credentials.get_config()
         
     def extract_sections_from_patch(self, patch):
         """パッチからセクション（見出し）を抽出する"""
-        if not patch:
-            return []
-            
-        heading_pattern = r'^\+\s*(#{1,6})\s+(.+)$'
-        
-        sections = []
-        for line in patch.split('\n'):
-            match = re.match(heading_pattern, line)
-            if match:
-                level = len(match.group(1))  # #の数（見出しレベル）
-                title = match.group(2).strip()
-                sections.append({
-                    "level": level,
-                    "title": title,
-                    "line": line
-                })
-                
-        return sections
+        return extract_sections_from_patch(patch)
         
     def analyze_pr_files(self, pr_data):
         """PRのファイル変更からセクション情報を抽出する"""
         if not pr_data or "files" not in pr_data:
             return []
             
-        sections = []
-        for file_info in pr_data["files"]:
-            filename = file_info.get("filename", "")
-            if not filename.lower().endswith(('.md', '.markdown')):
-                continue
-                
-            patch = file_info.get("patch")
-            if not patch:
-                continue
-                
-            file_sections = self.extract_sections_from_patch(patch)
-            if file_sections:
-                sections.append({
-                    "filename": filename,
-                    "sections": file_sections
-                })
-                
-        return sections
+        return extract_file_sections(pr_data["files"])
         
     def analyze_prs(self, pr_data_list):
         """複数のPRのセクション分析を行う"""
@@ -76,6 +41,7 @@ class SectionAnalyzer:
             pr_number = pr_data["basic_info"]["number"]
             pr_title = pr_data["basic_info"]["title"]
             pr_url = pr_data["basic_info"]["html_url"]
+            repository = pr_data.get("repository")
             
             sections_info = self.analyze_pr_files(pr_data)
             if not sections_info:
@@ -100,13 +66,44 @@ class SectionAnalyzer:
                     if section_title not in results:
                         results[section_title] = []
                         
-                    if not any(pr["number"] == pr_number for pr in results[section_title]):
-                        results[section_title].append({
+                    # 複数のリポジトリのPRをまとめる場合、PR番号はリポジトリごとに重複し得る
+                    if not any(pr["number"] == pr_number and pr.get("repository") == repository
+                               for pr in results[section_title]):
+                        entry = {
                             "number": pr_number,
                             "title": pr_title,
                             "url": pr_url,
                             "filename": filename
-                        })
+                        }
+                        if repository:
+                            entry["repository"] = repository
+                        results[section_title].append(entry)
+            
+        return results
+        
+    def analyze_store(self, store, repository=None, results=None):
+        """保存先のセクションのインデックスからセクション分析を行う（analyze_prs と同じ形式の結果を返す）
+
+        sqlite の保存先ではパッチを読み込まずにインデックスだけを使う。repository を指定した場合は
+        結果にリポジトリ名を含め、results を渡すとそこに追加する（複数のリポジトリの結果をまとめる場合）。
+        """
+        results = {} if results is None else results
+        
+        for row in store.iter_section_rows():
+            section_title = row["section"]["title"]
+            prs = results.setdefault(section_title, [])
+            if any(pr["number"] == row["number"] and pr.get("repository") == repository for pr in prs):
+                continue
+                
+            entry = {
+                "number": row["number"],
+                "title": row["title"],
+                "url": row["url"],
+                "filename": row["filename"]
+            }
+            if repository:
+                entry["repository"] = repository
+            prs.append(entry)
             
         return results
         
@@ -131,7 +128,8 @@ class SectionAnalyzer:
             report += f"## {section}\n\n"
             
             for pr in prs:
-                report += f"- [PR #{pr['number']}]({pr['url']}) {pr['title']} ({pr['filename']})\n"
+                pr_ref = f"{pr['repository']}#{pr['number']}" if pr.get("repository") else f"PR #{pr['number']}"
+                report += f"- [{pr_ref}]({pr['url']}) {pr['title']} ({pr['filename']})\n"
                 
             report += "\n"
             
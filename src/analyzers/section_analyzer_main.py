@@ -3,10 +3,10 @@
 PRのセクション分析スクリプト
 
 PRで変更されたマークダウンファイルのセクション（見出し）を分析します。
+設定ファイルで複数のリポジトリを指定した場合は、リポジトリごとのレポートとすべてのリポジトリをまとめたレポートを生成します。
 """
 
 import argparse
-import json
 import os
 import sys
 from pathlib import Path
@@ -14,7 +14,11 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.analyzers.section_analyzer import SectionAnalyzer
-from src.utils.github_api import load_config
+from src.collectors.repositories import is_multi_repository, repository_configs, repository_name
+from src.utils import json_codec
+from src.utils.github_api import get_credential_provider
+from src.utils.metrics import get_metrics
+from src.utils.pr_store import create_pr_store
 
 
 def parse_arguments():
@@ -29,34 +33,34 @@ def parse_arguments():
     return parser.parse_args()
 
 
-def load_pr_data_from_directory(input_dir):
-    """PRデータをディレクトリから読み込む（ファイルごとのPRデータ）"""
-    pr_data = []
-    input_path = Path(input_dir)
-    
-    if not input_path.exists() or not input_path.is_dir():
-        print(f"ディレクトリが存在しません: {input_dir}")
-        return []
-        
-    json_files = list(input_path.glob("*.json"))
-    print(f"{len(json_files)}件のPRデータファイルを見つけました")
-    
-    for json_file in json_files:
+def analyze_repositories(analyzer, config, output_file=None):
+    """設定の repositories のリポジトリごとのレポートと、すべてのリポジトリをまとめたレポートを生成する（分析したPR数を返す）"""
+    repo_configs = repository_configs(config)
+    all_results = {}
+    pr_count = 0
+    for repo_config in repo_configs:
+        repository = repository_name(repo_config)
+        store = create_pr_store(repo_config)
         try:
-            with open(json_file, encoding="utf-8") as f:
-                pr = json.load(f)
-                pr_data.append(pr)
-        except Exception as e:
-            print(f"{json_file}の読み込み中にエラーが発生しました: {e}")
-            
-    return pr_data
+            pr_count += len(store)
+            print(f"{repository} のセクションレポートを生成します")
+            repo_output_file = Path(repo_config["data"]["reports_dir"]) / "sections" / "section_report.md"
+            analyzer.generate_section_report(analyzer.analyze_store(store), repo_output_file)
+            analyzer.analyze_store(store, repository, all_results)
+        finally:
+            store.close()
+    
+    output_file = output_file or Path(config["data"]["reports_dir"]) / "sections" / "section_report.md"
+    analyzer.generate_section_report(all_results, output_file)
+    return pr_count
 
 
 def main():
     """メイン関数"""
     args = parse_arguments()
     
-    config = load_config()
+    credentials = get_credential_provider()
+    config = credentials.get_config()
     
     input_path = args.input
     if not input_path:
@@ -68,25 +72,46 @@ def main():
         os.makedirs(output_dir, exist_ok=True)
         output_file = output_dir / "section_report.md"
     
+    analyzer = SectionAnalyzer(config, credentials)
+    metrics = get_metrics()
+    
+    if not args.input and is_multi_repository(config):
+        with metrics.stage("section_analysis") as stage:
+            stage["items"] = analyze_repositories(analyzer, config, args.output)
+        metrics.write(input_path, merge=True)
+        print(f"セクションレポートを {output_file} に生成しました")
+        return 0
+    
     if Path(input_path).is_dir():
-        pr_data = load_pr_data_from_directory(input_path)
+        # 保存先のディレクトリはセクションのインデックスから分析する（file_per_pr ではパッチから抽出する）
+        store = create_pr_store(config, input_path)
+        try:
+            if not len(store):
+                print("PRデータがありません")
+                return 1
+            with metrics.stage("section_analysis") as stage:
+                section_results = analyzer.analyze_store(store)
+                analyzer.generate_section_report(section_results, output_file)
+                stage["items"] = len(store)
+        finally:
+            store.close()
     else:
         try:
-            with open(input_path, encoding="utf-8") as f:
-                pr_data = json.load(f)
+            pr_data = json_codec.load_file(input_path)
         except Exception as e:
             print(f"PRデータの読み込み中にエラーが発生しました: {e}")
             return 1
-    
-    if not pr_data:
-        print("PRデータがありません")
-        return 1
-    
-    analyzer = SectionAnalyzer(config)
-    
-    section_results = analyzer.analyze_prs(pr_data)
-    
-    analyzer.generate_section_report(section_results, output_file)
+        
+        if not pr_data:
+            print("PRデータがありません")
+            return 1
+        
+        with metrics.stage("section_analysis") as stage:
+            section_results = analyzer.analyze_prs(pr_data)
+            analyzer.generate_section_report(section_results, output_file)
+            stage["items"] = len(pr_data)
+    # 実行メトリクスはPRデータ（last_run_info.json）と同じディレクトリに追記する
+    metrics.write(input_path if Path(input_path).is_dir() else Path(input_path).parent, merge=True)
     
     print(f"セクションレポートを {output_file} に生成しました")
     return 0
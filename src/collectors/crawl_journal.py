@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+クロールジャーナルモジュール
+
+PR収集の進行状況（一覧を取得済みのページ・保存済みのPR番号・未完了のPR）を
+アトミックにファイルへ書き出し、途中で止まったクロールを続きから再開できるようにします。
+"""
+
+import datetime
+import threading
+import time
+from pathlib import Path
+
+from ..utils import json_codec
+from ..utils.atomic_write import write_atomic
+
+
+JOURNAL_FILENAME = "crawl_journal.state"
+JOURNAL_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+
+
+class CrawlJournal:
+    """1回のクロールの進行状況を記録するジャーナル
+
+    一覧のページは、そのページのPRを未完了として記録した後に取得済みとする。
+    PRの保存完了は checkpoint_interval 秒ごとにまとめて書き出す（書き出し前に止まった場合は再取得になるだけで、取りこぼしは起きない）。
+    """
+
+    def __init__(self, path, state, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        """初期化（新規作成は start()、読み込みは load() を使う）"""
+        self.path = Path(path)
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._state = state
+        self._completed = set(state["completed"])
+        self._pending = {pr["number"]: pr for pr in state["pending"]}
+        self._failed = {pr["number"]: pr for pr in state["failed"]}
+        self._last_saved = 0.0
+
+    @classmethod
+    def path_for(cls, output_dir):
+        """出力ディレクトリに対応するジャーナルのパスを返す"""
+        return Path(output_dir) / JOURNAL_FILENAME
+
+    @classmethod
+    def start(cls, path, limit=None, last_updated_at=None, carry_over=(), **kwargs):
+        """新しいクロールのジャーナルを作成する
+
+        carry_over（前回のクロールで取得できなかったPRの {"number", "updated_at"} のリスト）は未完了として記録し、
+        一覧より先に取得する。
+        """
+        now = datetime.datetime.now().isoformat()
+        state = {
+            "version": JOURNAL_VERSION,
+            "status": "running",
+            "started_at": now,
+            "updated_at": now,
+            "params": {
+                "limit": limit,
+                "last_updated_at": last_updated_at.isoformat() if last_updated_at else None,
+            },
+            "last_listed_page": 0,
+            "listed_count": 0,
+            "listing_done": False,
+            "max_updated_at": None,
+            "completed": [],
+            "pending": [dict(pr) for pr in carry_over],
+            "failed": [],
+        }
+        journal = cls(path, state, **kwargs)
+        journal.save()
+        return journal
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """保存済みのジャーナルを読み込む（存在しないか読み込めない場合はNone）"""
+        path = Path(path)
+        if not path.exists():
+            return None
+
+        try:
+            state = json_codec.load_file(path)
+        except (OSError, ValueError) as e:
+            print(f"クロールジャーナル {path} の読み込み中にエラーが発生しました: {e}")
+            return None
+
+        if state.get("version") != JOURNAL_VERSION:
+            print(f"クロールジャーナル {path} の形式が異なるため使用しません")
+            return None
+        return cls(path, state, **kwargs)
+
+    @property
+    def started_at(self):
+        """クロールを開始した日時"""
+        return datetime.datetime.fromisoformat(self._state["started_at"])
+
+    @property
+    def limit(self):
+        """クロール開始時に指定された取得上限"""
+        return self._state["params"]["limit"]
+
+    @property
+    def last_updated_at(self):
+        """クロール開始時に指定された前回の最終更新日時"""
+        value = self._state["params"]["last_updated_at"]
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    @property
+    def next_page(self):
+        """次に取得する一覧のページ番号"""
+        return self._state["last_listed_page"] + 1
+
+    @property
+    def listed_count(self):
+        """一覧から取得したPRの数"""
+        return self._state["listed_count"]
+
+    @property
+    def listing_done(self):
+        """一覧をすべて取得したか"""
+        return self._state["listing_done"]
+
+    @property
+    def max_updated_at(self):
+        """一覧で見つかったPRの最大の更新日時（GitHub APIの文字列のまま）"""
+        return self._state["max_updated_at"]
+
+    @property
+    def is_finished(self):
+        """クロールが完了しているか"""
+        return self._state["status"] == "completed"
+
+    @property
+    def failed_count(self):
+        """取得に失敗したPRの数"""
+        with self._lock:
+            return len(self._failed)
+
+    def failed_prs(self):
+        """取得に失敗したPRの {"number", "updated_at"}（番号順）"""
+        with self._lock:
+            return sorted(self._failed.values(), key=lambda pr: pr["number"])
+
+    def resume_prs(self):
+        """前回完了しなかったPR（未完了と失敗）を返す"""
+        with self._lock:
+            prs = list(self._pending.values()) + [
+                pr for number, pr in self._failed.items() if number not in self._pending
+            ]
+        return sorted(prs, key=lambda pr: pr["number"], reverse=True)
+
+    def skip_completed(self, prs):
+        """保存済みのPRを除く"""
+        with self._lock:
+            return [pr for pr in prs if pr["number"] not in self._completed]
+
+    def add_pending(self, prs):
+        """詳細取得に回すPRを未完了として記録する"""
+        with self._lock:
+            for pr in prs:
+                entry = {"number": pr["number"], "updated_at": pr.get("updated_at")}
+                if pr.get("state"):
+                    # 再開時の優先順位の判定に使う
+                    entry["state"] = pr["state"]
+                self._pending[pr["number"]] = entry
+
+    def observe_updated_at(self, prs):
+        """一覧で見つかったPRの最大の更新日時を記録する
+
+        GitHub APIの日時は常に YYYY-MM-DDTHH:MM:SSZ 形式なので、文字列のまま比較できる。
+        """
+        values = [pr["updated_at"] for pr in prs if pr.get("updated_at")]
+        if not values:
+            return
+        with self._lock:
+            current = self._state["max_updated_at"]
+            self._state["max_updated_at"] = max(values + ([current] if current else []))
+
+    def record_page(self, page, count):
+        """一覧のページを取得済みとして記録する"""
+        with self._lock:
+            self._state["last_listed_page"] = page
+            self._state["listed_count"] += count
+        self.save()
+
+    def finish_listing(self):
+        """一覧をすべて取得したことを記録する"""
+        with self._lock:
+            self._state["listing_done"] = True
+        self.save()
+
+    def mark_completed(self, pr_number):
+        """PRの保存完了を記録する"""
+        with self._lock:
+            self._completed.add(pr_number)
+            self._pending.pop(pr_number, None)
+            self._failed.pop(pr_number, None)
+            due = time.monotonic() - self._last_saved >= self.checkpoint_interval
+        if due:
+            self.save()
+
+    def settle(self, deferred=()):
+        """パイプラインの終了後、保存されなかったPRを失敗として記録する
+
+        deferred（予算に達したため取得しなかったPRの番号）は未完了のまま残し、次回の再開で取得する。
+        """
+        deferred = set(deferred)
+        with self._lock:
+            for pr_number in list(self._pending):
+                if pr_number not in deferred:
+                    self._failed[pr_number] = self._pending.pop(pr_number)
+        self.save()
+
+    def finish(self):
+        """クロールの完了を記録する"""
+        with self._lock:
+            self._state["status"] = "completed"
+        self.save()
+
+    def track_pages(self, pr_pages):
+        """一覧のページを中継しながら進行状況を記録するジェネレータ
+
+        前回完了しなかったPRを最初に返し、続けて next_page から始まる一覧のページを返す。
+        pr_pages は1ページごとに1回 yield するイテラブルであること。
+        """
+        resumed = self.resume_prs()
+        if resumed:
+            print(f"クロールジャーナル: 前回完了しなかった{len(resumed)}件のPRから再開します")
+            yield resumed
+
+        if self.listing_done:
+            return
+
+        page = self.next_page
+        for prs in pr_pages:
+            self.observe_updated_at(prs)
+            yield prs
+            # 次のページを要求された時点で、このページのPRは未完了として記録済み
+            self.record_page(page, len(prs))
+            page += 1
+        self.finish_listing()
+
+    def save(self):
+        """ジャーナルをアトミックに書き出す"""
+        with self._lock:
+            self._state["updated_at"] = datetime.datetime.now().isoformat()
+            self._state["completed"] = sorted(self._completed)
+            self._state["pending"] = sorted(self._pending.values(), key=lambda pr: pr["number"])
+            self._state["failed"] = sorted(self._failed.values(), key=lambda pr: pr["number"])
+            data = json_codec.dumps(self._state, compact=True)
+            self._last_saved = time.monotonic()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.path, data)
+
+    def get_summary(self):
+        """進行状況の概要を取得する"""
+        with self._lock:
+            return {
+                "status": self._state["status"],
+                "started_at": self._state["started_at"],
+                "last_listed_page": self._state["last_listed_page"],
+                "listing_done": self._state["listing_done"],
+                "max_updated_at": self._state["max_updated_at"],
+                "completed": len(self._completed),
+                "pending": len(self._pending),
+                "failed": len(self._failed),
+            }
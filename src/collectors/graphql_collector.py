@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+GraphQLによるPRデータ一括収集モジュール
+
+複数PRの基本情報・ラベル・コメント・レビューコメント・コミット・変更ファイルを
+1回のGraphQLクエリでまとめて取得し、REST APIと同じ pr_details 形式に変換します。
+"""
+
+from ..utils.github_api import make_github_graphql_request
+from .pr_collector import PRCollector
+
+
+PAGE_SIZE = 100
+REVIEW_THREAD_COMMENTS_PAGE_SIZE = 50
+
+PR_FIELDS = """
+    id number title state body url createdAt updatedAt closedAt mergedAt isDraft
+    additions deletions changedFiles
+    headRefName headRefOid baseRefName baseRefOid
+    author { login }
+"""
+
+CONNECTION_FIELDS = {
+    "labels": "id name color description",
+    "comments": "id databaseId url body createdAt updatedAt author { login }",
+    "reviewThreads": (
+        f"comments(first: {REVIEW_THREAD_COMMENTS_PAGE_SIZE}) {{ pageInfo {{ hasNextPage }} "
+        "nodes { id databaseId url body path diffHunk createdAt updatedAt author { login } replyTo { databaseId } } }"
+    ),
+    "commits": "commit { oid url message committedDate author { name email date user { login } } }",
+    "files": "path additions deletions changeType",
+}
+
+FILE_STATUS = {
+    "ADDED": "added",
+    "MODIFIED": "modified",
+    "DELETED": "removed",
+    "RENAMED": "renamed",
+    "COPIED": "copied",
+    "CHANGED": "changed",
+}
+
+
+def _connection_selection(name, after_variable=False):
+    """コネクションの選択セットを組み立てる"""
+    after_arg = ", after: $after" if after_variable else ""
+    return (
+        f"{name}(first: {PAGE_SIZE}{after_arg}) {{ totalCount pageInfo {{ hasNextPage endCursor }} "
+        f"nodes {{ {CONNECTION_FIELDS[name]} }} }}"
+    )
+
+
+def build_batch_query(pr_numbers, connection_names=tuple(CONNECTION_FIELDS)):
+    """複数PRをエイリアスで並べた一括取得クエリを組み立てる（connection_names のコネクションだけを取得する）"""
+    selection = PR_FIELDS + "\n".join(_connection_selection(name) for name in connection_names)
+    aliases = "\n".join(f"pr{int(number)}: pullRequest(number: {int(number)}) {{ {selection} }}" for number in pr_numbers)
+    return f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+
+
+def build_connection_query(connection_name):
+    """1つのPRのコネクションの続きのページを取得するクエリを組み立てる"""
+    return (
+        "query($owner: String!, $name: String!, $number: Int!, $after: String) { "
+        "repository(owner: $owner, name: $name) { pullRequest(number: $number) { "
+        f"{_connection_selection(connection_name, after_variable=True)} }} }} }}"
+    )
+
+
+def _map_user(author):
+    """GraphQLのauthorをRESTのuser形式に変換する"""
+    return {"login": author["login"]} if author else None
+
+
+def _map_label(node):
+    """ラベルをREST形式に変換する"""
+    return {
+        "node_id": node["id"],
+        "name": node["name"],
+        "color": node["color"],
+        "description": node.get("description"),
+    }
+
+
+def _map_comment(node):
+    """コメントをREST形式に変換する"""
+    return {
+        "id": node["databaseId"],
+        "node_id": node["id"],
+        "html_url": node["url"],
+        "body": node["body"],
+        "user": _map_user(node.get("author")),
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+    }
+
+
+def _map_review_comment(node):
+    """レビューコメントをREST形式に変換する"""
+    comment = _map_comment(node)
+    comment["path"] = node.get("path")
+    comment["diff_hunk"] = node.get("diffHunk")
+    reply_to = node.get("replyTo")
+    if reply_to:
+        comment["in_reply_to_id"] = reply_to["databaseId"]
+    return comment
+
+
+def _map_commit(node):
+    """コミットをREST形式に変換する"""
+    commit = node["commit"]
+    author = commit.get("author") or {}
+    return {
+        "sha": commit["oid"],
+        "html_url": commit["url"],
+        "commit": {
+            "message": commit["message"],
+            "author": {
+                "name": author.get("name"),
+                "email": author.get("email"),
+                "date": author.get("date"),
+            },
+        },
+        "author": _map_user(author.get("user")),
+    }
+
+
+def _map_file(node):
+    """変更ファイルをREST形式に変換する（patchはGraphQLでは取得できない）"""
+    return {
+        "filename": node["path"],
+        "status": FILE_STATUS.get(node["changeType"], node["changeType"].lower()),
+        "additions": node["additions"],
+        "deletions": node["deletions"],
+        "changes": node["additions"] + node["deletions"],
+    }
+
+
+class GraphQLPRCollector(PRCollector):
+    """GraphQL APIでPRデータをまとめて収集するクラス
+
+    PR一覧の取得やファイルへの保存は PRCollector と共通で、詳細情報の取得だけを
+    graphql.batch_size 件ずつの一括クエリで行う。GraphQLでは変更ファイルのpatchが取得できないため、
+    graphql.fetch_patches が有効な場合は変更ファイルのみREST APIで取得し（セクション分析に必要）、
+    一括クエリでは files のコネクションを取得しない。
+    collectors.incremental が有効な場合、保存済みのPRは PRCollector と同じく変化したサブリソースだけを
+    REST APIで取得し直し、一括クエリでは保存されていないPRだけを取得する。
+    """
+
+    def __init__(self, config=None, credentials=None):
+        """初期化"""
+        super().__init__(config, credentials)
+        graphql_config = self.config.get("graphql", {})
+        self.graphql_url = graphql_config.get("url") or f"{self.api_base_url}/graphql"
+        self.batch_size = max(1, graphql_config.get("batch_size", 20))
+        self.fetch_patches = graphql_config.get("fetch_patches", True)
+        # patch をREST APIで取得する場合、GraphQLの files はノードの消費と転送量が無駄になるため取得しない
+        self.connection_names = tuple(
+            name for name in CONNECTION_FIELDS if not (self.fetch_patches and name == "files")
+        )
+
+    def _graphql(self, query, variables):
+        """注入されたCredentialProviderでGraphQLクエリを実行する"""
+        variables = {"owner": self.repo_owner, "name": self.repo_name, **variables}
+        return make_github_graphql_request(
+            self.graphql_url, query, variables=variables, credentials=self.credentials
+        )
+
+    def _complete_connection(self, pr_number, connection_name, connection):
+        """コネクションの残りのページをカーソルでたどって全ノードを返す"""
+        nodes = list(connection["nodes"])
+        page_info = connection["pageInfo"]
+        query = None
+
+        while page_info["hasNextPage"]:
+            query = query or build_connection_query(connection_name)
+            data = self._graphql(query, {"number": pr_number, "after": page_info["endCursor"]})
+            connection = data["repository"]["pullRequest"][connection_name]
+            nodes.extend(connection["nodes"])
+            page_info = connection["pageInfo"]
+
+        return nodes
+
+    def _to_pr_details(self, node, connections):
+        """GraphQLのPRノードを pr_details 形式に変換する"""
+        pr_number = node["number"]
+        labels = [_map_label(label) for label in connections["labels"]]
+        comments = [_map_comment(comment) for comment in connections["comments"]]
+        commits = [_map_commit(commit) for commit in connections["commits"]]
+
+        threads = connections["reviewThreads"]
+        if any(thread["comments"]["pageInfo"]["hasNextPage"] for thread in threads):
+            # スレッド内のコメントが1ページに収まらない場合はREST APIで取得する
+            review_comments = self.get_pr_review_comments(pr_number)
+        else:
+            review_comments = [
+                _map_review_comment(comment) for thread in threads for comment in thread["comments"]["nodes"]
+            ]
+            review_comments.sort(key=lambda comment: comment["id"] or 0)
+
+        if self.fetch_patches:
+            files = self.get_pr_files(pr_number)
+        else:
+            files = [_map_file(file_node) for file_node in connections["files"]]
+
+        basic_info = {
+            "node_id": node["id"],
+            "number": pr_number,
+            "title": node["title"],
+            "state": "open" if node["state"] == "OPEN" else "closed",
+            "html_url": node["url"],
+            "body": node["body"],
+            "user": _map_user(node.get("author")),
+            "created_at": node["createdAt"],
+            "updated_at": node["updatedAt"],
+            "closed_at": node["closedAt"],
+            "merged_at": node["mergedAt"],
+            "draft": node["isDraft"],
+            "labels": labels,
+            "head": {"ref": node["headRefName"], "sha": node["headRefOid"]},
+            "base": {"ref": node["baseRefName"], "sha": node["baseRefOid"]},
+            "comments": len(comments),
+            "review_comments": len(review_comments),
+            "commits": len(commits),
+            "additions": node["additions"],
+            "deletions": node["deletions"],
+            "changed_files": node["changedFiles"],
+        }
+
+        return {
+            "basic_info": basic_info,
+            "state": basic_info["state"],
+            "updated_at": basic_info["updated_at"],
+            "labels": labels,
+            "comments": comments,
+            "review_comments": review_comments,
+            "commits": commits,
+            "files": files,
+        }
+
+    def get_pr_details_batch(self, pr_numbers):
+        """複数PRの詳細情報を一括取得する（戻り値はPR番号から pr_details への辞書、存在しないPRはNone）"""
+        data = self._graphql(build_batch_query(pr_numbers, self.connection_names), {})
+        repository = data.get("repository") or {}
+
+        results = {}
+        for pr_number in pr_numbers:
+            node = repository.get(f"pr{int(pr_number)}")
+            if not node:
+                print(f"PR #{pr_number} は存在しません")
+                results[pr_number] = None
+                continue
+
+            try:
+                connections = {
+                    name: self._complete_connection(pr_number, name, node[name]) for name in self.connection_names
+                }
+                results[pr_number] = self._to_pr_details(node, connections)
+            except Exception as e:
+                print(f"PR #{pr_number} のGraphQLデータ変換中にエラーが発生しました。REST APIで取得します: {str(e)[:200]}")
+                results[pr_number] = super().get_pr_details(pr_number)
+
+        return results
+
+    def get_pr_details(self, pr_number, include_comments=True, include_review_comments=True,
+                      include_commits=True, include_files=True, include_labels=True, executor=None):
+        """PRの詳細情報を取得する（GraphQLで一括取得し、不要なサブリソースを除く）"""
+        pr_details = self.get_pr_details_batch([pr_number]).get(pr_number)
+        if not pr_details:
+            return None
+
+        excluded = {
+            "labels": not include_labels,
+            "comments": not include_comments,
+            "review_comments": not include_review_comments,
+            "commits": not include_commits,
+            "files": not include_files,
+        }
+        return {key: value for key, value in pr_details.items() if not excluded.get(key)}
+
+    @property
+    def pipeline_batch_size(self):
+        """パイプラインで1回の詳細取得にまとめるPR数"""
+        return self.batch_size
+
+    def fetch_prs(self, prs, executor=None, output_dir=None):
+        """複数のPRの詳細を1回のGraphQLクエリで取得する（パイプラインの詳細取得段から呼ばれる）
+
+        増分更新モードでは、保存済みのPRは変化したサブリソースだけを取得し直す。
+        """
+        details_by_number = {}
+        batch = prs
+        if self.incremental:
+            batch = []
+            for pr in prs:
+                stored = self.load_pr_from_file(pr["number"], output_dir)
+                if stored:
+                    details_by_number[pr["number"]] = self._fetch_pr(pr, executor, output_dir, stored)
+                else:
+                    batch.append(pr)
+
+        if batch:
+            batch_numbers = [pr["number"] for pr in batch]
+            try:
+                details_by_number.update(self.get_pr_details_batch(batch_numbers))
+            except Exception as e:
+                print(f"PR #{batch_numbers[0]}〜#{batch_numbers[-1]} の一括取得中にエラーが発生しました。"
+                      f"後で1件ずつ取得し直します: {e}")
+                for pr in batch:
+                    self.queue_retry(pr)
+        return [details_by_number.get(pr["number"]) for pr in prs]
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+PRデータ収集パイプラインモジュール
+
+PR一覧の取得 → PR詳細の取得 → ファイルへの保存 を有界キューでつないだ3段のパイプラインで実行します。
+一覧の最初のページが届いた時点で詳細の取得を始め、保存は専用スレッドで行うため
+ネットワーク処理がディスクI/Oを待つことはありません。
+"""
+
+import queue
+import threading
+import time
+
+from tqdm import tqdm
+
+
+DEFAULT_QUEUE_SIZE = 100
+
+_STOP = object()
+
+
+class StageStats:
+    """パイプラインの1段の処理件数・処理時間・キューの深さを集計するクラス"""
+
+    def __init__(self, name, input_queue=None):
+        """初期化"""
+        self.name = name
+        self.input_queue = input_queue
+        self._lock = threading.Lock()
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """処理開始を記録する"""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+
+    def finish(self):
+        """処理終了を記録する"""
+        with self._lock:
+            self.finished_at = time.monotonic()
+
+    def record(self, items, busy_seconds):
+        """処理した件数と所要時間を記録する"""
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy_seconds
+
+    def observe_queue(self):
+        """入力キューの深さを記録する"""
+        if self.input_queue is None:
+            return
+        depth = self.input_queue.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def snapshot(self):
+        """現在の統計を辞書で返す"""
+        with self._lock:
+            end = self.finished_at if self.finished_at is not None else time.monotonic()
+            elapsed = end - self.started_at if self.started_at is not None else 0.0
+            return {
+                "stage": self.name,
+                "items": self.items,
+                "busy_seconds": self.busy_seconds,
+                "elapsed_seconds": elapsed,
+                "throughput_per_second": self.items / elapsed if elapsed > 0 else 0.0,
+                "queue_depth": self.input_queue.qsize() if self.input_queue is not None else 0,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+class CollectionPipeline:
+    """一覧取得・詳細取得・保存の3段をスレッドとキューでつないだパイプライン
+
+    collector には fetch_prs(prs, executor, output_dir) と save_pr_to_file(pr_details, output_dir)、
+    pipeline_batch_size（詳細取得1回あたりのPR数）を持つオブジェクトを渡す。
+
+    priority を指定した場合は詳細取得キューを優先度付きキューにし、一覧で見つかったPRのうち
+    優先度の高いものから取得する（キューの長さは制限しない）。budget（CollectionBudget）を指定した場合は、
+    予算に達した時点で一覧の取得と新しい詳細取得を止め、取得しなかったPRを deferred に残す。
+    """
+
+    def __init__(self, collector, output_dir=None, workers=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 keep_details=True, pr_filter=None, on_saved=None, priority=None, budget=None):
+        """初期化
+
+        Args:
+            collector: PRCollector または互換のコレクター
+            output_dir: 保存先ディレクトリ
+            workers: 詳細取得のワーカー数（省略時は collector.max_workers）
+            queue_size: 各キューに保持する最大件数
+            keep_details: 戻り値にPRの詳細を含めるか（Falseの場合は番号と更新日時だけを残してメモリを抑える）
+            pr_filter: 一覧のページごとに適用するフィルター関数（増分更新で変更のないPRを除くなど）
+            on_saved: PRを保存するたびに pr_details を渡して呼ぶ関数（クロールジャーナルへの記録など）
+            priority: PRを受け取り優先順位（小さいほど先に取得する）を返す関数
+            budget: 時間とAPIリクエスト数の予算（CollectionBudget）
+        """
+        self.collector = collector
+        self.output_dir = output_dir
+        self.workers = max(1, workers or collector.max_workers)
+        self.batch_size = max(1, getattr(collector, "pipeline_batch_size", 1))
+        self.keep_details = keep_details
+        self.pr_filter = pr_filter
+        self.on_saved = on_saved
+        self.priority = priority
+        self.budget = budget
+
+        self.detail_queue = queue.PriorityQueue() if priority else queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "list": StageStats("list"),
+            "detail": StageStats("detail", self.detail_queue),
+            "write": StageStats("write", self.write_queue),
+        }
+
+        self._results = {}
+        self._results_lock = threading.Lock()
+        self._listed = 0
+        self._sequence = 0
+        self.deferred = []
+
+    def _put_detail(self, batch, key=()):
+        """詳細取得キューにバッチ（または _STOP）を入れる
+
+        優先度付きキューでは (区分, 優先順位, 通し番号, バッチ) の形で入れ、_STOP は常に最後に取り出されるようにする。
+        """
+        if self.priority:
+            self._sequence += 1
+            tier = 1 if batch is _STOP else 0
+            self.detail_queue.put((tier, key, self._sequence, batch))
+        else:
+            self.detail_queue.put(batch)
+
+    def _get_detail(self):
+        """詳細取得キューからバッチ（または _STOP）を取り出す"""
+        item = self.detail_queue.get()
+        return item[-1] if self.priority else item
+
+    def _list_stage(self, pr_pages):
+        """一覧のページを受け取り、batch_size 件ずつ詳細取得キューに流す"""
+        stats = self.stats["list"]
+        stats.start()
+        try:
+            page_iter = iter(pr_pages)
+            while not (self.budget and self.budget.exhausted):
+                started = time.monotonic()
+                try:
+                    prs = next(page_iter)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    print(f"PRリスト取得中にエラーが発生しました: {e}")
+                    break
+
+                if self.pr_filter:
+                    prs = self.pr_filter(prs)
+                indexed = [(self._listed + j, pr) for j, pr in enumerate(prs)]
+                self._listed += len(prs)
+                keys = {}
+                if self.priority:
+                    keys = {index: self.priority(pr) for index, pr in indexed}
+                    indexed.sort(key=lambda item: keys[item[0]])
+                stats.record(len(prs), time.monotonic() - started)
+
+                for i in range(0, len(indexed), self.batch_size):
+                    batch = indexed[i:i + self.batch_size]
+                    self._put_detail(batch, keys.get(batch[0][0], ()))
+                    self.stats["detail"].observe_queue()
+        finally:
+            for _ in range(self.workers):
+                self._put_detail(_STOP)
+            stats.finish()
+
+    def _detail_stage(self, executor):
+        """詳細取得キューからPRを取り出して詳細を取得し、保存キューに流す"""
+        stats = self.stats["detail"]
+        stats.start()
+        while True:
+            batch = self._get_detail()
+            if batch is _STOP:
+                break
+
+            prs = [pr for _, pr in batch]
+            if self.budget and not self.budget.can_start(len(batch)):
+                with self._results_lock:
+                    self.deferred.extend(prs)
+                continue
+
+            started = time.monotonic()
+            try:
+                results = self.collector.fetch_prs(prs, executor, self.output_dir)
+            except Exception as e:
+                print(f"PR #{prs[0]['number']}〜#{prs[-1]['number']} の取得中にエラーが発生しました: {e}")
+                results = [None] * len(batch)
+            elapsed = time.monotonic() - started
+            stats.record(len(batch), elapsed)
+            if self.budget:
+                self.budget.finish(len(batch), elapsed)
+
+            for (index, _), pr_details in zip(batch, results):
+                if pr_details:
+                    self.write_queue.put((index, pr_details))
+                    self.stats["write"].observe_queue()
+        stats.finish()
+
+    def _write_stage(self, progress):
+        """保存キューからPRを取り出してファイルに保存する"""
+        stats = self.stats["write"]
+        stats.start()
+        while True:
+            item = self.write_queue.get()
+            if item is _STOP:
+                break
+
+            index, pr_details = item
+            started = time.monotonic()
+            try:
+                self.collector.save_pr_to_file(pr_details, self.output_dir)
+                # on_saved（ジャーナルへの記録など）のエラーで保存段のスレッドを止めない
+                if self.on_saved:
+                    self.on_saved(pr_details)
+            except Exception as e:
+                print(f"PR #{pr_details['basic_info']['number']} の保存中にエラーが発生しました: {e}")
+                continue
+            finally:
+                stats.record(1, time.monotonic() - started)
+                progress.update(1)
+
+            with self._results_lock:
+                self._results[index] = pr_details if self.keep_details else self.summarize(pr_details)
+        stats.finish()
+
+    @staticmethod
+    def summarize(pr_details):
+        """メモリを抑えるため、PRの詳細を番号と状態と更新日時だけに縮める"""
+        return {
+            "basic_info": {"number": pr_details["basic_info"]["number"]},
+            "state": pr_details.get("state"),
+            "updated_at": pr_details.get("updated_at"),
+        }
+
+    def run(self, pr_pages, sub_executor=None):
+        """パイプラインを実行し、保存したPRを一覧の順序で返す
+
+        Args:
+            pr_pages: PRのリストを1ページずつ返すイテラブル
+            sub_executor: PR内のサブリソースを並列取得するためのExecutor
+        """
+        with tqdm(desc="PRデータ取得") as progress:
+            lister = threading.Thread(target=self._list_stage, args=(pr_pages,), name="pr-list")
+            detail_workers = [
+                threading.Thread(target=self._detail_stage, args=(sub_executor,), name=f"pr-detail-{i}")
+                for i in range(self.workers)
+            ]
+            writer = threading.Thread(target=self._write_stage, args=(progress,), name="pr-write")
+
+            writer.start()
+            for worker in detail_workers:
+                worker.start()
+            lister.start()
+
+            lister.join()
+            for worker in detail_workers:
+                worker.join()
+            self.write_queue.put(_STOP)
+            writer.join()
+
+        return [self._results[index] for index in sorted(self._results)]
+
+    @property
+    def listed_count(self):
+        """一覧から詳細取得に回したPRの数"""
+        return self._listed
+
+    def get_stats(self):
+        """各段の統計を取得する"""
+        return [stats.snapshot() for stats in self.stats.values()]
+
+    def print_stats(self):
+        """各段の統計を表示する"""
+        for stage in self.get_stats():
+            print(f"パイプライン[{stage['stage']}]: {stage['items']}件 / "
+                  f"{stage['throughput_per_second']:.1f}件/秒 / 最大キュー長 {stage['max_queue_depth']}")
@@ -2,41 +2,151 @@
 """
 PRデータ収集モジュール
 
-GitHubからPRデータを収集し、ファイルごとに保存します。
+GitHubからPRデータを収集し、data.storage_type に応じた保存先（既定ではPRごとのファイル）に保存します。
 """
 
 import datetime
-import json
-import os
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import yaml
-from tqdm import tqdm
 
+from .pipeline import DEFAULT_QUEUE_SIZE, CollectionPipeline
+from .scheduler import DEFAULT_RECENT_SECONDS, pr_priority
 from ..utils.github_api import (
     make_github_api_request,
     check_rate_limit,
-    wait_for_rate_limit_reset,
-    load_config
+    get_all_github_api_items,
+    get_credential_provider,
+    get_rate_limiter,
+    get_response_cache_stats,
+    get_session_stats,
 )
+from ..utils.metrics import get_metrics
+from ..utils.pr_projection import PRProjection
+from ..utils.pr_store import create_pr_store
+
+
+COLLECTOR_BACKENDS = ("rest", "graphql")
+# 件数を変えずに編集できるサブリソース（PRの更新日時が進んだ場合は since で編集されたものを取得する）
+EDITABLE_SUB_RESOURCES = ("comments", "review_comments")
+
+
+def to_utc(value):
+    """日時（ISO 8601の文字列またはdatetime）をUTCのdatetimeに変換する
+
+    タイムゾーンのない日時はローカル時刻とみなす（以前の last_run_info はローカル時刻で保存されていた）。
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(datetime.timezone.utc)
+
+
+def format_github_datetime(value):
+    """日時をGitHub APIのパラメータ形式（YYYY-MM-DDTHH:MM:SSZ）に変換する"""
+    return to_utc(value).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SubResourceError(Exception):
+    """PRのサブリソースの一部を取得できなかった場合の例外
+
+    pr_details には取得できた部分（呼び出し元で基本情報を補ったもの）を、failed には失敗したキーとエラーを持つ。
+    """
+
+    def __init__(self, pr_number, failed, partial):
+        self.pr_number = pr_number
+        self.failed = failed
+        self.pr_details = partial
+        names = ", ".join(failed)
+        super().__init__(f"PR #{pr_number} のサブリソース ({names}) を取得できませんでした")
+
+
+def merge_items_by_id(items, updates):
+    """IDの一致する項目を updates の値で置き換え、見つからない項目は末尾に追加する"""
+    positions = {item.get("id"): index for index, item in enumerate(items)}
+    merged = list(items)
+    for update in updates:
+        index = positions.get(update.get("id"))
+        if index is None:
+            positions[update.get("id")] = len(merged)
+            merged.append(update)
+        else:
+            merged[index] = update
+    return merged
+
+
+def create_collector(config=None, credentials=None):
+    """collectors.backend の設定に応じたコレクターを作成する"""
+    credentials = credentials or get_credential_provider()
+    config = config or credentials.get_config()
+    backend = config.get("collectors", {}).get("backend", "rest")
+    
+    if backend == "graphql":
+        from .graphql_collector import GraphQLPRCollector
+        return GraphQLPRCollector(config, credentials)
+    if backend != "rest":
+        raise ValueError(f"未対応のコレクターバックエンドです: {backend} (対応: {', '.join(COLLECTOR_BACKENDS)})")
+        
+    return PRCollector(config, credentials)
 
 
 class PRCollector:
     """PRデータを収集するクラス"""
     
-    def __init__(self, config=None):
-        """初期化"""
-        self.config = config or load_config()
+    # パイプラインで1回の詳細取得にまとめるPR数（RESTでは1件ずつ取得する。GraphQLのコレクターは設定から決める）
+    pipeline_batch_size = 1
+    
+    def __init__(self, config=None, credentials=None):
+        """初期化
+
+        Args:
+            config: 設定辞書（省略時はcredentialsから取得する）
+            credentials: APIヘッダーを提供するCredentialProvider（省略時はプロセス共有のもの）
+        """
+        self.credentials = credentials or get_credential_provider()
+        self.config = config or self.credentials.get_config()
         self.api_base_url = self.config["github"]["api_base_url"]
         self.repo_owner = self.config["github"]["repo_owner"]
         self.repo_name = self.config["github"]["repo_name"]
         
         self.storage_type = self.config["data"]["storage_type"]
         self.base_dir = Path(self.config["data"]["base_dir"])
+        self._stores = {}
+        self._store_lock = threading.Lock()
+        self.projection = PRProjection.from_config(self.config)
         
-        self.request_delay = self.config["api"]["request_delay"]
         self.rate_limit_wait = self.config["api"]["rate_limit_wait"]
+        self.max_workers = max(1, self.config.get("collectors", {}).get("max_workers", 1))
+        self.incremental = self.config.get("collectors", {}).get("incremental", False)
+        self.change_feed = self.config.get("collectors", {}).get("change_feed", False)
+        
+        self.pipeline_queue_size = self.config.get("collectors", {}).get("pipeline_queue_size", DEFAULT_QUEUE_SIZE)
+        self.prioritize = self.config.get("collectors", {}).get("prioritize", False)
+        self.recent_seconds = self.config.get("collectors", {}).get("recent_hours", DEFAULT_RECENT_SECONDS / 3600) * 3600
+        self.last_pipeline_stats = []
+        self.deferred_prs = []
+        self.changed_files = []
+        
+        self.refresh_stats = Counter()
+        self._refresh_lock = threading.Lock()
+        
+        # 取得に失敗したPR（{"pr", "pr_details", "missing"}）。収集の最後にまとめて取得し直す
+        self.retry_queue = []
+        self.failed_prs = []
+        self._retry_lock = threading.Lock()
+        
+    def _request(self, url, params=None):
+        """注入されたCredentialProviderでGitHub APIリクエストを実行する"""
+        return make_github_api_request(url, params=params, credentials=self.credentials)
+    
+    def _request_all(self, url, max_items=None, params=None):
+        """一覧APIの全ページを注入されたCredentialProviderで取得する"""
+        return get_all_github_api_items(url, params=params, max_items=max_items, credentials=self.credentials)
         
     def get_pull_requests(self, limit=None, sort_by="updated", direction="desc", last_updated_at=None, state="all"):
         """Pull Requestを取得する
@@ -49,91 +159,158 @@ class PRCollector:
             state: PRの状態 ("open", "closed", "all")
         """
         all_prs = []
-        page = 1
+        try:
+            for prs in self.iter_pull_request_pages(limit, sort_by, direction, last_updated_at, state):
+                all_prs.extend(prs)
+        except Exception as e:
+            print(f"PRリスト取得中にエラーが発生しました: {e}")
+        return all_prs
+    
+    def iter_pull_request_pages(self, limit=None, sort_by="updated", direction="desc", last_updated_at=None, state="all",
+                                start_page=1):
+        """Pull Requestの一覧を1ページずつ返すジェネレータ
+
+        引数は get_pull_requests と同じで、start_page から取得を始める。ページごとに1回 yield し、
+        取得に失敗した場合は一覧の終わりと区別できるよう例外を送出する。
+        """
+        page = start_page
         per_page = 100
+        count = 0
 
         while True:
             url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/pulls"
             params = {"state": state, "per_page": per_page, "page": page, "sort": sort_by, "direction": direction}
 
             try:
-                prs = make_github_api_request(url, params=params)
-                if not prs:
-                    break
-
-                if last_updated_at:
-                    new_prs = []
-                    for pr in prs:
-                        pr_updated_at = datetime.datetime.fromisoformat(pr["updated_at"].replace("Z", "+00:00"))
-                        if pr_updated_at <= last_updated_at:
-                            print(f"前回処理済みのPR #{pr['number']} (更新日時: {pr_updated_at}) に到達しました。処理を終了します。")
-                            break
-                        new_prs.append(pr)
-                    
-                    if len(new_prs) < len(prs):
-                        all_prs.extend(new_prs)
-                        print(f"差分更新: {len(new_prs)}件の新しいPRを見つけました")
+                prs = self._request(url, params=params)
+            except Exception as e:
+                raise RuntimeError(f"PRリストのページ {page} を取得できませんでした: {e}") from e
+                
+            if not prs:
+                return
+
+            reached_last_run = False
+            if last_updated_at:
+                new_prs = []
+                for pr in prs:
+                    pr_updated_at = to_utc(pr["updated_at"])
+                    if pr_updated_at <= to_utc(last_updated_at):
+                        print(f"前回処理済みのPR #{pr['number']} (更新日時: {pr_updated_at}) に到達しました。処理を終了します。")
+                        reached_last_run = True
                         break
+                    new_prs.append(pr)
                     
-                    all_prs.extend(new_prs)
-                else:
-                    print(f"全取得モード: ページ {page} で {len(prs)}件のPRを取得しました")
-                    all_prs.extend(prs)
+                if reached_last_run:
+                    print(f"差分更新: {count + len(new_prs)}件の新しいPRを見つけました")
+            else:
+                print(f"全取得モード: ページ {page} で {len(prs)}件のPRを取得しました")
+                new_prs = prs
 
-                page += 1
+            if limit:
+                new_prs = new_prs[:limit - count]
+            count += len(new_prs)
+            if new_prs:
+                yield new_prs
 
-                if limit and len(all_prs) >= limit:
-                    all_prs = all_prs[:limit]
-                    break
+            if reached_last_run or (limit and count >= limit):
+                return
+            page += 1
+    
+    def iter_changed_pr_pages(self, since, limit=None):
+        """since 以降に更新されたPRを issues API の変更フィードから1ページずつ返すジェネレータ
 
-                if page > 1 and self.request_delay > 0:
-                    time.sleep(self.request_delay)  # APIレート制限を考慮して少し待機
-                    
+        /issues?since=...&sort=updated&direction=asc をページ番号でたどると、取得中に更新されたPRが
+        末尾に移って後ろの項目が1つずつ前にずれ、次のページの先頭を取りこぼす。そのため各ページの
+        最後の更新日時を次の since にして1ページ目から取得し直し、同じ更新日時で取得済みの項目は除く。
+        同じ更新日時の項目が1ページを超える場合だけ、同じ since のままページ番号を進める。
+        一覧にはIssueも含まれるので、pull_request を持つものだけを {"number", "updated_at"} の形で返す。
+        ページごとに1回 yield し（PRを含まないページは空のリスト）、取得に失敗した場合は例外を送出する。
+        """
+        url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/issues"
+        cursor = format_github_datetime(since)
+        page = 1
+        seen = {}
+        count = 0
+
+        while True:
+            params = {
+                "state": "all",
+                "since": cursor,
+                "sort": "updated",
+                "direction": "asc",
+                "per_page": 100,
+                "page": page,
+            }
+            try:
+                items = self._request(url, params=params)
             except Exception as e:
-                print(f"PRリスト取得中にエラーが発生しました (ページ {page}): {e}")
-                break
+                raise RuntimeError(f"変更フィード (since={cursor}, ページ {page}) を取得できませんでした: {e}") from e
 
-        return all_prs
+            new_items = [item for item in items or [] if seen.get(item["number"]) != item["updated_at"]]
+            for item in new_items:
+                seen[item["number"]] = item["updated_at"]
+            prs = [
+                {"number": item["number"], "updated_at": item["updated_at"], "state": item.get("state")}
+                for item in new_items if "pull_request" in item
+            ]
+            if limit:
+                prs = prs[:limit - count]
+            count += len(prs)
+            print(f"変更フィード: since={cursor} のページ {page} で {len(new_items)}件中 {len(prs)}件のPRを見つけました")
+            yield prs
+
+            if not items or len(items) < params["per_page"] or (limit and count >= limit):
+                return
+            last_updated_at = items[-1]["updated_at"]
+            if last_updated_at == cursor:
+                # 1ページ全体が同じ更新日時の場合は since を進められないため、次のページを取得する
+                page += 1
+            else:
+                cursor = last_updated_at
+                page = 1
     
     def get_pr_by_number(self, pr_number):
         """PR番号を指定してPRの基本情報を取得する"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/pulls/{pr_number}"
         try:
-            return make_github_api_request(url)
+            return self._request(url)
         except Exception as e:
             if hasattr(e, 'response') and e.response.status_code == 404:
                 print(f"PR #{pr_number} は存在しません")
                 return None
             raise
     
-    def get_pr_comments(self, pr_number):
-        """PRのコメントを取得する"""
+    def get_pr_comments(self, pr_number, max_items=None, since=None):
+        """PRのコメントを取得する（since を指定した場合はその日時以降に作成・編集されたものだけ）"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/issues/{pr_number}/comments"
-        return make_github_api_request(url)
+        return self._request_all(url, max_items=max_items, params={"since": since} if since else None)
 
-    def get_pr_review_comments(self, pr_number):
-        """PRのレビューコメントを取得する"""
+    def get_pr_review_comments(self, pr_number, max_items=None, since=None):
+        """PRのレビューコメントを取得する（since を指定した場合はその日時以降に作成・編集されたものだけ）"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/pulls/{pr_number}/comments"
-        return make_github_api_request(url)
+        return self._request_all(url, max_items=max_items, params={"since": since} if since else None)
 
-    def get_pr_commits(self, pr_number):
+    def get_pr_commits(self, pr_number, max_items=None):
         """PRのコミット情報を取得する"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/pulls/{pr_number}/commits"
-        return make_github_api_request(url)
+        return self._request_all(url, max_items=max_items)
 
-    def get_pr_files(self, pr_number):
+    def get_pr_files(self, pr_number, max_items=None):
         """PRの変更ファイル情報を取得する"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/pulls/{pr_number}/files"
-        return make_github_api_request(url)
+        return self._request_all(url, max_items=max_items)
 
-    def get_pr_labels(self, pr_number):
+    def get_pr_labels(self, pr_number, max_items=None):
         """PRのラベル情報を取得する"""
         url = f"{self.api_base_url}/repos/{self.repo_owner}/{self.repo_name}/issues/{pr_number}/labels"
-        return make_github_api_request(url)
+        return self._request_all(url, max_items=max_items)
     
     def get_pr_details(self, pr_number, include_comments=True, include_review_comments=True, 
-                      include_commits=True, include_files=True, include_labels=True):
-        """PRの詳細情報を取得する（オプションで取得する情報を選択可能）"""
+                      include_commits=True, include_files=True, include_labels=True, executor=None):
+        """PRの詳細情報を取得する（オプションで取得する情報を選択可能）
+
+        executorを指定した場合、基本情報以外のサブリソースを並列に取得する。
+        """
         pr_data = self.get_pr_by_number(pr_number)
         if not pr_data:
             return None
@@ -143,93 +320,396 @@ class PRCollector:
             "state": pr_data["state"],  # open または closed
             "updated_at": pr_data["updated_at"],  # 更新日時を保存
         }
+        keys = [key for key, include in [
+            ("labels", include_labels),
+            ("comments", include_comments),
+            ("review_comments", include_review_comments),
+            ("commits", include_commits),
+            ("files", include_files),
+        ] if include]
+        try:
+            pr_details.update(self._fetch_sub_resources(pr_number, keys, executor))
+        except SubResourceError as e:
+            e.pr_details = dict(pr_details, **e.pr_details)
+            raise
 
-        if include_labels:
-            try:
-                pr_details["labels"] = self.get_pr_labels(pr_number)
-            except Exception as e:
-                print(f"PR #{pr_number} のラベル取得中にエラーが発生しました: {str(e)[:200]}")
-                pr_details["labels"] = []
+        return pr_details
+    
+    def _fetch_sub_resources(self, pr_number, keys, executor=None):
+        """指定したサブリソースを取得する
 
-        if include_comments:
-            try:
-                pr_details["comments"] = self.get_pr_comments(pr_number)
-            except Exception as e:
-                print(f"PR #{pr_number} のコメント取得中にエラーが発生しました: {str(e)[:200]}")
-                pr_details["comments"] = []
+        取得に失敗したサブリソースがあった場合は、空のリストで置き換えて保存データを壊さないよう、
+        取得できた分を持たせた SubResourceError を送出する。
+        """
+        sub_resources = [
+            ("labels", self.get_pr_labels, "ラベル"),
+            ("comments", self.get_pr_comments, "コメント"),
+            ("review_comments", self.get_pr_review_comments, "レビューコメント"),
+            ("commits", self.get_pr_commits, "コミット"),
+            ("files", self.get_pr_files, "ファイル"),
+        ]
+        sub_resources = [(key, fetch, name) for key, fetch, name in sub_resources if key in keys]
 
-        if include_review_comments:
-            try:
-                pr_details["review_comments"] = self.get_pr_review_comments(pr_number)
-            except Exception as e:
-                print(f"PR #{pr_number} のレビューコメント取得中にエラーが発生しました: {str(e)[:200]}")
-                pr_details["review_comments"] = []
+        futures = {}
+        if executor is not None:
+            futures = {key: executor.submit(fetch, pr_number) for key, fetch, _ in sub_resources}
 
-        if include_commits:
+        # 保存されるJSONのキー順序を一定に保つため、結果は常に同じ順序で格納する
+        results = {}
+        failed = {}
+        for key, fetch, name in sub_resources:
             try:
-                pr_details["commits"] = self.get_pr_commits(pr_number)
+                results[key] = futures[key].result() if key in futures else fetch(pr_number)
             except Exception as e:
-                print(f"PR #{pr_number} のコミット取得中にエラーが発生しました: {str(e)[:200]}")
-                pr_details["commits"] = []
+                print(f"PR #{pr_number} の{name}取得中にエラーが発生しました: {str(e)[:200]}")
+                failed[key] = e
 
-        if include_files:
+        if failed:
+            raise SubResourceError(pr_number, failed, results)
+        return results
+    
+    def get_store(self, output_dir=None):
+        """出力ディレクトリの保存先（data.storage_type に応じたもの）を取得する"""
+        directory = Path(output_dir or self.base_dir)
+        key = str(directory.resolve())
+        with self._store_lock:
+            if key not in self._stores:
+                self._stores[key] = create_pr_store(self.config, directory, self.storage_type)
+            return self._stores[key]
+    
+    def close_stores(self):
+        """開いた保存先の書き込みを確定してすべて閉じる"""
+        with self._store_lock:
+            stores = list(self._stores.values())
+            self._stores.clear()
+        for store in stores:
+            store.close()
+    
+    def pop_changed_files(self, output_dir=None):
+        """保存先の書き込みを確定し、前回の呼び出し以降に内容が変わったファイルのパスを返す"""
+        store = self.get_store(output_dir)
+        store.flush()
+        return store.changed_paths(store.pop_changes())
+    
+    def load_pr_from_file(self, pr_number, output_dir=None):
+        """保存済みのPRデータを読み込む（存在しないか読み込めない場合はNone）"""
+        return self.get_store(output_dir).load(pr_number)
+    
+    @staticmethod
+    def detect_changed_sub_resources(stored, basic_info):
+        """保存済みのPRデータと最新の基本情報を比べ、取得し直す必要のあるサブリソースを返す
+
+        コメント数・レビューコメント数・コミット数・変更ファイル数とheadのコミットを比較する。
+        ラベルは基本情報に含まれるため、変化していればAPIを呼ばずに基本情報の値を使う（"labels"は含めない）。
+        """
+        stored_info = stored.get("basic_info", {})
+        head_changed = stored_info.get("head", {}).get("sha") != basic_info.get("head", {}).get("sha")
+        
+        checks = [
+            ("comments", "comments", False),
+            ("review_comments", "review_comments", False),
+            ("commits", "commits", head_changed),
+            ("files", "changed_files", head_changed),
+        ]
+        
+        changed = []
+        for key, counter, extra_change in checks:
+            if (
+                key not in stored
+                or extra_change
+                or counter not in basic_info
+                or stored_info.get(counter) != basic_info[counter]
+                or len(stored[key]) != basic_info[counter]
+            ):
+                changed.append(key)
+        return changed
+    
+    @staticmethod
+    def detect_edited_sub_resources(stored, basic_info, changed=()):
+        """PRの更新日時が進んだのに件数の変わらないコメント・レビューコメントを返す
+
+        コメントの編集や、削除と追加が同時にあった場合は件数が変わらないため、changed に含まれない
+        保存済みのコメントがあるサブリソースは、保存時の更新日時以降に編集されたものを取得し直す必要がある。
+        """
+        stored_updated_at = stored.get("basic_info", {}).get("updated_at") or stored.get("updated_at")
+        if not stored_updated_at or stored_updated_at == basic_info.get("updated_at"):
+            return []
+        return [key for key in EDITABLE_SUB_RESOURCES if key not in changed and stored.get(key)]
+    
+    def _fetch_edited_items(self, pr_number, key, stored_items, since, expected_count):
+        """since 以降に作成・編集された項目を取得して保存済みの項目に統合する
+
+        統合した件数が基本情報の件数と合わない場合（削除があった場合）はNoneを返す。
+        """
+        fetch = self.get_pr_comments if key == "comments" else self.get_pr_review_comments
+        merged = merge_items_by_id(stored_items, fetch(pr_number, since=since))
+        return merged if len(merged) == expected_count else None
+    
+    def refresh_pr_details(self, pr_number, stored, executor=None):
+        """保存済みのPRデータのうち、変化したサブリソースだけを取得し直して統合する"""
+        pr_data = self.get_pr_by_number(pr_number)
+        if not pr_data:
+            return None
+        return self.merge_pr_data(stored, pr_data, executor=executor)
+    
+    def merge_pr_data(self, stored, pr_data, executor=None):
+        """保存済みのPRデータに最新の基本情報を統合し、変化したサブリソースだけを取得し直す"""
+        pr_number = pr_data["number"]
+        changed = self.detect_changed_sub_resources(stored, pr_data)
+        edited = self.detect_edited_sub_resources(stored, pr_data, changed)
+        since = stored.get("basic_info", {}).get("updated_at") or stored.get("updated_at")
+        
+        pr_details = dict(stored)
+        pr_details["basic_info"] = pr_data
+        pr_details["state"] = pr_data["state"]
+        pr_details["updated_at"] = pr_data["updated_at"]
+        if "labels" in pr_data:
+            pr_details["labels"] = pr_data["labels"]
+        updated = 0
+        for key in edited:
             try:
-                pr_details["files"] = self.get_pr_files(pr_number)
+                merged = self._fetch_edited_items(pr_number, key, stored[key], since, pr_data.get(key))
             except Exception as e:
-                print(f"PR #{pr_number} のファイル取得中にエラーが発生しました: {str(e)[:200]}")
-                pr_details["files"] = []
-
+                print(f"PR #{pr_number} の編集された{key}の取得中にエラーが発生しました: {str(e)[:200]}")
+                merged = None
+            if merged is None:
+                # 削除があったか取得できなかった場合はすべて取得し直す
+                changed.append(key)
+            else:
+                pr_details[key] = merged
+                updated += 1
+        try:
+            pr_details.update(self._fetch_sub_resources(pr_number, changed, executor))
+        except SubResourceError as e:
+            e.pr_details = dict(pr_details, **e.pr_details)
+            raise
+        
+        with self._refresh_lock:
+            self.refresh_stats["sub_resources_fetched"] += len(changed)
+            self.refresh_stats["sub_resources_updated"] += updated
+            self.refresh_stats["sub_resources_reused"] += 4 - len(changed) - updated
         return pr_details
     
+    def filter_unchanged_prs(self, prs, output_dir=None):
+        """一覧の更新日時が保存済みのPRデータと同じPRを除く（増分更新モード用）"""
+        changed_prs = []
+        for pr in prs:
+            stored = self.load_pr_from_file(pr["number"], output_dir)
+            if stored and pr.get("updated_at") and stored.get("updated_at") == pr["updated_at"]:
+                self.refresh_stats["unchanged"] += 1
+                continue
+            changed_prs.append(pr)
+        
+        if len(changed_prs) < len(prs):
+            print(f"増分更新: {len(prs) - len(changed_prs)}件のPRは変更がないためスキップします")
+        return changed_prs
+    
     def save_pr_to_file(self, pr_data, output_dir=None):
-        """PRデータを個別のJSONファイルに保存する"""
+        """PRデータを保存先（file_per_pr では個別のJSONファイル）に保存する
+
+        data.projection が有効な場合は、設定した項目だけを選んで保存する。
+        """
         if not pr_data or "basic_info" not in pr_data:
             print("保存するPRデータがありません")
             return False
-            
-        pr_number = pr_data["basic_info"]["number"]
-        output_dir = output_dir or self.base_dir
         
-        os.makedirs(output_dir, exist_ok=True)
-        
-        filename = f"{pr_number}.json"
-        filepath = Path(output_dir) / filename
+        if self.projection:
+            self.projection.archive(pr_data, output_dir or self.base_dir)
+            pr_data = self.projection.apply(pr_data)
+        return self.get_store(output_dir).save(pr_data)
+    
+    def _fetch_pr_details(self, pr, executor=None, output_dir=None, stored=None):
+        """1件のPRの詳細を取得する（増分更新モードでは保存済みのデータとの差分だけを取得する）
+
+        stored には読み込み済みの保存済みデータを渡せる（省略時は増分更新モードの場合に読み込む）。
+        """
+        pr_number = pr["number"]
+        if stored is None and self.incremental:
+            stored = self.load_pr_from_file(pr_number, output_dir)
+        if stored:
+            return self.refresh_pr_details(pr_number, stored, executor=executor)
+        return self.get_pr_details(pr_number, executor=executor)
+    
+    def _fetch_pr(self, pr, executor=None, output_dir=None, stored=None):
+        """1件のPRの詳細を取得する（エラーはPR単位で閉じ込め、失敗したPRは再取得キューに入れる）"""
+        try:
+            return self._fetch_pr_details(pr, executor, output_dir, stored)
+        except SubResourceError as e:
+            print(f"PR #{pr['number']} は一部のサブリソースを取得できなかったため、後で取得し直します")
+            self.queue_retry(pr, e.pr_details, list(e.failed))
+        except Exception as e:
+            print(f"PR #{pr['number']} の処理中にエラーが発生しました: {e}")
+            self.queue_retry(pr)
+        return None
+    
+    def queue_retry(self, pr, pr_details=None, missing=None):
+        """取得に失敗したPRを再取得キューに入れる
+
+        pr_details と missing を指定した場合は、再取得のときに missing のサブリソースだけを取得して補う。
+        """
+        with self._retry_lock:
+            self.retry_queue.append({"pr": pr, "pr_details": pr_details, "missing": missing or []})
+    
+    def retry_failed_prs(self, output_dir=None, executor=None, on_saved=None, budget=None):
+        """再取得キューのPRを取得し直して保存する（保存したPRデータのリストを返す）
+
+        一部のサブリソースだけ失敗したPRは、そのサブリソースだけを取得する。
+        再取得にも失敗したPRと、budget に達したため取得し直さなかったPRの番号は failed_prs に残す。
+        """
+        with self._retry_lock:
+            entries, self.retry_queue = self.retry_queue, []
+        if not entries:
+            return []
         
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(pr_data, f, ensure_ascii=False, indent=2)
+        print(f"取得に失敗した{len(entries)}件のPRを取得し直します")
+        saved = []
+        for entry in entries:
+            pr_number = entry["pr"]["number"]
+            if budget and not budget.can_start(1):
+                with self._retry_lock:
+                    self.failed_prs.append(pr_number)
+                continue
+            started = time.monotonic()
+            try:
+                if entry["pr_details"] is not None:
+                    pr_details = dict(entry["pr_details"])
+                    pr_details.update(self._fetch_sub_resources(pr_number, entry["missing"], executor))
+                else:
+                    pr_details = self._fetch_pr_details(entry["pr"], executor, output_dir)
+            except Exception as e:
+                print(f"PR #{pr_number} を取得し直せませんでした: {e}")
+                with self._retry_lock:
+                    self.failed_prs.append(pr_number)
+                continue
+            finally:
+                if budget:
+                    budget.finish(1, time.monotonic() - started)
             
-        print(f"PR #{pr_number} のデータを {filepath} に保存しました")
-        return True
+            if pr_details and self.save_pr_to_file(pr_details, output_dir):
+                if on_saved:
+                    on_saved(pr_details)
+                saved.append(pr_details)
+        
+        print(f"再取得: {len(saved)}件を保存し、{len(entries) - len(saved)}件は取得できませんでした")
+        return saved
     
-    def update_pr_data(self, limit=None, last_updated_at=None, output_dir=None):
-        """PRデータを更新する"""
-        remaining, reset_time = check_rate_limit()
-        if remaining < 100 and self.rate_limit_wait:
-            print(f"API制限が残り少ないため ({remaining} リクエスト)、リセット時間まで待機します")
-            wait_for_rate_limit_reset(reset_time)
+    def fetch_prs(self, prs, executor=None, output_dir=None):
+        """複数のPRの詳細を取得する（パイプラインの詳細取得段から呼ばれる）"""
+        return [self._fetch_pr(pr, executor, output_dir) for pr in prs]
+    
+    def update_pr_data(self, limit=None, last_updated_at=None, output_dir=None, keep_details=True, journal=None,
+                       budget=None):
+        """PRデータを更新する
+
+        PR一覧の取得・詳細の取得・保存をパイプラインで並行して行い、一覧の最初のページが届いた時点で
+        詳細の取得を始める。詳細の取得は collectors.max_workers のワーカーで並列に実行する。
+        戻り値の順序はPR一覧の順序と一致する。keep_details=False の場合は番号と更新日時だけを返す。
+        collectors.change_feed が有効で last_updated_at がある場合は、issues API の変更フィードで更新されたPRを探す。
+        journal（CrawlJournal）を指定した場合は進行状況を記録し、ジャーナルが途中のものであれば続きから再開する。
+        budget（CollectionBudget）を指定した場合は予算に達した時点で新しい取得を止め、取得しなかったPRを
+        deferred_prs に残す（journal があれば未完了のまま次回に持ち越す）。
+        collectors.prioritize が有効な場合は、オープンなPR・最近更新されたPR・データの欠けたPRの順に取得する。
+        """
+        # 現在の残り予算をスケジューラーに反映する（以降の待機はレスポンスヘッダーに基づいて行う）
+        check_rate_limit(self.credentials)
         
         print("最新のPRを取得しています...")
-        prs = self.get_pull_requests(limit=limit, last_updated_at=last_updated_at)
-        print(f"{len(prs)}件の新しいPRを取得しました")
+        start_page = 1
+        if journal:
+            start_page = journal.next_page
+            if limit:
+                limit -= journal.listed_count
+        if limit is not None and limit <= 0:
+            # 再開前のクロールで取得上限まで一覧を取得済み
+            pages = []
+        elif last_updated_at and self.change_feed:
+            # 変更フィードはページ番号ではなく更新日時で再開する（取得済みのPRはジャーナルで除く）
+            since = to_utc(journal.max_updated_at) if journal and journal.max_updated_at else last_updated_at
+            pages = self.iter_changed_pr_pages(since, limit=limit)
+        else:
+            pages = self.iter_pull_request_pages(limit=limit, last_updated_at=last_updated_at, start_page=start_page)
+        if journal:
+            pages = journal.track_pages(pages)
+        updated_prs = self._run_pipeline(pages, output_dir, keep_details, journal, budget)
         
-        if not prs:
+        if not updated_prs:
             print("更新するPRがありません")
-            return []
+        self._print_connection_stats()
+        
+        return updated_prs
+    
+    def collect_prs(self, prs, output_dir=None, keep_details=True):
+        """PR一覧の各PRの詳細を取得して保存する（戻り値の順序はPR一覧の順序と一致する）"""
+        return self._run_pipeline([prs], output_dir, keep_details)
+    
+    def priority_key(self, pr, output_dir=None, now=None):
+        """PRの詳細取得の優先順位（小さいほど先に取得する）"""
+        return pr_priority(
+            pr, now=now, load_stored=lambda pr_number: self.load_pr_from_file(pr_number, output_dir),
+            recent_seconds=self.recent_seconds,
+        )
+    
+    def _run_pipeline(self, pr_pages, output_dir=None, keep_details=True, journal=None, budget=None):
+        """PRのページ列を収集パイプラインに流す"""
+        def pr_filter(prs):
+            if journal:
+                prs = journal.skip_completed(prs)
+            if self.incremental:
+                prs = self.filter_unchanged_prs(prs, output_dir)
+            if journal:
+                journal.add_pending(prs)
+            return prs
+        
+        on_saved = (lambda pr_details: journal.mark_completed(pr_details["basic_info"]["number"])) if journal else None
+        now = time.time()
+        priority = (lambda pr: self.priority_key(pr, output_dir, now)) if self.prioritize else None
+        pipeline = CollectionPipeline(
+            self, output_dir, queue_size=self.pipeline_queue_size, keep_details=keep_details,
+            pr_filter=pr_filter, on_saved=on_saved, priority=priority, budget=budget,
+        )
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as sub_executor:
+            executor = sub_executor if self.max_workers > 1 else None
+            updated_prs = pipeline.run(pr_pages, executor)
+            retried = self.retry_failed_prs(output_dir, executor, on_saved, budget)
+        updated_prs.extend(retried if keep_details else [CollectionPipeline.summarize(pr) for pr in retried])
+        self.changed_files = self.pop_changed_files(output_dir)
+        self.deferred_prs = pipeline.deferred
+        if self.deferred_prs:
+            print(f"予算に達したため、{len(self.deferred_prs)}件のPRを次回に持ち越します")
+        if journal:
+            journal.settle(deferred=[pr["number"] for pr in self.deferred_prs])
             
-        updated_prs = []
-        for pr in tqdm(prs, desc="PRデータ取得"):
-            try:
-                pr_number = pr["number"]
-                pr_details = self.get_pr_details(pr_number)
-                
-                if pr_details:
-                    self.save_pr_to_file(pr_details, output_dir)
-                    updated_prs.append(pr_details)
-                    
-                if self.request_delay > 0:
-                    time.sleep(self.request_delay)
-                    
-            except Exception as e:
-                print(f"PR #{pr['number']} の処理中にエラーが発生しました: {e}")
-                
+        print(f"{pipeline.listed_count}件のPRを取得対象とし、{len(updated_prs)}件を保存しました"
+              f"（内容が変わったファイル: {len(self.changed_files)}件）")
+        pipeline.print_stats()
+        self.last_pipeline_stats = pipeline.get_stats()
+        metrics = get_metrics()
+        for stage_stats in self.last_pipeline_stats:
+            metrics.record_stage(
+                f"collect.{stage_stats['stage']}", stage_stats["elapsed_seconds"], stage_stats["items"]
+            )
         return updated_prs
+
+    def _print_connection_stats(self):
+        """HTTP接続とレスポンスキャッシュの統計を表示する"""
+        if self.incremental:
+            print(f"増分更新: 変更なし {self.refresh_stats['unchanged']}件 / "
+                  f"サブリソース再取得 {self.refresh_stats['sub_resources_fetched']}件・"
+                  f"編集分の取得 {self.refresh_stats['sub_resources_updated']}件・"
+                  f"再利用 {self.refresh_stats['sub_resources_reused']}件")
+        stats = get_session_stats()
+        print(f"HTTP接続: {stats['requests']}リクエスト / 新規接続 {stats['new_connections']}件 "
+              f"(再利用率 {stats['reuse_ratio']:.1%})")
+        rate_stats = get_rate_limiter().get_stats()
+        print(f"レート制限による待機: {rate_stats['wait_count']}回 / 合計 {rate_stats['total_wait_seconds']:.1f}秒")
+        token_pool = self.credentials.get_token_pool()
+        if token_pool is not None:
+            for token_stats in token_pool.get_stats():
+                status = f"隔離中 ({token_stats['quarantine_reason']})" if token_stats["quarantined"] else "利用可能"
+                print(f"トークン {token_stats['token']}: {token_stats['requests']}リクエスト / "
+                      f"残り {token_stats['remaining']} / {status}")
+        cache_stats = get_response_cache_stats()
+        if cache_stats:
+            print(f"レスポンスキャッシュ: ヒット {cache_stats['hits']}件 / ミス {cache_stats['misses']}件 "
+                  f"(ヒット率 {cache_stats['hit_ratio']:.1%}, {cache_stats['entries']}エントリ)")
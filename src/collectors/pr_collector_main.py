@@ -3,18 +3,26 @@
 PRデータ収集スクリプト
 
 GitHub APIを使用してPRデータを収集し、ファイルごとに保存します。
+複数のリポジトリを指定した場合は、1つのプロセスで同時に収集し、レート制限の予算を共有します。
 """
 
 import argparse
+import copy
 import datetime
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.collectors.pr_collector import PRCollector
-from src.utils.github_api import load_config
+from src.collectors.crawl_journal import CrawlJournal
+from src.collectors.pr_collector import create_collector, to_utc
+from src.collectors.repositories import repository_configs, repository_name
+from src.collectors.scheduler import CollectionBudget
+from src.utils import json_codec
+from src.utils.github_api import get_credential_provider, get_rate_limiter, get_session_stats
+from src.utils.metrics import SUMMARY_FILENAME, get_metrics
 
 
 def parse_arguments():
@@ -24,7 +32,12 @@ def parse_arguments():
         "--limit", type=int, default=0, help="取得するPRの最大数（0は無制限）"
     )
     parser.add_argument(
-        "--output-dir", type=str, help="出力ディレクトリ（設定ファイルの値を上書き）"
+        "--output-dir", type=str,
+        help="出力ディレクトリ（設定ファイルの値を上書き）。複数のリポジトリを収集する場合はリポジトリごとのディレクトリの親"
+    )
+    parser.add_argument(
+        "--repo", type=str, action="append",
+        help="収集するリポジトリ（owner/name、複数回指定可。設定ファイルの repositories を上書き）"
     )
     parser.add_argument(
         "--state", type=str, default="all", choices=["open", "closed", "all"],
@@ -34,74 +47,213 @@ def parse_arguments():
         "--force-full", action="store_true",
         help="前回の実行情報を無視して全PRを取得する"
     )
+    parser.add_argument(
+        "--no-incremental", action="store_true",
+        help="保存済みのPRデータを再利用せず、すべてのサブリソースを取得し直す"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="途中で止まった前回のクロールをクロールジャーナルから再開する"
+    )
+    parser.add_argument(
+        "--deadline-minutes", type=float,
+        help="この分数を過ぎる前に新しいPRの取得を止め、残りを次回に持ち越す（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--request-budget", type=int,
+        help="この実行で使うAPIリクエスト数の上限（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--changed-files", type=str,
+        help="内容が変わったPRデータのファイルのパスを1行ずつ書き出すファイル（git add --pathspec-from-file 用）"
+    )
     return parser.parse_args()
 
 
-def main():
-    """メイン関数"""
-    args = parse_arguments()
-    
-    config = load_config()
-    
-    output_dir = args.output_dir
-    if not output_dir:
-        output_dir = Path(config["data"]["base_dir"]).resolve()
-    else:
-        output_dir = Path(output_dir).resolve()
-    
-    collector = PRCollector(config)
+def collect_repository(config, credentials, output_dir, args, budget, changed_files=None):
+    """1つのリポジトリのPRデータを収集する（終了コードを返す）
+
+    changed_files（リスト）を指定した場合は、内容が変わって書き込んだファイルのパスを追加する。
+    """
+    collector = create_collector(config, credentials)
+    try:
+        return run_collection(collector, output_dir, args, budget, changed_files)
+    finally:
+        collector.close_stores()
+
+
+def run_collection(collector, output_dir, args, budget, changed_files=None):
+    """collector で出力ディレクトリにPRデータを収集する（終了コードを返す）"""
+    print(f"{collector.repo_owner}/{collector.repo_name} のPRデータを {output_dir} に収集します")
     
     last_run_file = Path(output_dir) / "last_run_info.json"
+    journal_file = CrawlJournal.path_for(output_dir)
     last_updated_at = None
+    carry_over = []
+    limit = args.limit if args.limit > 0 else None
+    
+    journal = CrawlJournal.load(journal_file)
+    if journal and journal.is_finished:
+        journal = None
     
-    if args.force_full:
-        print("--force-full オプションが指定されました。全PRを取得します。")
-        last_updated_at = None
-    elif last_run_file.exists():
-        import json
-        try:
-            with open(last_run_file, encoding="utf-8") as f:
-                last_run_info = json.load(f)
-                last_updated_at = datetime.datetime.fromisoformat(last_run_info["last_updated_at"])
-                print(f"前回の実行情報を読み込みました: 最終更新日時 = {last_updated_at}")
-                print(f"差分更新モードで実行します (since: {last_updated_at})")
-        except Exception as e:
-            print(f"前回の実行情報の読み込み中にエラーが発生しました: {e}")
-            print("エラー: 前回の実行情報ファイルが破損しています。--force-full オプションを使用して全取得を実行してください。")
-            return 1
+    if args.resume and journal:
+        summary = journal.get_summary()
+        print(f"クロールジャーナルから再開します (開始日時: {summary['started_at']}, "
+              f"取得済みページ: {summary['last_listed_page']}, 保存済み: {summary['completed']}件, "
+              f"未完了: {summary['pending'] + summary['failed']}件)")
+        last_updated_at = journal.last_updated_at
+        limit = journal.limit
     else:
-        existing_pr_files = list(Path(output_dir).glob("*.json"))
-        if existing_pr_files and not args.force_full:
-            print(f"エラー: 既存のPRデータファイルが見つかりましたが、前回の実行情報ファイル {last_run_file.absolute()} が存在しません。")
-            print("--force-full オプションを使用して明示的に全取得を実行してください。")
-            return 1
+        if args.resume:
+            print(f"再開できるクロールジャーナルが見つかりませんでした: {journal_file.absolute()}")
+        elif journal:
+            print(f"前回のクロールは完了していません。--resume オプションで続きから再開できます: {journal_file.absolute()}")
+            print("新しいクロールを開始します")
+        journal = None
+        
+        if args.force_full:
+            print("--force-full オプションが指定されました。全PRを取得します。")
+            last_updated_at = None
+        elif last_run_file.exists():
+            try:
+                last_run_info = json_codec.load_file(last_run_file)
+                # PRが1件も見つかっていない場合は最終更新日時が記録されない（以前の形式では null）
+                watermark = last_run_info.get("last_updated_at")
+                last_updated_at = to_utc(watermark) if watermark else None
+                # 前回取得できなかったPRは更新日時が最終更新日時より前でも取得し直す
+                carry_over = last_run_info.get("failed_prs", [])
+                if last_updated_at:
+                    print(f"前回の実行情報を読み込みました: 最終更新日時 = {last_updated_at}")
+                    print(f"差分更新モードで実行します (since: {last_updated_at})")
+                else:
+                    print("前回の実行情報に最終更新日時がないため、全取得モードで実行します")
+            except Exception as e:
+                print(f"前回の実行情報の読み込み中にエラーが発生しました: {e}")
+                print("エラー: 前回の実行情報ファイルが破損しています。--force-full オプションを使用して全取得を実行してください。")
+                return 1
         else:
-            print(f"前回の実行情報が見つかりませんでした: {last_run_file.absolute()}")
-            print("初回実行として全取得モードで実行します")
+            existing_prs = collector.get_store(output_dir).numbers()
+            if existing_prs and not args.force_full:
+                print(f"エラー: 既存のPRデータファイルが見つかりましたが、前回の実行情報ファイル {last_run_file.absolute()} が存在しません。")
+                print("--force-full オプションを使用して明示的に全取得を実行してください。")
+                return 1
+            else:
+                print(f"前回の実行情報が見つかりませんでした: {last_run_file.absolute()}")
+                print("初回実行として全取得モードで実行します")
+        
+        if carry_over:
+            print(f"前回取得できなかった{len(carry_over)}件のPRを取得し直します")
+        journal = CrawlJournal.start(journal_file, limit=limit, last_updated_at=last_updated_at, carry_over=carry_over)
     
-    updated_prs = collector.update_pr_data(
-        limit=args.limit if args.limit > 0 else None,
-        last_updated_at=last_updated_at,
-        output_dir=output_dir
-    )
+    with get_metrics().stage("collect") as stage:
+        updated_prs = collector.update_pr_data(
+            limit=limit,
+            last_updated_at=last_updated_at,
+            output_dir=output_dir,
+            keep_details=False,
+            journal=journal,
+            budget=None if budget.unlimited else budget
+        )
+        stage["items"] = len(updated_prs)
+    if changed_files is not None:
+        changed_files.extend(collector.changed_files)
     
-    if updated_prs:
-        now = datetime.datetime.now()
-        last_run_info = {
-            "last_updated_at": now.isoformat(),
-            "timestamp": now.isoformat(),
-            "updated_count": len(updated_prs)
-        }
-        
-        os.makedirs(last_run_file.parent, exist_ok=True)
-        with open(last_run_file, "w", encoding="utf-8") as f:
-            import json
-            json.dump(last_run_info, f, ensure_ascii=False, indent=2)
-        print(f"最後の実行情報を {last_run_file} に保存しました")
+    if budget.exhausted:
+        journal.save()
+        summary = journal.get_summary()
+        print(f"予算 ({budget.exhausted_reason}) に達したため収集を中断しました。"
+              f"残りの{summary['pending'] + summary['failed']}件のPRと未取得の一覧は --resume で次回に取得します")
+        return 0
+    
+    if not journal.listing_done:
+        print("PR一覧の取得が完了しませんでした。--resume オプションで続きから再開できます")
+        return 1
+    
+    failed_prs = journal.failed_prs()
+    if failed_prs:
+        print(f"{len(failed_prs)}件のPRを取得できませんでした。次回の実行で取得し直します")
+    journal.finish()
+    
+    # 次回は一覧で見つかった最大の更新日時以降を取得する（見つからなかった場合は前回の値を引き継ぐ）
+    watermark = journal.max_updated_at or last_updated_at
+    last_run_info = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "updated_count": len(updated_prs),
+        "failed_prs": failed_prs,
+    }
+    if watermark:
+        # まだPRが見つかっていない場合は記録せず、次回も全取得モードで実行する
+        last_run_info = {"last_updated_at": to_utc(watermark).isoformat(), **last_run_info}
+    
+    os.makedirs(last_run_file.parent, exist_ok=True)
+    json_codec.dump_file(last_run_info, last_run_file)
+    print(f"最後の実行情報を {last_run_file} に保存しました")
     
     print(f"合計 {len(updated_prs)} 件のPRを更新しました")
     return 0
 
 
+def collect_repository_safely(config, credentials, args, budget, changed_files=None):
+    """1つのリポジトリのPRデータを収集する（エラーはリポジトリ単位で閉じ込める）"""
+    output_dir = Path(config["data"]["base_dir"]).resolve()
+    try:
+        return collect_repository(config, credentials, output_dir, args, budget, changed_files)
+    except Exception as e:
+        print(f"{repository_name(config)} の収集中にエラーが発生しました: {e}")
+        return 1
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+    
+    credentials = get_credential_provider()
+    config = credentials.get_config()
+    if args.no_incremental:
+        # 共有の設定は他の呼び出し元も使うため、書き換えずにコピーに反映する
+        config = copy.deepcopy(config)
+        config.setdefault("collectors", {})["incremental"] = False
+    
+    # 期限はスクリプトの開始時点から数える。複数のリポジトリを収集する場合も期限とリクエスト数の上限は全体で共有する
+    collectors_config = config.get("collectors", {})
+    deadline_minutes = args.deadline_minutes or collectors_config.get("deadline_minutes")
+    request_budget = args.request_budget or collectors_config.get("request_budget")
+    budget = CollectionBudget.from_minutes(
+        deadline_minutes, request_budget, request_counter=lambda: get_session_stats()["requests"]
+    )
+    
+    output_dir = Path(args.output_dir or config["data"]["base_dir"]).resolve()
+    repo_configs = repository_configs(config, args.repo, output_dir)
+    changed_files = []
+    
+    if len(repo_configs) == 1:
+        exit_code = collect_repository_safely(repo_configs[0], credentials, args, budget, changed_files)
+        metrics_dir = Path(repo_configs[0]["data"]["base_dir"]).resolve()
+    else:
+        # すべてのリポジトリを同時に収集し、レート制限の予算はリポジトリごとに公平に割り当てる
+        print(f"{len(repo_configs)}件のリポジトリを同時に収集します: "
+              f"{', '.join(repository_name(repo_config) for repo_config in repo_configs)}")
+        with ThreadPoolExecutor(max_workers=len(repo_configs)) as executor:
+            exit_codes = list(executor.map(
+                lambda repo_config: collect_repository_safely(repo_config, credentials, args, budget, changed_files),
+                repo_configs
+            ))
+        exit_code = max(exit_codes)
+        metrics_dir = output_dir
+        print(f"リポジトリごとのトークンの取得数: {get_rate_limiter().get_stats()['tenants']}")
+    
+    get_metrics().write(metrics_dir)
+    print(f"実行メトリクスを {metrics_dir / SUMMARY_FILENAME} に保存しました")
+    
+    if args.changed_files:
+        changed_files_path = Path(args.changed_files)
+        os.makedirs(changed_files_path.parent, exist_ok=True)
+        paths = sorted(set(map(str, changed_files)))
+        with open(changed_files_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{path}\n" for path in paths)
+        print(f"内容が変わった{len(paths)}件のファイルの一覧を {changed_files_path} に保存しました")
+    return exit_code
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+収集対象リポジトリ管理モジュール
+
+設定ファイルの repositories（またはコマンドラインで指定したリポジトリ）から、
+リポジトリごとの出力先ディレクトリとレポートの出力先を持つ設定を作成します。
+"""
+
+import copy
+from pathlib import Path
+
+
+def parse_repository(value):
+    """"owner/name" 形式の文字列を (owner, name) に分ける"""
+    owner, _, name = str(value).strip().partition("/")
+    if not owner or not name or "/" in name:
+        raise ValueError(f"リポジトリは owner/name の形式で指定してください: {value}")
+    return owner, name
+
+
+def repository_name(config):
+    """設定の収集対象リポジトリを "owner/name" 形式で返す"""
+    return f"{config['github']['repo_owner']}/{config['github']['repo_name']}"
+
+
+def is_multi_repository(config, repositories=None):
+    """複数のリポジトリを収集する設定か（コマンドラインで指定した場合も含む）"""
+    return bool(repositories or config.get("repositories"))
+
+
+def repository_configs(config, repositories=None, base_dir=None):
+    """リポジトリごとの設定のリストを作成する
+
+    repositories（"owner/name" のリスト）を省略した場合は設定ファイルの repositories を使い、
+    それもない場合は github.repo_owner / repo_name の1つだけを対象にする。
+    各リポジトリのPRデータは base_dir（省略時は data.base_dir）/owner/name に、レポートは
+    data.reports_dir/owner/name に保存する（設定ファイルの repositories で base_dir と reports_dir を指定した場合はその値）。
+    """
+    root_base_dir = Path(base_dir or config["data"]["base_dir"])
+    if not is_multi_repository(config, repositories):
+        repo_config = copy.deepcopy(config)
+        repo_config["data"]["base_dir"] = str(root_base_dir)
+        return [repo_config]
+
+    entries = [{"repo": repo} for repo in repositories] if repositories else config["repositories"]
+    root_reports_dir = Path(config["data"]["reports_dir"])
+
+    repo_configs = []
+    seen = set()
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"repo": entry}
+        owner, name = parse_repository(entry["repo"])
+        if (owner, name) in seen:
+            continue
+        seen.add((owner, name))
+
+        repo_config = copy.deepcopy(config)
+        repo_config.pop("repositories", None)
+        repo_config["github"]["repo_owner"] = owner
+        repo_config["github"]["repo_name"] = name
+        repo_config["data"]["base_dir"] = str(entry.get("base_dir") or root_base_dir / owner / name)
+        repo_config["data"]["reports_dir"] = str(entry.get("reports_dir") or root_reports_dir / owner / name)
+        repo_configs.append(repo_config)
+    return repo_configs
+
+
+def load_repository_prs(repo_configs, load_directory):
+    """すべてのリポジトリのPRデータを読み込み、どのリポジトリのPRかを "repository" に記録する
+
+    load_directory にはディレクトリからPRデータのリストを読み込む関数を渡す。
+    PR番号はリポジトリごとに振られるため、リポジトリをまたいだレポートではPR番号と一緒にリポジトリ名を表示する。
+    """
+    all_prs = []
+    for repo_config in repo_configs:
+        repository = repository_name(repo_config)
+        for pr_data in load_directory(repo_config["data"]["base_dir"]):
+            if pr_data:
+                pr_data["repository"] = repository
+                all_prs.append(pr_data)
+    return all_prs
+
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+収集スケジューラーモジュール
+
+詳細を取得するPRの優先順位と、1回の収集で使える時間・APIリクエスト数の予算を扱います。
+予算を使い切る前に新しいPRの取得を止め、残りのPRはクロールジャーナルで次回に持ち越します。
+"""
+
+import datetime
+import threading
+import time
+
+from ..utils.pr_store import SUB_RESOURCE_KEYS
+
+
+DEFAULT_RECENT_SECONDS = 24 * 3600
+# 実績がまだないときに見込む1件あたりのリクエスト数（基本情報 + サブリソース5種）
+DEFAULT_REQUESTS_PER_PR = 6
+
+TIER_OPEN = 0
+TIER_RECENT = 1
+TIER_INCOMPLETE = 2
+TIER_OTHER = 3
+
+
+def _timestamp(value):
+    """GitHub APIの日時文字列をUNIX時間に変換する（値がない場合は0）"""
+    if not value:
+        return 0.0
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def has_missing_sub_resources(stored):
+    """保存済みのPRデータがないか、サブリソースの一部が欠けているか"""
+    return not stored or any(key not in stored for key in SUB_RESOURCE_KEYS)
+
+
+def pr_priority(pr, now=None, load_stored=None, recent_seconds=DEFAULT_RECENT_SECONDS):
+    """PRの詳細取得の優先順位を返す（小さいほど先に取得する）
+
+    オープンなPR、recent_seconds 以内に更新されたPR、保存済みのデータがないかサブリソースが欠けているPR、
+    その他のPRの順に並べ、同じ区分の中では更新日時の新しい順にする。
+    load_stored にはPR番号から保存済みのPRデータを返す関数を渡す（3番目の区分の判定にだけ使う）。
+    """
+    now = time.time() if now is None else now
+    updated = _timestamp(pr.get("updated_at"))
+
+    if pr.get("state") == "open":
+        tier = TIER_OPEN
+    elif now - updated <= recent_seconds:
+        tier = TIER_RECENT
+    elif load_stored is not None and has_missing_sub_resources(load_stored(pr["number"])):
+        tier = TIER_INCOMPLETE
+    else:
+        tier = TIER_OTHER
+    return (tier, -updated, -pr["number"])
+
+
+class CollectionBudget:
+    """1回の収集で使える時間とAPIリクエスト数の予算
+
+    詳細取得を始める前に can_start() で、これまでの実績から見込んだ所要時間とリクエスト数が
+    予算に収まるかを確認する。収まらない場合は新しい取得を始めず、以降の呼び出しも常に False を返す。
+    """
+
+    def __init__(self, deadline=None, max_requests=None, request_counter=None, clock=time.monotonic):
+        """初期化
+
+        Args:
+            deadline: 新しい取得を始めてよい最終時刻（clock と同じ基準の秒数、Noneは無制限）
+            max_requests: 使ってよいAPIリクエスト数（Noneは無制限）
+            request_counter: これまでのAPIリクエスト数を返す関数（max_requests を指定する場合は必須）
+            clock: 現在時刻を返す関数
+        """
+        if max_requests is not None and request_counter is None:
+            raise ValueError("max_requests を指定する場合は request_counter が必要です")
+
+        self.deadline = deadline
+        self.max_requests = max_requests
+        self._request_counter = request_counter
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._initial_requests = request_counter() if request_counter else 0
+        self._completed_items = 0
+        self._busy_seconds = 0.0
+        self._in_flight = 0
+        self.exhausted_reason = None
+
+    @classmethod
+    def from_minutes(cls, deadline_minutes=None, max_requests=None, request_counter=None, clock=time.monotonic):
+        """今から deadline_minutes 分後を期限とする予算を作成する"""
+        deadline = clock() + deadline_minutes * 60 if deadline_minutes else None
+        return cls(deadline, max_requests, request_counter, clock)
+
+    @property
+    def unlimited(self):
+        """期限もリクエスト数の上限もないか"""
+        return self.deadline is None and self.max_requests is None
+
+    @property
+    def requests_used(self):
+        """予算の作成以降に使ったAPIリクエスト数"""
+        return self._request_counter() - self._initial_requests if self._request_counter else 0
+
+    def _per_item(self):
+        """1件の取得に見込む秒数とリクエスト数（ロック保持中に呼ぶ）"""
+        if not self._completed_items:
+            return 0.0, DEFAULT_REQUESTS_PER_PR
+        requests_per_item = self.requests_used / self._completed_items
+        return self._busy_seconds / self._completed_items, max(1.0, requests_per_item)
+
+    def can_start(self, items=1):
+        """items 件の取得を新しく始めてよいか（始める場合は完了時に finish() を呼ぶ）
+
+        所要時間はこの取得だけで、リクエスト数は取得中のほかのワーカーの分も含めて見込む
+        （使用済みのリクエスト数には取得中の分の一部が含まれるため、見込みは安全側に寄る）。
+        """
+        with self._lock:
+            if self.exhausted_reason:
+                return False
+
+            seconds_per_item, requests_per_item = self._per_item()
+            if self.deadline is not None and self._clock() + seconds_per_item * items > self.deadline:
+                self.exhausted_reason = "deadline"
+            elif (self.max_requests is not None
+                  and self.requests_used + requests_per_item * (items + self._in_flight) > self.max_requests):
+                self.exhausted_reason = "request_budget"
+            else:
+                self._in_flight += items
+                return True
+
+        print(f"収集の予算に達したため、新しいPRの取得を止めます ({self.exhausted_reason})")
+        return False
+
+    def finish(self, items, busy_seconds):
+        """can_start() で始めた取得の完了を記録する"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - items)
+            self._completed_items += items
+            self._busy_seconds += busy_seconds
+
+    @property
+    def exhausted(self):
+        """予算に達して取得を止めたか"""
+        return self.exhausted_reason is not None
+
+    def get_stats(self):
+        """予算の使用状況を取得する"""
+        with self._lock:
+            return {
+                "exhausted_reason": self.exhausted_reason,
+                "requests_used": self.requests_used,
+                "max_requests": self.max_requests,
+                "seconds_left": self.deadline - self._clock() if self.deadline is not None else None,
+                "completed_items": self._completed_items,
+            }
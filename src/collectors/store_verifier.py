@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+PRデータ検証モジュール
+
+保存済みのPRデータを検査し（file_per_pr ではPRごとのJSONファイルを並列に読み込む）、欠けているPR・読み込めないファイル・
+空であるはずのないサブリソースが空のPRを見つけ、それらのPRだけを取得し直します。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from ..utils import json_codec
+from ..utils.pr_store import SUB_RESOURCE_KEYS, FilePerPRStore
+
+
+# サブリソースと、空でないことを示す基本情報のカウンター
+SUB_RESOURCE_COUNTERS = {
+    "comments": "comments",
+    "review_comments": "review_comments",
+    "commits": "commits",
+    "files": "changed_files",
+}
+SCAN_CHUNK_SIZE = 64
+
+
+def inspect_pr_data(pr_data):
+    """PRデータの問題点（欠けているか空になっているサブリソースのキー）を返す"""
+    problems = [key for key in SUB_RESOURCE_KEYS if not isinstance(pr_data.get(key), list)]
+    basic_info = pr_data.get("basic_info", {})
+    for key, counter in SUB_RESOURCE_COUNTERS.items():
+        if key not in problems and not pr_data[key] and basic_info.get(counter):
+            problems.append(key)
+    if "labels" not in problems and not pr_data["labels"] and basic_info.get("labels"):
+        problems.append("labels")
+    return problems
+
+
+def inspect_pr_file(path):
+    """PRのファイルを検査し、(PR番号, 問題の種類, 詳細) を返す（問題がなければ種類はNone）"""
+    path = Path(path)
+    pr_number = int(path.stem)
+    try:
+        pr_data = json_codec.load_file(path)
+    except (OSError, ValueError) as e:
+        return pr_number, "unreadable", str(e)[:200]
+    return inspect_stored_pr(pr_number, pr_data)
+
+
+def inspect_stored_pr(pr_number, pr_data):
+    """読み込んだPRデータを検査し、(PR番号, 問題の種類, 詳細) を返す（問題がなければ種類はNone）"""
+    if not isinstance(pr_data, dict) or pr_data.get("basic_info", {}).get("number") != pr_number:
+        return pr_number, "unreadable", "basic_info.number がファイル名と一致しません"
+
+    problems = inspect_pr_data(pr_data)
+    if problems:
+        return pr_number, "incomplete", problems
+    return pr_number, None, None
+
+
+class StoreVerifier:
+    """PRデータの保存先を検査し、問題のあったPRを取得し直すクラス"""
+
+    def __init__(self, collector, output_dir=None, workers=None):
+        """初期化
+
+        Args:
+            collector: PRの一覧と詳細を取得する PRCollector
+            output_dir: PRデータの保存先（省略時は collector.base_dir）
+            workers: 検査と再取得の並列数（省略時は collector.max_workers）
+        """
+        self.collector = collector
+        self.output_dir = Path(output_dir or collector.base_dir)
+        self.workers = max(1, workers or collector.max_workers)
+
+    def _scan_results(self):
+        """保存済みのPRを検査した (PR番号, 問題の種類, 詳細) のリスト"""
+        store = self.collector.get_store(self.output_dir)
+        if not isinstance(store, FilePerPRStore):
+            return [inspect_stored_pr(pr_data["basic_info"]["number"], pr_data) for pr_data in store.iter_prs()]
+
+        # JSONの読み込みはCPUを使うため、ファイルが多い場合はまとめて別プロセスで検査する
+        paths = [str(store.path_for(pr_number)) for pr_number in store.numbers()]
+        if self.workers > 1 and len(paths) > SCAN_CHUNK_SIZE:
+            with ProcessPoolExecutor(max_workers=min(self.workers, os.cpu_count() or 1)) as executor:
+                return list(executor.map(inspect_pr_file, paths, chunksize=SCAN_CHUNK_SIZE))
+        return [inspect_pr_file(path) for path in paths]
+
+    def scan(self):
+        """保存済みのPRデータを検査する
+
+        戻り値は {"scanned", "stored", "unreadable", "incomplete"} の辞書で、stored は保存済みのPR番号の集合、
+        unreadable は PR番号からエラー内容、incomplete は PR番号から問題のあったサブリソースへの辞書。
+        """
+        results = self._scan_results()
+        report = {"scanned": len(results), "stored": set(), "unreadable": {}, "incomplete": {}}
+        for pr_number, problem, detail in results:
+            report["stored"].add(pr_number)
+            if problem:
+                report[problem][pr_number] = detail
+        return report
+
+    def list_pr_numbers(self):
+        """GitHubの一覧にあるすべてのPR番号を取得する（100件ごとに1リクエスト）"""
+        numbers = set()
+        for prs in self.collector.iter_pull_request_pages(sort_by="created", direction="asc"):
+            numbers.update(pr["number"] for pr in prs)
+        return numbers
+
+    def verify(self, online=True):
+        """保存先を検査し、問題のあったPRをまとめた結果を返す
+
+        online=True の場合はGitHubのPR一覧と比べて保存されていないPRを見つける。
+        """
+        report = self.scan()
+        if online:
+            report["missing"] = sorted(self.list_pr_numbers() - report["stored"])
+        else:
+            report["missing"] = []
+        report["to_backfill"] = sorted(set(report["missing"]) | set(report["unreadable"]) | set(report["incomplete"]))
+        return report
+
+    def _backfill_one(self, pr_number, executor):
+        """1件のPRを取得し直して保存する（保存できた場合はTrue）"""
+        try:
+            pr_details = self.collector.get_pr_details(pr_number, executor=executor)
+        except Exception as e:
+            print(f"PR #{pr_number} を取得し直せませんでした: {e}")
+            return False
+        if not pr_details:
+            return False
+        return bool(self.collector.save_pr_to_file(pr_details, self.output_dir))
+
+    def backfill(self, pr_numbers):
+        """指定したPRだけを PRCollector.get_pr_details で取得し直して保存する
+
+        戻り値は {"repaired": [...], "failed": [...]}。
+        """
+        pr_numbers = sorted(pr_numbers)
+        if not pr_numbers:
+            return {"repaired": [], "failed": []}
+
+        print(f"{len(pr_numbers)}件のPRを取得し直します")
+        with ThreadPoolExecutor(max_workers=self.workers) as pr_executor, \
+                ThreadPoolExecutor(max_workers=self.workers) as sub_executor:
+            sub = sub_executor if self.workers > 1 else None
+            saved = list(pr_executor.map(lambda pr_number: self._backfill_one(pr_number, sub), pr_numbers))
+        self.collector.get_store(self.output_dir).flush()
+
+        return {
+            "repaired": [pr_number for pr_number, ok in zip(pr_numbers, saved) if ok],
+            "failed": [pr_number for pr_number, ok in zip(pr_numbers, saved) if not ok],
+        }
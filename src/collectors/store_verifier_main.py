@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+PRデータ検証スクリプト
+
+保存済みのPRデータから欠けているPR・読み込めないファイル・空であるはずのないサブリソースが空のPRを見つけます。
+--backfill を指定すると、見つかったPRだけを取得し直して保存します。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.collectors.pr_collector import create_collector
+from src.collectors.store_verifier import StoreVerifier
+from src.utils import json_codec
+from src.utils.github_api import get_credential_provider
+from src.utils.metrics import get_metrics
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="PRデータ検証スクリプト")
+    parser.add_argument(
+        "--output-dir", type=str, help="PRデータの保存先ディレクトリ（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="検査と再取得の並列数（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--offline", action="store_true",
+        help="GitHubのPR一覧と比べず、保存済みのファイルだけを検査する"
+    )
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="問題のあったPRだけを取得し直して保存する"
+    )
+    parser.add_argument(
+        "--report", type=str, help="検査結果を書き出すJSONファイル"
+    )
+    return parser.parse_args()
+
+
+def write_report(path, report, backfill_result=None):
+    """検査結果をJSONファイルに書き出す"""
+    data = {
+        "scanned": report["scanned"],
+        "missing": report["missing"],
+        "unreadable": {str(pr_number): error for pr_number, error in sorted(report["unreadable"].items())},
+        "incomplete": {str(pr_number): keys for pr_number, keys in sorted(report["incomplete"].items())},
+    }
+    if backfill_result is not None:
+        data["backfill"] = backfill_result
+    json_codec.dump_file(data, path)
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+
+    credentials = get_credential_provider()
+    config = credentials.get_config()
+    output_dir = Path(args.output_dir or config["data"]["base_dir"]).resolve()
+    if not output_dir.is_dir():
+        print(f"エラー: PRデータのディレクトリが見つかりません: {output_dir}")
+        return 1
+
+    collector = create_collector(config, credentials)
+    try:
+        return run_verification(collector, output_dir, args)
+    finally:
+        collector.close_stores()
+
+
+def run_verification(collector, output_dir, args):
+    """保存済みのPRデータを検査し、必要なら取得し直す（終了コードを返す）"""
+    verifier = StoreVerifier(collector, output_dir, workers=args.workers)
+
+    metrics = get_metrics()
+    with metrics.stage("verify") as stage:
+        report = verifier.verify(online=not args.offline)
+        stage["items"] = report["scanned"]
+
+    print(f"{report['scanned']}件のPRデータを検査しました")
+    print(f"  保存されていないPR: {len(report['missing'])}件")
+    print(f"  読み込めないファイル: {len(report['unreadable'])}件")
+    print(f"  サブリソースが欠けているPR: {len(report['incomplete'])}件")
+
+    backfill_result = None
+    if args.backfill:
+        with metrics.stage("backfill") as stage:
+            backfill_result = verifier.backfill(report["to_backfill"])
+            stage["items"] = len(backfill_result["repaired"])
+        print(f"{len(backfill_result['repaired'])}件のPRを取得し直しました")
+        if backfill_result["failed"]:
+            print(f"{len(backfill_result['failed'])}件のPRを取得できませんでした: {backfill_result['failed']}")
+        metrics.write(output_dir, merge=True)
+
+    if args.report:
+        write_report(args.report, report, backfill_result)
+        print(f"検査結果を {args.report} に保存しました")
+
+    remaining = backfill_result["failed"] if backfill_result is not None else report["to_backfill"]
+    return 1 if remaining else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Webhook受信モジュール
+
+GitHubのWebhook（pull_request / issue_comment / pull_request_review_comment / label）を受け取り、
+署名を検証したうえで保存済みのPRデータに反映します。同じPRへの連続したイベントはまとめて1回で反映し、
+影響のあったラベルのレポートだけを生成し直します。
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from ..generators.label_report import REPORT_FIELDS, LabelReportGenerator
+from ..utils import json_codec
+
+
+SUPPORTED_EVENTS = ("pull_request", "issue_comment", "pull_request_review_comment", "label")
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DEFAULT_MAX_DELAY_SECONDS = 30.0
+MAX_BODY_BYTES = 25 * 1024 * 1024
+
+
+def compute_signature(secret, body):
+    """Webhookの本文に対する X-Hub-Signature-256 の値を計算する"""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret, body, signature):
+    """X-Hub-Signature-256 ヘッダーの署名を検証する"""
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(compute_signature(secret, body), signature)
+
+
+class DebouncedQueue:
+    """キーごとに項目をためて、一定時間新しい項目が来なくなってからまとめて渡すキュー
+
+    項目が来るたびに delay 秒待ち直すが、最初の項目から max_delay 秒を超えては待たない。
+    """
+
+    def __init__(self, handler, delay=DEFAULT_DEBOUNCE_SECONDS, max_delay=DEFAULT_MAX_DELAY_SECONDS,
+                 clock=time.monotonic):
+        """初期化
+
+        Args:
+            handler: [(キー, 項目のリスト), ...] を受け取る関数
+            delay: 最後の項目から待つ秒数
+            max_delay: 最初の項目から待つ最大秒数
+            clock: 現在時刻を返す関数
+        """
+        self.handler = handler
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._entries = {}
+        self._stopped = False
+        self._thread = None
+
+    def put(self, key, item):
+        """項目を追加する"""
+        with self._condition:
+            now = self._clock()
+            entry = self._entries.setdefault(key, {"items": [], "first": now})
+            entry["items"].append(item)
+            entry["due"] = min(now + self.delay, entry["first"] + self.max_delay)
+            self._condition.notify()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._entries)
+
+    def _pop_due(self, force=False):
+        """期限が来たキーを取り出す（ロック保持中に呼ぶ）"""
+        now = self._clock()
+        due_keys = [key for key, entry in self._entries.items() if force or entry["due"] <= now]
+        return [(key, self._entries.pop(key)["items"]) for key in due_keys]
+
+    def flush(self, force=False):
+        """期限が来た（force=Trueの場合はすべての）項目をハンドラーに渡す（渡したキーの数を返す）"""
+        with self._condition:
+            batch = self._pop_due(force)
+        if batch:
+            self.handler(batch)
+        return len(batch)
+
+    def _run(self):
+        """期限が来た項目を順に処理するワーカー"""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._entries:
+                        timeout = min(entry["due"] for entry in self._entries.values()) - self._clock()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                batch = self._pop_due()
+
+            try:
+                self.handler(batch)
+            except Exception as e:
+                print(f"Webhookの反映中にエラーが発生しました: {e}")
+
+    def start(self):
+        """ワーカースレッドを開始する"""
+        self._thread = threading.Thread(target=self._run, name="webhook-debounce", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """ワーカースレッドを止める（flush=Trueの場合は残りの項目をすぐに処理する）"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+        if flush:
+            self.flush(force=True)
+
+
+def _is_stale(current, incoming):
+    """incoming の更新日時が current より古いか（GitHub APIの日時は文字列のまま比較できる）"""
+    return bool(current and incoming and incoming < current)
+
+
+def _upsert_by_id(items, item, action):
+    """IDの一致する項目を置き換える（deletedの場合は削除し、見つからない場合は末尾に追加する）
+
+    保存済みの項目より更新日時が古いペイロード（遅れて届いたイベント）では置き換えない。
+    """
+    remaining = [existing for existing in items if existing.get("id") != item.get("id")]
+    if action == "deleted":
+        return remaining
+    if len(remaining) == len(items):
+        return items + [item]
+    return [
+        item if existing.get("id") == item.get("id") and not _is_stale(existing.get("updated_at"), item.get("updated_at"))
+        else existing
+        for existing in items
+    ]
+
+
+def _label_names(pr_details):
+    """PRのラベル名の集合（ラベルがない場合は unlabeled）"""
+    names = {label.get("name") for label in pr_details.get("labels", []) if label.get("name")}
+    return names or {"unlabeled"}
+
+
+def _report_summary(pr_details):
+    """ラベルレポートに使う項目だけのPRデータ（保存先の iter_prs(include=REPORT_FIELDS) と同じ形）"""
+    basic_info = pr_details.get("basic_info", {})
+    return {
+        "basic_info": {key: basic_info.get(key) for key in ("number", "title", "html_url", "state")},
+        "state": pr_details.get("state", basic_info.get("state")),
+        "labels": pr_details.get("labels", []),
+    }
+
+
+def _label_key(label_name):
+    """ラベルのイベントをためるキュー上のキー（PR番号と区別する）"""
+    return ("label", label_name)
+
+
+class WebhookIngestor:
+    """Webhookのペイロードを保存済みのPRデータに反映するクラス
+
+    ラベルごとのPRの一覧（レポートに使う項目だけ）はメモリに持ち、最初の反映で保存先から一度だけ作る。
+    以降は反映したPRの分だけ更新し、ラベルのイベントで対象のPRを探すときとレポートの生成に使う
+    （どちらもデバウンスのワーカーで行い、保存先全体を読み込み直さない）。
+    """
+
+    def __init__(self, collector, output_dir=None, reports_dir=None, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+                 max_delay_seconds=DEFAULT_MAX_DELAY_SECONDS, clock=time.monotonic):
+        """初期化
+
+        Args:
+            collector: PRデータの読み込み・保存・取得に使う PRCollector
+            output_dir: PRデータの保存先（省略時は collector.base_dir）
+            reports_dir: ラベルレポートの出力先（省略時はレポートを生成しない）
+            debounce_seconds: 同じPRのイベントをまとめるために待つ秒数
+            max_delay_seconds: 最初のイベントから反映までに待つ最大秒数
+            clock: 現在時刻を返す関数
+        """
+        self.collector = collector
+        self.output_dir = Path(output_dir or collector.base_dir)
+        self.reports_dir = reports_dir
+        self.queue = DebouncedQueue(self.apply_batch, debounce_seconds, max_delay_seconds, clock)
+        self.stats = {"received": 0, "ignored": 0, "applied": 0, "fetched": 0}
+        self._stats_lock = threading.Lock()
+        self._label_index = None
+
+    def _count(self, key, value=1):
+        """統計を加算する"""
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _ensure_label_index(self):
+        """ラベルごとのPRの一覧（ラベル名 → {PR番号: レポート用のPRデータ}）を作る（作成済みなら何もしない）"""
+        if self._label_index is not None:
+            return self._label_index
+        self._label_index = {}
+        store = self.collector.get_store(self.output_dir)
+        for pr_data in store.iter_prs(include=REPORT_FIELDS):
+            self._index_pr(pr_data)
+        return self._label_index
+
+    def _index_pr(self, pr_details):
+        """PRをラベルごとの一覧に加える"""
+        summary = _report_summary(pr_details)
+        for label_name in _label_names(pr_details):
+            self._label_index.setdefault(label_name, {})[summary["basic_info"]["number"]] = summary
+
+    def _unindex_pr(self, pr_number, label_names):
+        """PRをラベルごとの一覧から除く"""
+        for label_name in label_names:
+            prs = self._label_index.get(label_name, {})
+            prs.pop(pr_number, None)
+            if not prs:
+                self._label_index.pop(label_name, None)
+
+    def affected_keys(self, event, payload):
+        """イベントをためるキューのキーを返す（PRに関係しないイベントや形式の異なるペイロードは空のリスト）
+
+        PRのイベントはPR番号を、ラベルの変更・削除は ("label", 変更前のラベル名) を返す。
+        ラベルの付いたPRはデバウンスのワーカーで探す（リクエストを受けたスレッドでは保存先を読み込まない）。
+        """
+        if not isinstance(payload, dict):
+            return []
+        if event in ("pull_request", "pull_request_review_comment"):
+            pr_number = (payload.get("pull_request") or {}).get("number")
+            return [pr_number] if isinstance(pr_number, int) else []
+        if event == "issue_comment":
+            issue = payload.get("issue") or {}
+            pr_number = issue.get("number")
+            return [pr_number] if "pull_request" in issue and isinstance(pr_number, int) else []
+        if event == "label":
+            label_name = (payload.get("label") or {}).get("name")
+            old_name = ((payload.get("changes") or {}).get("name") or {}).get("from", label_name)
+            if not old_name or payload.get("action") not in ("edited", "deleted"):
+                return []
+            return [_label_key(old_name)]
+        return []
+
+    def handle_event(self, event, payload):
+        """イベントを受け付けてキューに入れる（キューに入れたキーを返す）"""
+        self._count("received")
+        if event not in SUPPORTED_EVENTS:
+            self._count("ignored")
+            return []
+
+        keys = self.affected_keys(event, payload)
+        if not keys:
+            self._count("ignored")
+        for key in keys:
+            self.queue.put(key, (event, payload))
+        return keys
+
+    @staticmethod
+    def apply_event(pr_details, event, payload):
+        """1件のイベントをPRデータに反映する（基本情報を置き換えた場合はTrueを返す）
+
+        Webhookは順序どおりに届くとは限らないため、保存済みのPRより更新日時が古いPRの情報は反映しない。
+        """
+        action = payload.get("action")
+        basic_info = pr_details["basic_info"]
+
+        if event == "pull_request":
+            if _is_stale(basic_info.get("updated_at"), payload["pull_request"].get("updated_at")):
+                return False
+            pr_details["basic_info"] = payload["pull_request"]
+            return True
+
+        if event == "issue_comment":
+            pr_details["comments"] = _upsert_by_id(pr_details.get("comments", []), payload["comment"], action)
+            basic_info["comments"] = len(pr_details["comments"])
+            updated_at = payload["issue"].get("updated_at")
+        elif event == "pull_request_review_comment":
+            pr_details["review_comments"] = _upsert_by_id(
+                pr_details.get("review_comments", []), payload["comment"], action
+            )
+            basic_info["review_comments"] = len(pr_details["review_comments"])
+            updated_at = payload["pull_request"].get("updated_at")
+        elif event == "label":
+            label = payload["label"]
+            old_name = payload.get("changes", {}).get("name", {}).get("from", label["name"])
+            labels = [existing for existing in pr_details.get("labels", []) if existing.get("name") != old_name]
+            if action != "deleted":
+                labels.append(label)
+            pr_details["labels"] = labels
+            basic_info["labels"] = labels
+            updated_at = None
+        else:
+            return False
+
+        if updated_at and not _is_stale(basic_info.get("updated_at"), updated_at):
+            basic_info["updated_at"] = updated_at
+            pr_details["updated_at"] = updated_at
+        return False
+
+    def apply_events(self, pr_number, events, stored=None):
+        """1つのPRにたまったイベントを保存済みのPRデータ（省略時は読み込む）に反映して保存する（保存したPRデータを返す）"""
+        if stored is None:
+            stored = self.collector.load_pr_from_file(pr_number, self.output_dir)
+        if not stored:
+            # 保存済みのデータがないPRは全体を取得する
+            self._count("fetched")
+            pr_details = self.collector.get_pr_details(pr_number)
+        else:
+            previous_head = stored.get("basic_info", {}).get("head", {})
+            pr_details = stored
+            replaced = False
+            for event, payload in events:
+                replaced = self.apply_event(pr_details, event, payload) or replaced
+
+            if replaced:
+                # 件数が反映済みのリストと合わないサブリソースと、headが変わった場合のコミット・ファイルだけを取得し直す
+                new_info = pr_details["basic_info"]
+                reference = dict(pr_details)
+                reference["basic_info"] = {**new_info, "head": previous_head}
+                pr_details = self.collector.merge_pr_data(reference, new_info)
+
+        if pr_details and self.collector.save_pr_to_file(pr_details, self.output_dir):
+            self._count("applied")
+            return pr_details
+        return None
+
+    def _events_by_pr(self, batch):
+        """キーごとのイベントをPRごとのイベントにまとめる（ラベルのキーはそのラベルの付いたPRに展開する）"""
+        label_index = self._ensure_label_index()
+        events_by_pr = {}
+        for key, events in batch:
+            if isinstance(key, tuple):
+                pr_numbers = sorted(label_index.get(key[1], {}))
+            else:
+                pr_numbers = [key]
+            for pr_number in pr_numbers:
+                events_by_pr.setdefault(pr_number, []).extend(events)
+        return events_by_pr
+
+    def apply_batch(self, batch):
+        """デバウンスされたイベントをPRごとに反映し、影響のあったラベルのレポートだけを生成し直す"""
+        affected_labels = set()
+        for pr_number, events in self._events_by_pr(batch).items():
+            before = self.collector.load_pr_from_file(pr_number, self.output_dir)
+            # apply_events は読み込んだPRデータをそのまま書き換えるため、反映前のラベルを先に控える
+            before_labels = _label_names(before) if before else set()
+            try:
+                pr_details = self.apply_events(pr_number, events, before)
+            except Exception as e:
+                print(f"PR #{pr_number} へのWebhookの反映中にエラーが発生しました: {e}")
+                continue
+            if pr_details:
+                affected_labels |= before_labels
+                self._unindex_pr(pr_number, before_labels)
+                affected_labels |= _label_names(pr_details)
+                self._index_pr(pr_details)
+                print(f"PR #{pr_number} に{len(events)}件のイベントを反映しました")
+        self.collector.get_store(self.output_dir).flush()
+
+        if affected_labels and self.reports_dir:
+            label_groups = {
+                label_name: [prs[number] for number in sorted(prs)] for label_name, prs in self._label_index.items()
+            }
+            generator = LabelReportGenerator(self.collector.config, self.collector.credentials)
+            generator.write_label_reports(label_groups, self.reports_dir, labels=sorted(affected_labels))
+
+    def start(self):
+        """反映用のワーカーを開始する"""
+        self.queue.start()
+
+    def stop(self):
+        """反映用のワーカーを止め、残りのイベントを反映する"""
+        self.queue.stop(flush=True)
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """GitHubのWebhookを受け取るリクエストハンドラー"""
+
+    ingestor = None
+    secret = None
+
+    def _respond(self, status, message):
+        """JSONでレスポンスを返す"""
+        body = json_codec.dumps({"message": message}, compact=True)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Webhookを受け取る"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._respond(400, "invalid content length")
+            return
+
+        body = self.rfile.read(length)
+        if not verify_signature(self.secret, body, self.headers.get("X-Hub-Signature-256")):
+            self._respond(401, "invalid signature")
+            return
+
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            self._respond(200, "pong")
+            return
+
+        try:
+            payload = json_codec.loads(body)
+        except ValueError:
+            self._respond(400, "invalid json")
+            return
+
+        keys = self.ingestor.handle_event(event, payload)
+        self._respond(202, f"queued {len(keys)} update(s)" if keys else "ignored")
+
+    def log_message(self, format, *args):
+        """アクセスログを標準出力に出す"""
+        print(f"Webhook: {self.address_string()} {format % args}")
+
+
+def create_webhook_server(ingestor, secret, host="127.0.0.1", port=8080):
+    """Webhook受信用のHTTPサーバーを作成する"""
+    handler = type("BoundWebhookRequestHandler", (WebhookRequestHandler,), {"ingestor": ingestor, "secret": secret})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Webhook受信スクリプト
+
+GitHubのWebhookを受け取り、PRデータとラベルレポートをほぼリアルタイムに更新します。
+--replay で記録済みのペイロードを読み込むと、サーバーを起動せずに同じ処理を実行できます。
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.collectors.pr_collector import create_collector
+from src.collectors.webhook_server import WebhookIngestor, create_webhook_server
+from src.utils import json_codec
+from src.utils.github_api import get_credential_provider
+
+
+def parse_arguments():
+    """コマンドライン引数を解析する"""
+    parser = argparse.ArgumentParser(description="Webhook受信スクリプト")
+    parser.add_argument(
+        "--host", type=str, help="待ち受けるホスト（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--port", type=int, help="待ち受けるポート（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--output-dir", type=str, help="PRデータの保存先ディレクトリ（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--reports-dir", type=str, help="ラベルレポートの出力先ディレクトリ（設定ファイルの値を上書き）"
+    )
+    parser.add_argument(
+        "--replay", type=str, nargs="+",
+        help="記録済みのペイロード（{\"event\": ..., \"payload\": ...} 形式のJSONファイル）を順に反映する"
+    )
+    return parser.parse_args()
+
+
+def replay_payloads(ingestor, paths):
+    """記録済みのペイロードを反映する"""
+    for path in paths:
+        delivery = json_codec.load_file(path)
+        keys = ingestor.handle_event(delivery["event"], delivery["payload"])
+        print(f"{path}: {delivery['event']} イベントを {keys} に割り当てました")
+    ingestor.queue.flush(force=True)
+
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+
+    credentials = get_credential_provider()
+    config = credentials.get_config()
+    webhook_config = config.get("webhook", {})
+
+    output_dir = Path(args.output_dir or config["data"]["base_dir"]).resolve()
+    reports_dir = Path(args.reports_dir or Path(config["data"]["reports_dir"]) / "labels").resolve()
+
+    collector = create_collector(config, credentials)
+    ingestor = WebhookIngestor(
+        collector,
+        output_dir,
+        reports_dir,
+        debounce_seconds=webhook_config.get("debounce_seconds", 2),
+        max_delay_seconds=webhook_config.get("max_delay_seconds", 30),
+    )
+
+    if args.replay:
+        replay_payloads(ingestor, args.replay)
+        print(f"Webhook: {ingestor.stats}")
+        return 0
+
+    secret_env_var = webhook_config.get("secret_env_var", "GITHUB_WEBHOOK_SECRET")
+    secret = os.environ.get(secret_env_var)
+    if not secret:
+        print(f"エラー: Webhookのシークレットが設定されていません。環境変数 {secret_env_var} を設定してください。")
+        return 1
+
+    host = args.host or webhook_config.get("host", "127.0.0.1")
+    port = args.port or webhook_config.get("port", 8080)
+    server = create_webhook_server(ingestor, secret, host, port)
+
+    ingestor.start()
+    print(f"Webhookを http://{host}:{port}/ で待ち受けています")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("停止しています...")
+    finally:
+        server.server_close()
+        ingestor.stop()
+        print(f"Webhook: {ingestor.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,51 +5,54 @@
 PRデータからラベルごとのマークダウンレポートを生成します。
 """
 
-import json
 import os
 from collections import defaultdict
 from pathlib import Path
 
-from ..utils.github_api import load_config
+from ..utils import json_codec
+from ..utils.github_api import get_credential_provider
+from ..utils.pr_store import PRStore, create_pr_store
+
+
+# ラベルレポートが保存先から読み込むサブリソース
+REPORT_FIELDS = ("labels",)
 
 
 class LabelReportGenerator:
     """ラベルごとのレポートを生成するクラス"""
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, credentials=None):
         """初期化"""
-        self.config = config or load_config()
+        self.credentials = credentials or get_credential_provider()
+        self.config = config or self.credentials.get_config()
         
     def load_pr_data(self, input_file):
         """PRデータをJSONファイルから読み込む"""
         try:
-            with open(input_file, encoding="utf-8") as f:
-                pr_data = json.load(f)
+            pr_data = json_codec.load_file(input_file)
             print(f"{len(pr_data)}件のPRデータを読み込みました")
             return pr_data
         except Exception as e:
             print(f"PRデータの読み込み中にエラーが発生しました: {e}")
             return []
             
-    def load_pr_data_from_directory(self, input_dir):
-        """PRデータをディレクトリから読み込む（ファイルごとのPRデータ）"""
-        pr_data = []
+    def load_pr_data_from_directory(self, input_dir, include=None):
+        """PRデータをディレクトリの保存先（data.storage_type に応じたもの）から読み込む
+
+        include には読み込むサブリソースのキーを指定する（Noneはすべて。sqlite では指定したものだけを読み込む）。
+        """
         input_path = Path(input_dir)
         
         if not input_path.exists() or not input_path.is_dir():
             print(f"ディレクトリが存在しません: {input_dir}")
             return []
             
-        json_files = list(input_path.glob("*.json"))
-        print(f"{len(json_files)}件のPRデータファイルを見つけました")
-        
-        for json_file in json_files:
-            try:
-                with open(json_file, encoding="utf-8") as f:
-                    pr = json.load(f)
-                    pr_data.append(pr)
-            except Exception as e:
-                print(f"{json_file}の読み込み中にエラーが発生しました: {e}")
+        store = create_pr_store(self.config, input_path)
+        try:
+            pr_data = list(store.iter_prs(include))
+        finally:
+            store.close()
+        print(f"{len(pr_data)}件のPRデータを読み込みました")
                 
         return pr_data
         
@@ -78,6 +81,17 @@ class LabelReportGenerator:
             
         return label_groups
         
+    @staticmethod
+    def format_pr_line(pr):
+        """レポートのPRの行を作成する（複数のリポジトリのPRをまとめる場合はリポジトリ名も表示する）"""
+        basic_info = pr.get("basic_info", {})
+        pr_number = basic_info.get("number", "?")
+        pr_title = basic_info.get("title", "タイトルなし")
+        pr_url = basic_info.get("html_url", "#")
+        pr_ref = f"{pr['repository']}#{pr_number}" if pr.get("repository") else f"PR #{pr_number}"
+        
+        return f"- [{pr_ref}]({pr_url}) {pr_title}\n"
+        
     def generate_label_markdown(self, label_name, prs, output_file=None):
         """特定のラベルに関するマークダウンレポートを生成する"""
         if not prs:
@@ -96,23 +110,13 @@ class LabelReportGenerator:
         if open_prs:
             markdown += f"## オープン ({len(open_prs)}件)\n\n"
             for pr in open_prs:
-                basic_info = pr.get("basic_info", {})
-                pr_number = basic_info.get("number", "?")
-                pr_title = basic_info.get("title", "タイトルなし")
-                pr_url = basic_info.get("html_url", "#")
-                
-                markdown += f"- [PR #{pr_number}]({pr_url}) {pr_title}\n"
+                markdown += self.format_pr_line(pr)
             markdown += "\n"
             
         if closed_prs:
             markdown += f"## クローズド ({len(closed_prs)}件)\n\n"
             for pr in closed_prs:
-                basic_info = pr.get("basic_info", {})
-                pr_number = basic_info.get("number", "?")
-                pr_title = basic_info.get("title", "タイトルなし")
-                pr_url = basic_info.get("html_url", "#")
-                
-                markdown += f"- [PR #{pr_number}]({pr_url}) {pr_title}\n"
+                markdown += self.format_pr_line(pr)
             markdown += "\n"
             
         if output_file:
@@ -159,12 +163,19 @@ class LabelReportGenerator:
             
         return markdown
         
-    def generate_reports(self, input_data, output_dir):
-        """すべてのラベルレポートを生成する"""
-        if isinstance(input_data, (str, Path)) and Path(input_data).is_file():
+    def generate_reports(self, input_data, output_dir, labels=None):
+        """すべてのラベルレポートを生成する
+
+        input_data にはPRデータのJSONファイル、保存先のディレクトリ、PRStore、PRデータのリストを指定できる。
+        labels を指定した場合は、そのラベルのレポートとインデックスだけを生成し直す（PRがなくなったラベルは空のレポートになる）。
+        """
+        # レポートにはラベルと基本情報しか使わないため、保存先からはラベルだけを読み込む
+        if isinstance(input_data, PRStore):
+            pr_data = list(input_data.iter_prs(include=REPORT_FIELDS))
+        elif isinstance(input_data, (str, Path)) and Path(input_data).is_file():
             pr_data = self.load_pr_data(input_data)
         elif isinstance(input_data, (str, Path)) and Path(input_data).is_dir():
-            pr_data = self.load_pr_data_from_directory(input_data)
+            pr_data = self.load_pr_data_from_directory(input_data, include=REPORT_FIELDS)
         else:
             pr_data = input_data
             
@@ -178,15 +189,22 @@ class LabelReportGenerator:
             print("ラベルグループがありません")
             return False
             
+        self.write_label_reports(label_groups, output_dir, labels)
+        return True
+        
+    def write_label_reports(self, label_groups, output_dir, labels=None):
+        """ラベルごとにまとめたPRからレポートとインデックスを書き出す
+
+        labels を指定した場合は、そのラベルのレポートとインデックスだけを書き出す。
+        """
         os.makedirs(output_dir, exist_ok=True)
         
-        for label_name, prs in label_groups.items():
+        target_labels = label_groups.keys() if labels is None else labels
+        for label_name in target_labels:
             filename = label_name.lower().replace(" ", "-")
             output_file = os.path.join(output_dir, f"{filename}.md")
             
-            self.generate_label_markdown(label_name, prs, output_file)
+            self.generate_label_markdown(label_name, label_groups.get(label_name, []), output_file)
             
         index_file = os.path.join(output_dir, "index.md")
         self.generate_label_index(label_groups, index_file)
-        
-        return True
@@ -3,6 +3,7 @@
 ラベルごとのレポート生成スクリプト
 
 PRデータからラベルごとのマークダウンレポートを生成します。
+設定ファイルで複数のリポジトリを指定した場合は、リポジトリごとのレポートとすべてのリポジトリをまとめたレポートを生成します。
 """
 
 import argparse
@@ -11,8 +12,10 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.generators.label_report import LabelReportGenerator
-from src.utils.github_api import load_config
+from src.collectors.repositories import is_multi_repository, load_repository_prs, repository_configs, repository_name
+from src.generators.label_report import REPORT_FIELDS, LabelReportGenerator
+from src.utils.github_api import get_credential_provider
+from src.utils.metrics import get_metrics
 
 
 def parse_arguments():
@@ -27,11 +30,29 @@ def parse_arguments():
     return parser.parse_args()
 
 
+def generate_repository_reports(generator, config, output_dir=None):
+    """設定の repositories のリポジトリごとのレポートと、すべてのリポジトリをまとめたレポートを生成する"""
+    repo_configs = repository_configs(config)
+    success = True
+    for repo_config in repo_configs:
+        repo_output_dir = Path(repo_config["data"]["reports_dir"]) / "labels"
+        print(f"{repository_name(repo_config)} のラベルレポートを生成します")
+        success = generator.generate_reports(Path(repo_config["data"]["base_dir"]), repo_output_dir) and success
+    
+    all_prs = load_repository_prs(
+        repo_configs, lambda directory: generator.load_pr_data_from_directory(directory, include=REPORT_FIELDS)
+    )
+    output_dir = output_dir or Path(config["data"]["reports_dir"]) / "labels"
+    print(f"{len(repo_configs)}件のリポジトリをまとめたラベルレポートを生成します")
+    return generator.generate_reports(all_prs, output_dir) and success
+
+
 def main():
     """メイン関数"""
     args = parse_arguments()
     
-    config = load_config()
+    credentials = get_credential_provider()
+    config = credentials.get_config()
     
     input_path = args.input
     if not input_path:
@@ -41,9 +62,16 @@ def main():
     if not output_dir:
         output_dir = Path(config["data"]["reports_dir"]) / "labels"
     
-    generator = LabelReportGenerator(config)
+    generator = LabelReportGenerator(config, credentials)
     
-    success = generator.generate_reports(input_path, output_dir)
+    metrics = get_metrics()
+    with metrics.stage("label_report"):
+        if not args.input and is_multi_repository(config):
+            success = generate_repository_reports(generator, config, args.output_dir)
+        else:
+            success = generator.generate_reports(input_path, output_dir)
+    # 実行メトリクスはPRデータ（last_run_info.json）と同じディレクトリに追記する
+    metrics.write(input_path if Path(input_path).is_dir() else Path(input_path).parent, merge=True)
     
     if success:
         print(f"ラベルレポートを {output_dir} に生成しました")
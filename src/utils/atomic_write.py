@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+アトミックなファイル書き込みモジュール
+
+PRデータ・ジャーナル・キャッシュ・メトリクスのファイルは、一時ファイルに書いてから置き換えることで、
+途中で止まっても書きかけのファイルを残さないようにします。
+"""
+
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_atomic(path, data):
+    """バイト列を一時ファイルに書いてから path と置き換える（途中で止まっても書きかけのファイルを残さない）"""
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
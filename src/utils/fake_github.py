@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+偽GitHub APIサーバーモジュール
+
+保存済みのPRデータ（PRごとのJSONファイル）または合成したデータを、GitHub REST APIと同じ形式で返す
+ローカルHTTPサーバーです。Linkヘッダーによるページ分割・ETag・遅延とゆらぎ・プライマリ／セカンダリの
+レート制限を再現し、github.api_base_url をこのサーバーに向けることでコレクターをオフラインで計測できます。
+"""
+
+import collections
+import datetime
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from . import json_codec
+from .pr_store import SQLITE_FILENAME, STORAGE_FILE_PER_PR, STORAGE_SQLITE, create_pr_store
+
+
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+DEFAULT_RATE_LIMIT = 5000
+DEFAULT_RATE_LIMIT_WINDOW = 3600
+
+
+def _timestamp(base, seconds):
+    """基準日時から指定秒後の日時をGitHub APIの形式で返す"""
+    return (base + datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeGitHubRepository:
+    """偽GitHubサーバーが返すリポジトリのデータ（PR番号から pr_details 形式のデータへの辞書）"""
+
+    def __init__(self, owner, name, prs=None):
+        """初期化"""
+        self.owner = owner
+        self.name = name
+        self.prs = {}
+        for pr_details in prs or []:
+            self.add_pr(pr_details)
+
+    def add_pr(self, pr_details):
+        """PRを追加する"""
+        self.prs[pr_details["basic_info"]["number"]] = pr_details
+
+    @classmethod
+    def from_pr_directory(cls, owner, name, input_dir, storage_type=None):
+        """保存済みのPRデータのディレクトリ（PRCollectorの出力）から作成する
+
+        storage_type を省略した場合は、SQLiteのデータベースがあれば sqlite、なければ file_per_pr として読み込む。
+        参照に置き換えて保存されたオブジェクトは保存先の読み込みで元に戻る。
+        """
+        if storage_type is None:
+            storage_type = STORAGE_SQLITE if (Path(input_dir) / SQLITE_FILENAME).exists() else STORAGE_FILE_PER_PR
+        repository = cls(owner, name)
+        store = create_pr_store(directory=input_dir, storage_type=storage_type)
+        try:
+            for pr_details in store.iter_prs():
+                if pr_details.get("basic_info"):
+                    repository.add_pr(pr_details)
+        finally:
+            store.close()
+        return repository
+
+    @classmethod
+    def synthetic(cls, owner, name, pr_count=100, comments_per_pr=3, review_comments_per_pr=2,
+                  commits_per_pr=2, files_per_pr=3, labels=("bug", "documentation", "enhancement"), seed=0):
+        """決まった乱数の種から合成したPRデータで作成する"""
+        rng = random.Random(seed)
+        base = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        repository = cls(owner, name)
+        html_base = f"https://github.com/{owner}/{name}"
+
+        for number in range(1, pr_count + 1):
+            created = number * 3600
+            updated = created + rng.randint(60, 30 * 86400)
+            pr_labels = [
+                {"id": 1000 + i, "name": label, "color": "ededed", "description": None}
+                for i, label in enumerate(labels) if rng.random() < 0.4
+            ]
+            comments = [
+                {
+                    "id": number * 1000 + i,
+                    "html_url": f"{html_base}/pull/{number}#issuecomment-{number * 1000 + i}",
+                    "body": f"コメント {i} です。" * rng.randint(1, 20),
+                    "user": {"login": f"user{rng.randint(1, 50)}"},
+                    "created_at": _timestamp(base, created + i * 60),
+                    "updated_at": _timestamp(base, created + i * 60),
+                }
+                for i in range(comments_per_pr)
+            ]
+            files = [
+                {
+                    "sha": hashlib.sha1(f"{number}-{i}".encode("utf-8")).hexdigest(),
+                    "filename": f"docs/section{i}.md",
+                    "status": "modified",
+                    "additions": 3,
+                    "deletions": 1,
+                    "changes": 4,
+                    "patch": f"@@ -1,3 +1,5 @@\n # 政策\n \n-## 旧セクション{i}\n+## セクション{i}\n+\n+追加の内容 {number}\n",
+                }
+                for i in range(files_per_pr)
+            ]
+            review_comments = [
+                {
+                    "id": number * 1000 + 500 + i,
+                    "html_url": f"{html_base}/pull/{number}#discussion_r{number * 1000 + 500 + i}",
+                    "body": f"レビューコメント {i}",
+                    "path": files[i % len(files)]["filename"] if files else "README.md",
+                    "user": {"login": f"reviewer{rng.randint(1, 10)}"},
+                    "created_at": _timestamp(base, created + 600 + i * 60),
+                    "updated_at": _timestamp(base, created + 600 + i * 60),
+                }
+                for i in range(review_comments_per_pr)
+            ]
+            commits = [
+                {
+                    "sha": hashlib.sha1(f"commit-{number}-{i}".encode("utf-8")).hexdigest(),
+                    "commit": {"message": f"PR {number} のコミット {i}", "author": {"name": "author"}},
+                }
+                for i in range(commits_per_pr)
+            ]
+            state = "open" if rng.random() < 0.3 else "closed"
+            basic_info = {
+                "url": f"https://api.github.com/repos/{owner}/{name}/pulls/{number}",
+                "id": 100000 + number,
+                "node_id": f"PR_{number}",
+                "html_url": f"{html_base}/pull/{number}",
+                "number": number,
+                "state": state,
+                "title": f"合成PR {number}",
+                "user": {"login": f"user{rng.randint(1, 50)}"},
+                "body": f"## 概要\n\n合成PR {number} の説明です。\n",
+                "created_at": _timestamp(base, created),
+                "updated_at": _timestamp(base, updated),
+                "closed_at": _timestamp(base, updated) if state == "closed" else None,
+                "merged_at": None,
+                "labels": pr_labels,
+                "draft": False,
+                "head": {"ref": f"branch-{number}", "sha": commits[-1]["sha"] if commits else None},
+                "base": {"ref": "main", "sha": "0" * 40},
+                "comments": len(comments),
+                "review_comments": len(review_comments),
+                "commits": len(commits),
+                "additions": sum(f["additions"] for f in files),
+                "deletions": sum(f["deletions"] for f in files),
+                "changed_files": len(files),
+            }
+            repository.add_pr({
+                "basic_info": basic_info,
+                "state": state,
+                "updated_at": basic_info["updated_at"],
+                "labels": pr_labels,
+                "comments": comments,
+                "review_comments": review_comments,
+                "commits": commits,
+                "files": files,
+            })
+        return repository
+
+    def list_pulls(self, state="open", sort="created", direction="desc"):
+        """/pulls と同じ条件でPRの基本情報を並べる"""
+        prs = [pr["basic_info"] for pr in self.prs.values() if state == "all" or pr["basic_info"]["state"] == state]
+        key = "updated_at" if sort == "updated" else "created_at"
+        return sorted(prs, key=lambda pr: (pr[key], pr["number"]), reverse=direction != "asc")
+
+    def list_issues(self, state="open", since=None, sort="created", direction="desc"):
+        """/issues と同じ条件でPRをIssueとして並べる（pull_request キーを持つ）"""
+        issues = []
+        for pr in self.list_pulls(state, sort, direction):
+            if since and pr["updated_at"] < since:
+                continue
+            issue = {key: pr.get(key) for key in ("number", "title", "state", "user", "labels", "body",
+                                                  "created_at", "updated_at", "closed_at", "comments")}
+            issue["html_url"] = pr.get("html_url")
+            issue["pull_request"] = {"url": pr.get("url"), "html_url": pr.get("html_url")}
+            issues.append(issue)
+        return issues
+
+
+class _PrimaryBudget:
+    """トークンごとのプライマリレート制限の状態"""
+
+    def __init__(self, reset):
+        """初期化"""
+        self.used = 0
+        self.reset = reset
+
+
+class FakeGitHubServer:
+    """GitHub REST APIの一部を再現するローカルサーバー
+
+    対応するエンドポイント: /rate_limit, /repos/{owner}/{repo}/pulls, /pulls/{n},
+    /pulls/{n}/comments|commits|files, /issues, /issues/{n}/comments|labels
+    """
+
+    def __init__(self, repository, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 rate_limit=DEFAULT_RATE_LIMIT, rate_limit_window=DEFAULT_RATE_LIMIT_WINDOW,
+                 secondary_limit=None, secondary_window=1.0, seed=0, clock=time.time, sleep=time.sleep):
+        """初期化
+
+        Args:
+            repository: 返すデータ（FakeGitHubRepository）
+            host: 待ち受けるホスト
+            port: 待ち受けるポート（0の場合は空いているポート）
+            latency: レスポンスごとの遅延（秒）
+            jitter: 遅延に加える0〜jitter秒のゆらぎ
+            rate_limit: トークンごとのプライマリレート制限（rate_limit_window 秒あたりのリクエスト数）
+            rate_limit_window: プライマリレート制限がリセットされるまでの秒数
+            secondary_limit: secondary_window 秒あたりに受け付けるリクエスト数（Noneは無制限）
+            secondary_window: セカンダリレート制限の期間（秒）
+            seed: 遅延のゆらぎに使う乱数の種
+            clock: 現在時刻（UNIX時間）を返す関数
+            sleep: 遅延に使う関数
+        """
+        self.repository = repository
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.secondary_limit = secondary_limit
+        self.secondary_window = secondary_window
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._budgets = {}
+        self._recent = collections.defaultdict(collections.deque)
+        self.stats = collections.Counter()
+
+        handler = type("BoundFakeGitHubHandler", (_FakeGitHubHandler,), {"fake": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """api_base_url に指定するURL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """別スレッドでサーバーを開始する"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-github", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """現在のスレッドでサーバーを実行する"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """サーバーを停止する"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def get_stats(self):
+        """エンドポイントごとのリクエスト数や304・レート制限の回数を取得する"""
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, key):
+        """統計を加算する"""
+        with self._lock:
+            self.stats[key] += 1
+
+    def delay(self):
+        """設定された遅延とゆらぎだけ待つ"""
+        with self._lock:
+            seconds = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if seconds > 0:
+            self._sleep(seconds)
+
+    def _budget(self, key, now):
+        """トークンのプライマリレート制限の状態を取得する（ロック保持中に呼ぶ）"""
+        budget = self._budgets.get(key)
+        if budget is None or now >= budget.reset:
+            budget = self._budgets[key] = _PrimaryBudget(int(now) + self.rate_limit_window)
+        return budget
+
+    def rate_limit_headers(self, key):
+        """プライマリレート制限のヘッダーを作る"""
+        with self._lock:
+            budget = self._budget(key, self._clock())
+            return {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(max(self.rate_limit - budget.used, 0)),
+                "X-RateLimit-Reset": str(budget.reset),
+                "X-RateLimit-Used": str(budget.used),
+                "X-RateLimit-Resource": "core",
+            }
+
+    def check_secondary_limit(self, key):
+        """セカンダリレート制限を超えた場合は Retry-After の秒数を返す（超えていなければNone）"""
+        if not self.secondary_limit:
+            return None
+        with self._lock:
+            now = self._clock()
+            recent = self._recent[key]
+            while recent and recent[0] <= now - self.secondary_window:
+                recent.popleft()
+            if len(recent) >= self.secondary_limit:
+                return max(1, math.ceil(recent[0] + self.secondary_window - now))
+            recent.append(now)
+            return None
+
+    def check_primary_limit(self, key):
+        """プライマリレート制限の残りがなければTrueを返す"""
+        with self._lock:
+            return self._budget(key, self._clock()).used >= self.rate_limit
+
+    def consume(self, key):
+        """プライマリレート制限を1件消費する（304のレスポンスは消費しない）"""
+        with self._lock:
+            self._budget(key, self._clock()).used += 1
+
+    def rate_limit_body(self, key):
+        """/rate_limit の本文を作る"""
+        headers = self.rate_limit_headers(key)
+        core = {
+            "limit": int(headers["X-RateLimit-Limit"]),
+            "remaining": int(headers["X-RateLimit-Remaining"]),
+            "reset": int(headers["X-RateLimit-Reset"]),
+            "used": int(headers["X-RateLimit-Used"]),
+        }
+        return {"resources": {"core": core}, "rate": core}
+
+    def route(self, path, query):
+        """パスに対応するデータとエンドポイント名を返す（存在しない場合は (None, エンドポイント名)）"""
+        repository = self.repository
+        prefix = f"/repos/{repository.owner}/{repository.name}"
+        if not path.startswith(prefix + "/"):
+            return None, "unknown"
+        rest = path[len(prefix):]
+
+        if rest == "/pulls":
+            return repository.list_pulls(
+                query.get("state", "open"), query.get("sort", "created"), query.get("direction", "desc")
+            ), "pulls"
+        if rest == "/issues":
+            return repository.list_issues(
+                query.get("state", "open"), query.get("since"), query.get("sort", "created"),
+                query.get("direction", "desc"),
+            ), "issues"
+
+        match = re.fullmatch(r"/(pulls|issues)/(\d+)(?:/(\w+))?", rest)
+        if not match:
+            return None, "unknown"
+        kind, number, sub_resource = match.group(1), int(match.group(2)), match.group(3)
+        pr = repository.prs.get(number)
+
+        if sub_resource is None:
+            endpoint = f"{kind}/:number"
+            return (pr["basic_info"] if pr and kind == "pulls" else None), endpoint
+
+        key = {
+            ("pulls", "comments"): "review_comments",
+            ("pulls", "commits"): "commits",
+            ("pulls", "files"): "files",
+            ("issues", "comments"): "comments",
+            ("issues", "labels"): "labels",
+        }.get((kind, sub_resource))
+        endpoint = f"{kind}/:number/{sub_resource}"
+        if key is None or pr is None:
+            return None, endpoint
+        return pr.get(key, []), endpoint
+
+
+class _FakeGitHubHandler(BaseHTTPRequestHandler):
+    """偽GitHubサーバーのリクエストハンドラー"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fake = None
+
+    def _send_json(self, status, body, headers=None):
+        """JSONのレスポンスを返す（body には変換済みのバイト列も指定できる）"""
+        if body is None:
+            data = b""
+        elif isinstance(body, bytes):
+            data = body
+        else:
+            data = json_codec.dumps(body, compact=True)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page_links(self, path, query, page, last_page):
+        """Linkヘッダーを作る"""
+        def link(target_page, rel):
+            params = dict(query, page=str(target_page))
+            return f'<{self.fake.url}{path}?{urlencode(params)}>; rel="{rel}"'
+
+        links = []
+        if page < last_page:
+            links += [link(page + 1, "next"), link(last_page, "last")]
+        if page > 1:
+            links += [link(1, "first"), link(page - 1, "prev")]
+        return ", ".join(links)
+
+    def do_GET(self):
+        """GETリクエストを処理する"""
+        fake = self.fake
+        fake.delay()
+
+        split = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+        key = self.headers.get("Authorization") or self.client_address[0]
+
+        if split.path == "/rate_limit":
+            fake._count("rate_limit")
+            self._send_json(200, fake.rate_limit_body(key))
+            return
+
+        retry_after = fake.check_secondary_limit(key)
+        if retry_after is not None:
+            fake._count("secondary_rate_limited")
+            headers = dict(fake.rate_limit_headers(key), **{"Retry-After": str(retry_after)})
+            self._send_json(403, {"message": "You have exceeded a secondary rate limit."}, headers)
+            return
+
+        if fake.check_primary_limit(key):
+            fake._count("rate_limited")
+            self._send_json(403, {"message": "API rate limit exceeded."}, fake.rate_limit_headers(key))
+            return
+
+        data, endpoint = fake.route(split.path, query)
+        fake._count(endpoint)
+        if data is None:
+            fake.consume(key)
+            self._send_json(404, {"message": "Not Found"}, fake.rate_limit_headers(key))
+            return
+
+        headers = {}
+        if isinstance(data, list):
+            per_page = min(max(int(query.get("per_page", DEFAULT_PER_PAGE)), 1), MAX_PER_PAGE)
+            page = max(int(query.get("page", 1)), 1)
+            last_page = max(1, math.ceil(len(data) / per_page))
+            link = self._page_links(split.path, query, page, last_page)
+            if link:
+                headers["Link"] = link
+            data = data[(page - 1) * per_page:page * per_page]
+
+        body = json_codec.dumps(data, compact=True)
+        etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        headers["ETag"] = etag
+
+        if self.headers.get("If-None-Match") == etag:
+            # GitHubと同様に、304のレスポンスはレート制限を消費しない
+            fake._count("not_modified")
+            self._send_json(304, None, dict(fake.rate_limit_headers(key), **headers))
+            return
+
+        fake.consume(key)
+        self._send_json(200, body, dict(fake.rate_limit_headers(key), **headers))
+
+    def log_message(self, format, *args):
+        """アクセスログは出力しない"""
@@ -7,6 +7,8 @@ GitHubのAPIを呼び出すための共通機能を提供します。
 
 import datetime
 import os
+import re
+import threading
 import time
 import yaml
 from pathlib import Path
@@ -14,6 +16,47 @@ from pathlib import Path
 import backoff
 import requests
 
+from requests.structures import CaseInsensitiveDict
+
+from .http_cache import DEFAULT_MAX_SIZE_MB, ResponseCache
+from .http_session import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_READ_TIMEOUT,
+    HTTPSessionPool,
+)
+from .metrics import endpoint_name, get_metrics, repository_from_url
+from .rate_limiter import DEFAULT_BURST, DEFAULT_RESERVE, RateLimitScheduler
+from .retry_policy import (
+    BREAKER_FAILURES,
+    DEFAULT_COOLDOWN_SECONDS,
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_MAX_ELAPSED_SECONDS,
+    DEFAULT_MAX_RETRIES,
+    NETWORK_ERROR,
+    PRIMARY_RATE_LIMIT,
+    SECONDARY_RATE_LIMIT,
+    CircuitBreaker,
+    RetryPolicy,
+    classify_response,
+)
+from .token_pool import DEFAULT_QUARANTINE_SECONDS, TokenPool, token_fingerprint, token_from_headers
+
+
+_session_pool = None
+_session_pool_lock = threading.Lock()
+
+_response_cache = None
+_response_cache_configured = False
+_response_cache_lock = threading.Lock()
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+_retry_policy = None
+_retry_policy_lock = threading.Lock()
+
 
 def load_config():
     """設定ファイルを読み込む"""
@@ -22,9 +65,9 @@ def load_config():
         return yaml.safe_load(f)
 
 
-def get_github_token():
+def get_github_token(config=None):
     """環境変数からGitHubトークンを取得する"""
-    config = load_config()
+    config = config or load_config()
     token_env_var = config["github"]["token_env_var"]
     
     token = os.environ.get(token_env_var)
@@ -41,9 +84,8 @@ def get_github_token():
     return token
 
 
-def get_headers():
-    """APIリクエスト用のヘッダーを取得する"""
-    token = get_github_token()
+def _build_headers(token):
+    """トークンからAPIリクエスト用のヘッダーを組み立てる"""
     headers = {"Accept": "application/vnd.github.v3+json"}
     if token:
         headers["Authorization"] = f"token {token}"
@@ -51,22 +93,482 @@ def get_headers():
     return headers
 
 
-@backoff.on_exception(
-    backoff.expo,
-    (requests.exceptions.RequestException, requests.exceptions.HTTPError),
-    max_tries=5,
-    max_time=30,
-    giveup=lambda e: isinstance(e, requests.exceptions.HTTPError)
-    and e.response.status_code in [401, 403, 404],  # 認証エラーやリソースが存在しない場合は再試行しない
-)
-def make_github_api_request(url, params=None, headers=None):
-    """GitHubのAPIリクエストを実行し、再試行ロジックを適用する"""
-    if headers is None:
-        headers = get_headers()
+def get_headers():
+    """APIリクエスト用のヘッダーを取得する"""
+    return _build_headers(get_github_token())
+
+
+def get_pool_tokens(config):
+    """github.token_pool_env_var で指定した環境変数からトークンプール用のトークンを取得する"""
+    env_var = config["github"].get("token_pool_env_var")
+    if not env_var:
+        return []
+    return [token for token in re.split(r"[\s,]+", os.environ.get(env_var, "")) if token]
+
+
+class CredentialProvider:
+    """設定とGitHubトークンを一度だけ解決してキャッシュするクラス
+
+    トークンの解決（環境変数または gh auth token）は最初に必要になった時点で一度だけ行い、
+    invalidate() が呼ばれるまで結果を再利用する。トークンが複数ある場合は TokenPool で
+    リクエストごとに最も残り予算の多いトークンを選ぶ。
+    """
+    
+    def __init__(self, config=None, token=None, tokens=None):
+        """初期化
+
+        Args:
+            config: 設定辞書（省略時は設定ファイルから読み込む）
+            token: 使用するトークン（省略時は環境変数または gh CLI から解決する）
+            tokens: トークンプールとして使うトークンのリスト（省略時は github.token_pool_env_var から解決する）
+        """
+        self._initial_config = config
+        self._initial_token = token
+        self._initial_tokens = tokens
+        self._lock = threading.Lock()
+        self.invalidate()
+        
+    def invalidate(self):
+        """キャッシュした設定とトークンを破棄し、次回アクセス時に再解決させる"""
+        with self._lock:
+            self._config = self._initial_config
+            self._token = self._initial_token
+            self._token_resolved = self._initial_token is not None
+            self._headers = None
+            self._token_pool = None
+            self._token_pool_resolved = False
+            
+    def get_config(self):
+        """設定を取得する"""
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = load_config()
+        return self._config
+    
+    def get_token(self):
+        """GitHubトークンを取得する（見つからない場合はNone）"""
+        if not self._token_resolved:
+            config = self.get_config()
+            with self._lock:
+                if not self._token_resolved:
+                    self._token = get_github_token(config)
+                    self._token_resolved = True
+        return self._token
+    
+    def get_token_pool(self):
+        """トークンが複数ある場合はTokenPoolを返す（1つ以下の場合はNone）"""
+        if not self._token_pool_resolved:
+            if self._initial_tokens is not None:
+                tokens = list(self._initial_tokens)
+            else:
+                tokens = [self.get_token()] + get_pool_tokens(self.get_config())
+            tokens = list(dict.fromkeys(token for token in tokens if token))
+            
+            with self._lock:
+                if not self._token_pool_resolved:
+                    if len(tokens) > 1:
+                        quarantine_seconds = self.get_config()["github"].get(
+                            "token_quarantine_seconds", DEFAULT_QUARANTINE_SECONDS
+                        )
+                        self._token_pool = TokenPool(tokens, quarantine_seconds=quarantine_seconds)
+                    elif tokens and not self._token_resolved:
+                        self._token = tokens[0]
+                        self._token_resolved = True
+                    self._token_pool_resolved = True
+        return self._token_pool
+    
+    def get_headers(self):
+        """APIリクエスト用のヘッダーを取得する（呼び出し側で変更できるようコピーを返す）"""
+        token_pool = self.get_token_pool()
+        if token_pool is not None:
+            return _build_headers(token_pool.acquire())
+            
+        if self._headers is None:
+            self._headers = _build_headers(self.get_token())
+        return dict(self._headers)
+    
+    def record_response(self, request_headers, status_code, response_headers, rate_limited=None, body=""):
+        """レスポンスをトークンプールに反映する
+
+        リクエストに使ったトークンが隔離され、別のトークンで再試行できる場合はTrueを返す。
+        rate_limited にはレスポンスがレート制限によるものかを渡す（Noneの場合はヘッダーから判断する）。
+        body には403の本文を渡す（トークン自体の問題かどうかの判断に使う）。
+        """
+        token_pool = self.get_token_pool()
+        if token_pool is None:
+            return False
+            
+        token = token_from_headers(request_headers)
+        quarantined = token_pool.record_response(
+            token, status_code, response_headers, rate_limited=rate_limited, body=body
+        )
+        return quarantined and token_pool.has_available_token(exclude=token)
+
+
+_credential_provider = None
+_credential_provider_lock = threading.Lock()
+
+
+def get_credential_provider():
+    """プロセス全体で共有するCredentialProviderを取得する"""
+    global _credential_provider
+    if _credential_provider is None:
+        with _credential_provider_lock:
+            if _credential_provider is None:
+                _credential_provider = CredentialProvider()
+    return _credential_provider
+
+
+def set_credential_provider(provider):
+    """プロセス全体で共有するCredentialProviderを差し替える"""
+    global _credential_provider
+    with _credential_provider_lock:
+        _credential_provider = provider
+
+
+def invalidate_credentials():
+    """共有CredentialProviderのキャッシュを破棄する"""
+    get_credential_provider().invalidate()
+
+
+def _build_session_pool(pool_connections=None, pool_maxsize=None):
+    """HTTPセッションプールを作成する（未指定の値は設定ファイルから読み込む）"""
+    api_config = get_credential_provider().get_config().get("api", {})
+    if pool_connections is None:
+        pool_connections = api_config.get("pool_connections", DEFAULT_POOL_CONNECTIONS)
+    if pool_maxsize is None:
+        pool_maxsize = api_config.get("pool_maxsize", DEFAULT_POOL_MAXSIZE)
+    return HTTPSessionPool(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        connect_timeout=api_config.get("connect_timeout_seconds", DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=api_config.get("read_timeout_seconds", DEFAULT_READ_TIMEOUT),
+    )
+
+
+def configure_session_pool(pool_connections=None, pool_maxsize=None):
+    """共有HTTPセッションプールを指定したサイズで作り直す"""
+    global _session_pool
+    new_pool = _build_session_pool(pool_connections, pool_maxsize)
+    with _session_pool_lock:
+        old_pool, _session_pool = _session_pool, new_pool
+    if old_pool is not None:
+        old_pool.close()
+    return new_pool
+
+
+def get_session_pool():
+    """プロセス全体で共有するHTTPセッションプールを取得する"""
+    global _session_pool
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = _build_session_pool()
+    return _session_pool
+
+
+def get_session_stats():
+    """共有HTTPセッションの接続再利用統計を取得する"""
+    return get_session_pool().get_stats()
+
+
+def _build_response_cache():
+    """設定ファイルの http_cache セクションからレスポンスキャッシュを作成する（無効な場合はNone）"""
+    cache_config = get_credential_provider().get_config().get("http_cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+    
+    max_size_mb = cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+    return ResponseCache(cache_config.get("cache_dir", ".cache/github_api"), max_bytes=max_size_mb * 1024 * 1024)
+
+
+def configure_response_cache(cache):
+    """共有レスポンスキャッシュを差し替える（Noneでキャッシュを無効化）"""
+    global _response_cache, _response_cache_configured
+    with _response_cache_lock:
+        _response_cache = cache
+        _response_cache_configured = True
+    return cache
+
 
-    response = requests.get(url, headers=headers, params=params)
+def get_response_cache():
+    """プロセス全体で共有するレスポンスキャッシュを取得する（無効な場合はNone）"""
+    global _response_cache, _response_cache_configured
+    if not _response_cache_configured:
+        with _response_cache_lock:
+            if not _response_cache_configured:
+                _response_cache = _build_response_cache()
+                _response_cache_configured = True
+    return _response_cache
+
+
+def get_response_cache_stats():
+    """共有レスポンスキャッシュの統計を取得する（無効な場合はNone）"""
+    cache = get_response_cache()
+    return cache.get_stats() if cache else None
+
+
+def _build_rate_limiter():
+    """設定ファイルの api セクションからレート制限スケジューラーを作成する"""
+    api_config = get_credential_provider().get_config().get("api", {})
+    return RateLimitScheduler(
+        reserve=api_config.get("rate_limit_reserve", DEFAULT_RESERVE),
+        burst=api_config.get("rate_limit_burst", DEFAULT_BURST),
+        wait_for_reset=api_config.get("rate_limit_wait", True),
+    )
+
+
+def configure_rate_limiter(scheduler=None):
+    """共有レート制限スケジューラーを差し替える（Noneの場合は設定ファイルから作り直す）"""
+    global _rate_limiter
+    scheduler = scheduler or _build_rate_limiter()
+    with _rate_limiter_lock:
+        _rate_limiter = scheduler
+    return scheduler
+
+
+def get_rate_limiter():
+    """プロセス全体で共有するレート制限スケジューラーを取得する"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = _build_rate_limiter()
+    return _rate_limiter
+
+
+def _build_retry_policy():
+    """設定ファイルの api セクションから再試行ポリシーを作成する"""
+    api_config = get_credential_provider().get_config().get("api", {})
+    breaker = CircuitBreaker(
+        failure_threshold=api_config.get("circuit_breaker_threshold", DEFAULT_FAILURE_THRESHOLD),
+        cooldown=api_config.get("circuit_breaker_cooldown", DEFAULT_COOLDOWN_SECONDS),
+    )
+    return RetryPolicy(
+        max_retries=api_config.get("retry_count", DEFAULT_MAX_RETRIES),
+        max_elapsed=api_config.get("retry_max_seconds", DEFAULT_MAX_ELAPSED_SECONDS),
+        wait_for_reset=api_config.get("rate_limit_wait", True),
+        breaker=breaker,
+    )
+
+
+def configure_retry_policy(policy=None):
+    """共有再試行ポリシーを差し替える（Noneの場合は設定ファイルから作り直す）"""
+    global _retry_policy
+    policy = policy or _build_retry_policy()
+    with _retry_policy_lock:
+        _retry_policy = policy
+    return policy
+
+
+def get_retry_policy():
+    """プロセス全体で共有する再試行ポリシーを取得する"""
+    global _retry_policy
+    if _retry_policy is None:
+        with _retry_policy_lock:
+            if _retry_policy is None:
+                _retry_policy = _build_retry_policy()
+    return _retry_policy
+
+
+def _send_github_request(method, url, resource, headers=None, credentials=None, extra_headers=None, **kwargs):
+    """レート制限・トークンプール・再試行ポリシーを考慮してリクエストを送信する
+
+    headers を省略した場合は credentials からヘッダーを取得し、認証エラーでトークンが隔離されたときは
+    別のトークンで送り直す。レート制限・サーバーエラー・通信エラーは再試行ポリシーに従って送り直し、
+    再試行しない（または再試行を諦めた）エラーレスポンスはそのまま返す（通信エラーは例外を送出する）。
+    一時的なエラーが続いてサーキットブレーカーが開いた場合は、全スレッドのリクエストを一定時間止める。
+    """
+    credentials = credentials or get_credential_provider()
+    rate_limiter = get_rate_limiter()
+    retry_policy = get_retry_policy()
+    metrics = get_metrics()
+    endpoint = endpoint_name(url)
+    # 複数のリポジトリを同時に収集する場合に、リポジトリごとに公平にレート制限の予算を割り当てる
+    tenant = repository_from_url(url)
+    first_sent = time.monotonic()
+    attempt = 0
+
+    while True:
+        request_headers = dict(headers) if headers is not None else credentials.get_headers()
+        request_headers.update(extra_headers or {})
+        token_key = token_fingerprint(token_from_headers(request_headers))
+
+        waited = rate_limiter.acquire(resource, key=token_key, tenant=tenant)
+        if waited:
+            metrics.record_rate_limit_wait(resource, waited)
+
+        started = time.perf_counter()
+        response = None
+        error = None
+        try:
+            response = get_session_pool().request(method, url, headers=request_headers, **kwargs)
+        except requests.exceptions.RequestException as e:
+            metrics.record_request(endpoint, seconds=time.perf_counter() - started, error=type(e).__name__)
+            error = e
+            failure = NETWORK_ERROR
+        else:
+            metrics.record_request(
+                endpoint, response.status_code, time.perf_counter() - started, len(response.content)
+            )
+            rate_limiter.update_from_headers(response.headers, key=token_key)
+
+            body = response.text if response.status_code in (403, 429) else ""
+            failure = classify_response(response.status_code, response.headers, body)
+            retry_with_another_token = credentials.record_response(
+                request_headers, response.status_code, response.headers,
+                rate_limited=failure in (PRIMARY_RATE_LIMIT, SECONDARY_RATE_LIMIT), body=body,
+            )
+            if headers is None and retry_with_another_token:
+                metrics.record_retry(endpoint, "token_quarantined")
+                continue
+
+        if failure in BREAKER_FAILURES:
+            pause = retry_policy.breaker.record_failure()
+            if pause:
+                print(f"一時的なエラーが続いたため、すべてのリクエストを {pause:.0f}秒 停止します ({endpoint}: {failure})")
+                rate_limiter.pause(pause)
+        else:
+            retry_policy.breaker.record_success()
+
+        attempt += 1
+        delay = retry_policy.retry_delay(
+            failure, attempt, time.monotonic() - first_sent, response.headers if response is not None else None
+        )
+        if delay is None:
+            if error is not None:
+                raise error
+            return response
+
+        metrics.record_retry(endpoint, failure)
+        if delay > 0:
+            retry_policy.sleep(delay)
+
+
+def fetch_github_api(url, params=None, headers=None, cache=None, credentials=None):
+    """GitHubのAPIリクエストを実行し、レスポンス本文とレスポンスヘッダーを返す
+
+    レスポンスキャッシュが有効な場合は保存済みの検証子で条件付きリクエストを送り、
+    304 Not Modified なら保存済みの本文を返す。cache=False でキャッシュを使わない。
+    """
+    if cache is None:
+        cache = get_response_cache()
+        
+    entry = cache.get(url, params) if cache else None
+    conditional_headers = cache.conditional_headers(entry) if entry else None
+
+    response = _send_github_request(
+        "GET", url, "core", headers=headers, credentials=credentials, extra_headers=conditional_headers, params=params
+    )
+    
+    if entry and response.status_code == 304:
+        cache.record_hit(url, params)
+        response_headers = CaseInsensitiveDict(response.headers)
+        if entry.get("link") and "Link" not in response_headers:
+            response_headers["Link"] = entry["link"]
+        return entry["body"], response_headers
+        
     response.raise_for_status()
-    return response.json()
+    data = response.json()
+    
+    if cache:
+        cache.record_miss()
+        cache.store(
+            url,
+            params,
+            data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            link=response.headers.get("Link"),
+        )
+    return data, response.headers
+
+
+def make_github_api_request(url, params=None, headers=None, credentials=None):
+    """GitHubのAPIリクエストを実行し、レスポンス本文を返す（再試行は再試行ポリシーに従う）"""
+    data, _ = fetch_github_api(url, params=params, headers=headers, credentials=credentials)
+    return data
+
+
+class GitHubGraphQLError(Exception):
+    """GraphQL APIがエラーを返した場合の例外"""
+    
+    def __init__(self, errors):
+        self.errors = errors
+        messages = "; ".join(str(error.get("message", error)) for error in errors)
+        super().__init__(f"GraphQL APIエラー: {messages}")
+
+
+def make_github_graphql_request(url, query, variables=None, headers=None, credentials=None):
+    """GitHubのGraphQL APIリクエストを実行し、dataを返す
+
+    一部の要素だけが取得できなかった場合（存在しないPR番号など）はエラーを無視してdataを返し、
+    dataがまったく得られなかった場合は GitHubGraphQLError を送出する。
+    """
+    response = _send_github_request(
+        "POST", url, "graphql", headers=headers, credentials=credentials,
+        json={"query": query, "variables": variables or {}},
+    )
+    response.raise_for_status()
+    
+    result = response.json()
+    if result.get("errors") and not result.get("data"):
+        raise GitHubGraphQLError(result["errors"])
+        
+    return result.get("data") or {}
+
+
+def parse_link_header(link_header):
+    """Linkヘッダーを rel ごとのURL辞書に変換する"""
+    links = {}
+    if not link_header:
+        return links
+        
+    for part in link_header.split(","):
+        match = re.match(r'\s*<([^>]+)>\s*;\s*rel="([^"]+)"', part)
+        if match:
+            links[match.group(2)] = match.group(1)
+            
+    return links
+
+
+def iter_github_api_items(url, params=None, headers=None, per_page=100, max_items=None, credentials=None):
+    """Linkヘッダーの rel="next" をたどりながら一覧APIの要素を順に返すジェネレータ
+
+    Args:
+        url: 一覧APIのURL
+        params: 追加のクエリパラメータ
+        headers: リクエストヘッダー（省略時は credentials のヘッダー）
+        per_page: 1ページあたりの取得件数（GitHubの上限は100）
+        max_items: 取得する要素数の上限（Noneは無制限）
+        credentials: ページごとのヘッダーを提供するCredentialProvider（省略時はプロセス共有のもの）
+    """
+    if max_items is not None and max_items <= 0:
+        return
+        
+    params = dict(params or {})
+    params["per_page"] = per_page
+    count = 0
+    
+    while url:
+        items, response_headers = fetch_github_api(url, params=params, headers=headers, credentials=credentials)
+        for item in items or []:
+            yield item
+            count += 1
+            if max_items is not None and count >= max_items:
+                return
+                
+        # nextのURLにはクエリパラメータがすべて含まれている
+        url = parse_link_header(response_headers.get("Link")).get("next")
+        params = None
+
+
+def get_all_github_api_items(url, params=None, headers=None, per_page=100, max_items=None, credentials=None):
+    """一覧APIの全ページを取得してリストで返す"""
+    return list(iter_github_api_items(
+        url, params=params, headers=headers, per_page=per_page, max_items=max_items, credentials=credentials
+    ))
 
 
 @backoff.on_exception(
@@ -74,17 +576,23 @@ def make_github_api_request(url, params=None, headers=None):
     requests.exceptions.RequestException,
     max_tries=3,
 )
-def check_rate_limit():
+def check_rate_limit(credentials=None):
     """GitHub APIのレート制限状況を確認する"""
-    config = load_config()
-    api_base_url = config["github"]["api_base_url"]
+    credentials = credentials or get_credential_provider()
+    api_base_url = credentials.get_config()["github"]["api_base_url"]
     
     url = f"{api_base_url}/rate_limit"
-    response = requests.get(url, headers=get_headers())
+    headers = credentials.get_headers()
+    response = get_session_pool().get(url, headers=headers)
     response.raise_for_status()
 
     rate_limit_data = response.json()
     core_rate = rate_limit_data["resources"]["core"]
+    
+    rate_limiter = get_rate_limiter()
+    token_key = token_fingerprint(token_from_headers(headers))
+    for resource, rate in rate_limit_data["resources"].items():
+        rate_limiter.update(resource, rate.get("remaining"), rate.get("reset"), rate.get("limit"), key=token_key)
 
     remaining = core_rate["remaining"]
     reset_time = datetime.datetime.fromtimestamp(core_rate["reset"])
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+HTTPレスポンスキャッシュモジュール
+
+ETag / Last-Modified を保存して条件付きリクエストを行い、
+304 Not Modified の場合にディスク上のレスポンスを再利用します。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import json_codec
+from .atomic_write import write_atomic
+
+
+DEFAULT_MAX_SIZE_MB = 500
+
+
+class ResponseCache:
+    """URLとパラメータごとにレスポンスと検証子を保存するディスクキャッシュ
+
+    キャッシュの合計サイズが max_bytes を超えた場合、最も長く使われていないエントリから削除する。
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_SIZE_MB * 1024 * 1024):
+        """初期化
+
+        Args:
+            cache_dir: キャッシュファイルを保存するディレクトリ
+            max_bytes: キャッシュの最大合計サイズ（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(url, params=None):
+        """URLとパラメータからキャッシュキーを作成する"""
+        normalized_params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        raw_key = json.dumps([url, normalized_params], ensure_ascii=False)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _path_for_key(self, key):
+        """キャッシュキーに対応するファイルパスを返す"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        """ディスク上のキャッシュファイルからサイズと最終利用時刻の索引を作る（ロック保持中に呼ぶ）"""
+        if self._index is not None:
+            return
+
+        self._index = {}
+        self._total_bytes = 0
+        if not self.cache_dir.exists():
+            return
+
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[path.stem] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+
+    def get(self, url, params=None):
+        """保存済みのエントリを取得する（存在しない場合はNone）"""
+        key = self.make_key(url, params)
+        path = self._path_for_key(key)
+        try:
+            return json_codec.load_file(path)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, entry):
+        """エントリの検証子から条件付きリクエスト用のヘッダーを作る"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_hit(self, url, params=None):
+        """304で再利用したことを記録し、エントリの最終利用時刻を更新する"""
+        key = self.make_key(url, params)
+        now = time.time()
+        with self._lock:
+            self.hits += 1
+            self._load_index()
+            if key in self._index:
+                size, _ = self._index[key]
+                self._index[key] = (size, now)
+        try:
+            os.utime(self._path_for_key(key), (now, now))
+        except OSError:
+            pass
+
+    def record_miss(self):
+        """キャッシュを利用できなかったことを記録する"""
+        with self._lock:
+            self.misses += 1
+
+    def store(self, url, params, body, etag=None, last_modified=None, link=None):
+        """レスポンスを検証子とともに保存する（検証子がない場合は保存しない）"""
+        if not etag and not last_modified:
+            return False
+
+        entry = {
+            "url": url,
+            "params": params or {},
+            "etag": etag,
+            "last_modified": last_modified,
+            "link": link,
+            "body": body,
+        }
+        data = json_codec.dumps(entry, compact=True)
+
+        key = self.make_key(url, params)
+        path = self._path_for_key(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        write_atomic(path, data)
+
+        with self._lock:
+            self._load_index()
+            old_size, _ = self._index.get(key, (0, 0))
+            self._index[key] = (len(data), time.time())
+            self._total_bytes += len(data) - old_size
+            self.stores += 1
+            self._evict()
+
+        return True
+
+    def _evict(self):
+        """合計サイズが上限を超えている間、最も古いエントリを削除する（ロック保持中に呼ぶ）"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path_for_key(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def get_stats(self):
+        """キャッシュの統計を取得する"""
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+    def clear(self):
+        """すべてのエントリを削除する"""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                try:
+                    os.remove(self._path_for_key(key))
+                except OSError:
+                    pass
+            self._index = {}
+            self._total_bytes = 0
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+HTTPセッション管理モジュール
+
+keep-aliveで接続を再利用する共有HTTPセッションと、接続再利用の統計を提供します。
+"""
+
+import math
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+MAX_LATENCY_SAMPLES = 100000
+
+
+def percentile(sorted_values, fraction):
+    """昇順に並んだ値の分位点を返す（最近傍法、値がない場合はNone）"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class SessionStats:
+    """HTTPリクエスト数・新規接続数・リクエストの所要時間を集計するクラス
+
+    所要時間は最大 MAX_LATENCY_SAMPLES 件までリザーバーサンプリングで保持し、分位点の計算に使う。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.requests = 0
+        self.new_connections = 0
+        self.latency_samples = []
+        self.total_latency = 0.0
+
+    def record_request(self):
+        """リクエストを1件記録する"""
+        with self._lock:
+            self.requests += 1
+
+    def record_latency(self, seconds):
+        """リクエストの所要時間を記録する"""
+        with self._lock:
+            self.total_latency += seconds
+            if len(self.latency_samples) < MAX_LATENCY_SAMPLES:
+                self.latency_samples.append(seconds)
+                return
+            index = self._random.randrange(self.requests)
+            if index < MAX_LATENCY_SAMPLES:
+                self.latency_samples[index] = seconds
+
+    def record_new_connection(self):
+        """新規接続を1件記録する"""
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self):
+        """現在の統計を辞書で返す"""
+        with self._lock:
+            requests_count = self.requests
+            new_connections = self.new_connections
+            latencies = sorted(self.latency_samples)
+            total_latency = self.total_latency
+
+        reused = max(0, requests_count - new_connections)
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "reused_connections": reused,
+            "reuse_ratio": reused / requests_count if requests_count else 0.0,
+            "total_latency_seconds": total_latency,
+            "latency_p50_seconds": percentile(latencies, 0.50),
+            "latency_p95_seconds": percentile(latencies, 0.95),
+            "latency_p99_seconds": percentile(latencies, 0.99),
+        }
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """新規接続の作成回数を数えるHTTPAdapter"""
+
+    def __init__(self, stats, **kwargs):
+        """初期化"""
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """接続作成を記録するコネクションプールを使うPoolManagerを初期化する"""
+        super().init_poolmanager(*args, **kwargs)
+        stats = self._stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.record_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.record_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+class HTTPSessionPool:
+    """スレッド間で共有するkeep-alive HTTPセッション"""
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        """初期化
+
+        Args:
+            pool_connections: ホストごとに保持するコネクションプールの数
+            pool_maxsize: 1つのプールで保持する最大接続数（並列ワーカー数以上にする）
+            connect_timeout: 接続確立を待つ秒数
+            read_timeout: 応答データの受信を待つ秒数（受信が途切れてからの秒数）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = SessionStats()
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _create_session(self):
+        """接続プール付きのセッションを作成する"""
+        session = requests.Session()
+        # 再試行は呼び出し側の再試行ポリシーで行うため、アダプターでは再試行しない
+        adapter = _CountingHTTPAdapter(
+            self.stats,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def session(self):
+        """共有セッションを取得する（初回アクセス時に作成）"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        """共有セッションでHTTPリクエストを実行する（timeout 未指定時はプールのタイムアウトを使う）"""
+        # 応答のない接続で待ち続けると収集の締め切りを守れないため、必ずタイムアウトを付ける
+        kwargs.setdefault("timeout", self.timeout)
+        self.stats.record_request()
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            self.stats.record_latency(time.perf_counter() - started)
+
+    def get(self, url, **kwargs):
+        """共有セッションでGETリクエストを実行する"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """共有セッションでPOSTリクエストを実行する"""
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        """接続再利用の統計を取得する"""
+        return self.stats.snapshot()
+
+    def close(self):
+        """セッションを閉じて保持している接続を解放する"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
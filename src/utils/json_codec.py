@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+JSONの読み書きモジュール
+
+PRデータ・保存先・キャッシュ・移行スクリプトのJSONの読み書きをこのモジュールにまとめます。
+orjson がインストールされていればそれを使い、なければ標準ライブラリの json を使います。
+どちらのバックエンドでも、整形した出力は json.dumps(..., ensure_ascii=False, indent=2) と、
+compact=True の出力は separators=(",", ":") と同じバイト列になります（浮動小数点数の表記を除く）。
+compact=True は人が読まないファイル（キャッシュやダイジェストの記録など）に使います。
+"""
+
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # orjson は任意の依存関係
+    orjson = None
+
+
+BACKEND_AUTO = "auto"
+BACKEND_STDLIB = "stdlib"
+BACKEND_ORJSON = "orjson"
+
+
+class StdlibBackend:
+    """標準ライブラリの json によるバックエンド"""
+
+    name = BACKEND_STDLIB
+
+    @staticmethod
+    def loads(data):
+        """JSONのバイト列または文字列を読み込む"""
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(value, compact=False, sort_keys=False):
+        """値をUTF-8のバイト列にする"""
+        if compact:
+            text = json.dumps(value, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"))
+        else:
+            text = json.dumps(value, ensure_ascii=False, sort_keys=sort_keys, indent=2)
+        return text.encode("utf-8")
+
+
+class OrjsonBackend:
+    """orjson によるバックエンド
+
+    orjson で扱えない値（64ビットを超える整数や対になっていないサロゲートなど）は標準ライブラリで書き出す。
+    """
+
+    name = BACKEND_ORJSON
+
+    @staticmethod
+    def loads(data):
+        """JSONのバイト列または文字列を読み込む"""
+        return orjson.loads(data)
+
+    @staticmethod
+    def dumps(value, compact=False, sort_keys=False):
+        """値をUTF-8のバイト列にする"""
+        option = 0 if compact else orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            return StdlibBackend.dumps(value, compact=compact, sort_keys=sort_keys)
+
+
+def available_backends():
+    """インストールされているバックエンド（名前からバックエンドへの辞書）"""
+    backends = {BACKEND_STDLIB: StdlibBackend}
+    if orjson is not None:
+        backends[BACKEND_ORJSON] = OrjsonBackend
+    return backends
+
+
+def _select_backend(name):
+    """名前からバックエンドを選ぶ（auto は使える中で最も速いもの）"""
+    backends = available_backends()
+    if name in (None, BACKEND_AUTO):
+        return backends.get(BACKEND_ORJSON, StdlibBackend)
+    if name not in backends:
+        raise ValueError(f"JSONのバックエンド {name} は使えません（{', '.join(backends)} のいずれかを指定してください）")
+    return backends[name]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_json_backend():
+    """プロセスで共有するバックエンドを取得する（未設定の場合は auto で選ぶ）"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _select_backend(BACKEND_AUTO)
+        return _backend
+
+
+def configure_json_backend(name=BACKEND_AUTO):
+    """プロセスで共有するバックエンドを設定する（auto / stdlib / orjson）"""
+    global _backend
+    backend = _select_backend(name)
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def loads(data):
+    """JSONのバイト列または文字列を読み込む"""
+    return get_json_backend().loads(data)
+
+
+def dumps(value, compact=False, sort_keys=False):
+    """値をUTF-8のバイト列にする（compact=False は2文字のインデントで整形する）"""
+    return get_json_backend().dumps(value, compact=compact, sort_keys=sort_keys)
+
+
+def load_file(path):
+    """JSONファイルを読み込む"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(value, path, compact=False):
+    """値をJSONファイルに書き込む"""
+    with open(path, "wb") as f:
+        f.write(dumps(value, compact=compact))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+マークダウンのセクション抽出モジュール
+
+PRのパッチで追加されたマークダウンの見出しを抽出します。
+セクション分析と、PRデータの保存先のセクションのインデックスで共通して使います。
+"""
+
+import re
+
+
+HEADING_PATTERN = re.compile(r'^\+\s*(#{1,6})\s+(.+)$')
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+
+def extract_sections_from_patch(patch):
+    """パッチからセクション（見出し）を抽出する"""
+    if not patch:
+        return []
+
+    sections = []
+    for line in patch.split('\n'):
+        match = HEADING_PATTERN.match(line)
+        if match:
+            level = len(match.group(1))  # #の数（見出しレベル）
+            title = match.group(2).strip()
+            sections.append({
+                "level": level,
+                "title": title,
+                "line": line
+            })
+
+    return sections
+
+
+def extract_file_sections(files):
+    """PRの変更ファイルのうち、マークダウンファイルごとのセクションを抽出する
+
+    戻り値は [{"filename": ..., "sections": [...]}, ...]（セクションのないファイルは含まない）。
+    """
+    file_sections = []
+    for file_info in files or []:
+        filename = file_info.get("filename", "")
+        if not filename.lower().endswith(MARKDOWN_EXTENSIONS):
+            continue
+
+        sections = extract_sections_from_patch(file_info.get("patch"))
+        if sections:
+            file_sections.append({
+                "filename": filename,
+                "sections": sections
+            })
+
+    return file_sections
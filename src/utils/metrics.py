@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+実行メトリクス管理モジュール
+
+GitHub APIリクエストのエンドポイントごとの件数・所要時間・転送量・再試行・304・エラーと、
+レート制限による待機時間、処理段階ごとの所要時間を集計し、
+JSONの実行サマリーとPrometheusのテキスト形式のファイルに書き出します。
+"""
+
+import contextlib
+import copy
+import datetime
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from . import json_codec
+from .atomic_write import write_atomic
+
+
+SUMMARY_FILENAME = "run_metrics.json"
+PROMETHEUS_FILENAME = "run_metrics.prom"
+METRIC_PREFIX = "pr_analysis"
+
+# リクエスト所要時間のヒストグラムの上限値（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NUMBER_SEGMENT = re.compile(r"^\d+$")
+
+
+def endpoint_name(url):
+    """URLを集計用のエンドポイント名に変換する
+
+    /repos/{owner}/{repo}/ 以降のパスを使い、PR番号などの数値は :number に置き換える
+    （例: https://api.github.com/repos/o/r/pulls/12/files → pulls/:number/files）。
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    if len(segments) >= 3 and segments[0] == "repos":
+        segments = segments[3:] or ["repo"]
+    if not segments:
+        return "/"
+    return "/".join(":number" if _NUMBER_SEGMENT.match(segment) else segment for segment in segments)
+
+
+def repository_from_url(url):
+    """URLの /repos/{owner}/{repo}/ から "owner/repo" を取り出す（リポジトリのURLでない場合はNone）"""
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    if len(segments) >= 3 and segments[0] == "repos":
+        return f"{segments[1]}/{segments[2]}"
+    return None
+
+
+def _empty_endpoint():
+    """エンドポイントの集計の初期値"""
+    return {
+        "requests": 0,
+        "status": {},
+        "errors": {},
+        "retries": {},
+        "not_modified": 0,
+        "response_bytes": 0,
+        "latency_seconds": {"sum": 0.0, "buckets": {}},
+    }
+
+
+def _quantile_upper_bound(buckets, count, fraction):
+    """ヒストグラムの分位点が含まれるバケットの上限値を返す（値がない場合はNone）"""
+    if not count:
+        return None
+    target = fraction * count
+    cumulative = 0
+    for upper, bucket_count in sorted(buckets.items(), key=lambda item: float(item[0])):
+        cumulative += bucket_count
+        if cumulative >= target:
+            return float(upper)
+    return None
+
+
+def _add_counts(target, source):
+    """数値は足し合わせ、辞書は再帰的にまとめる"""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            _add_counts(target.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            target[key] = target.get(key, 0) + value
+
+
+def _finalize(summary):
+    """合計値と分位点を計算し直す"""
+    totals = {"requests": 0, "errors": 0, "retries": 0, "not_modified": 0, "response_bytes": 0}
+    for stats in summary["endpoints"].values():
+        latency = stats["latency_seconds"]
+        latency["count"] = sum(latency["buckets"].values())
+        for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            latency[name] = _quantile_upper_bound(latency["buckets"], latency["count"], fraction)
+        totals["requests"] += stats["requests"]
+        totals["errors"] += sum(stats["errors"].values())
+        totals["retries"] += sum(stats["retries"].values())
+        totals["not_modified"] += stats["not_modified"]
+        totals["response_bytes"] += stats["response_bytes"]
+    totals["rate_limit_wait_seconds"] = sum(wait["seconds"] for wait in summary["rate_limit_waits"].values())
+    summary["totals"] = totals
+    return summary
+
+
+def merge_summaries(base, other):
+    """2つの実行サマリーを1つにまとめる（件数と時間は足し合わせる）"""
+    merged = {
+        "started_at": min(value for value in (base.get("started_at"), other.get("started_at")) if value),
+        "finished_at": max(value for value in (base.get("finished_at"), other.get("finished_at")) if value),
+        "endpoints": {},
+        "rate_limit_waits": {},
+        "stages": {},
+    }
+    for summary in (base, other):
+        for key in ("endpoints", "rate_limit_waits", "stages"):
+            _add_counts(merged[key], summary.get(key, {}))
+    for stats in merged["endpoints"].values():
+        for key, value in _empty_endpoint().items():
+            stats.setdefault(key, value)
+    return _finalize(merged)
+
+
+def _escape_label(value):
+    """Prometheusのラベル値をエスケープする"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    """Prometheusのラベル部分を作成する"""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    """Prometheusの値を文字列にする"""
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_prometheus(summary):
+    """実行サマリーをPrometheusのテキスト形式に変換する"""
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        for suffix, labels, value in samples:
+            lines.append(f"{full_name}{suffix}{_labels(**labels)} {_format_value(value)}")
+
+    endpoints = sorted(summary["endpoints"].items())
+    metric("github_requests_total", "counter", "GitHub API requests by endpoint and status.", [
+        ("", {"endpoint": endpoint, "status": status}, count)
+        for endpoint, stats in endpoints for status, count in sorted(stats["status"].items())
+    ])
+    metric("github_not_modified_total", "counter", "Requests answered with 304 Not Modified.", [
+        ("", {"endpoint": endpoint}, stats["not_modified"]) for endpoint, stats in endpoints
+    ])
+    metric("github_response_bytes_total", "counter", "Response body bytes received.", [
+        ("", {"endpoint": endpoint}, stats["response_bytes"]) for endpoint, stats in endpoints
+    ])
+    metric("github_retries_total", "counter", "Requests sent again after a failure.", [
+        ("", {"endpoint": endpoint, "reason": reason}, count)
+        for endpoint, stats in endpoints for reason, count in sorted(stats["retries"].items())
+    ])
+    metric("github_errors_total", "counter", "Failed requests by error type or HTTP status.", [
+        ("", {"endpoint": endpoint, "error": error}, count)
+        for endpoint, stats in endpoints for error, count in sorted(stats["errors"].items())
+    ])
+
+    histogram_samples = []
+    for endpoint, stats in endpoints:
+        latency = stats["latency_seconds"]
+        cumulative = 0
+        for upper in LATENCY_BUCKETS:
+            cumulative += latency["buckets"].get(repr(upper), 0)
+            histogram_samples.append(("_bucket", {"endpoint": endpoint, "le": repr(upper)}, cumulative))
+        histogram_samples.append(("_bucket", {"endpoint": endpoint, "le": "+Inf"}, latency["count"]))
+        histogram_samples.append(("_sum", {"endpoint": endpoint}, latency["sum"]))
+        histogram_samples.append(("_count", {"endpoint": endpoint}, latency["count"]))
+    metric("github_request_duration_seconds", "histogram", "GitHub API request latency.", histogram_samples)
+
+    waits = sorted(summary["rate_limit_waits"].items())
+    metric("rate_limit_wait_seconds_total", "counter", "Time spent waiting for the rate limit.", [
+        ("", {"resource": resource}, wait["seconds"]) for resource, wait in waits
+    ])
+    metric("rate_limit_waits_total", "counter", "Requests delayed by the rate limit.", [
+        ("", {"resource": resource}, wait["count"]) for resource, wait in waits
+    ])
+
+    stages = sorted(summary["stages"].items())
+    metric("stage_duration_seconds", "gauge", "Wall-clock time spent in each processing stage.", [
+        ("", {"stage": stage}, stats["seconds"]) for stage, stats in stages
+    ])
+    metric("stage_items", "gauge", "Items processed in each processing stage.", [
+        ("", {"stage": stage}, stats["items"]) for stage, stats in stages
+    ])
+
+    finished_at = datetime.datetime.fromisoformat(summary["finished_at"])
+    metric("run_finished_timestamp_seconds", "gauge", "Time the run summary was written.", [
+        ("", {}, finished_at.timestamp())
+    ])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """1回の実行のメトリクスを集計するクラス（スレッドセーフ）"""
+
+    def __init__(self, clock=time.perf_counter):
+        """初期化"""
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.endpoints = {}
+        self.rate_limit_waits = {}
+        self.stages = {}
+
+    def _endpoint(self, endpoint):
+        """エンドポイントの集計を取得する（ロックを取得した状態で呼ぶ）"""
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = _empty_endpoint()
+        return self.endpoints[endpoint]
+
+    def record_request(self, endpoint, status=None, seconds=0.0, response_bytes=0, error=None):
+        """リクエストを1件記録する
+
+        status が None の場合は応答が得られなかったものとして error（例外のクラス名）を記録する。
+        """
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["requests"] += 1
+            if status is not None:
+                stats["status"][str(status)] = stats["status"].get(str(status), 0) + 1
+                if status == 304:
+                    stats["not_modified"] += 1
+                elif status >= 400:
+                    error = error or str(status)
+            if error:
+                stats["errors"][error] = stats["errors"].get(error, 0) + 1
+            stats["response_bytes"] += response_bytes
+
+            latency = stats["latency_seconds"]
+            latency["sum"] += seconds
+            upper = next((bound for bound in LATENCY_BUCKETS if seconds <= bound), "+Inf")
+            key = repr(upper) if upper != "+Inf" else upper
+            latency["buckets"][key] = latency["buckets"].get(key, 0) + 1
+
+    def record_retry(self, endpoint, reason):
+        """再試行を1件記録する"""
+        with self._lock:
+            retries = self._endpoint(endpoint)["retries"]
+            retries[reason] = retries.get(reason, 0) + 1
+
+    def record_rate_limit_wait(self, resource, seconds):
+        """レート制限による待機を記録する"""
+        with self._lock:
+            wait = self.rate_limit_waits.setdefault(resource, {"count": 0, "seconds": 0.0})
+            wait["count"] += 1
+            wait["seconds"] += seconds
+
+    def record_stage(self, name, seconds, items=0):
+        """処理段階の所要時間と処理件数を記録する"""
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "items": 0, "runs": 0})
+            stage["seconds"] += seconds
+            stage["items"] += items
+            stage["runs"] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """with 文のブロックの所要時間を処理段階として記録する
+
+        ブロック内で返される辞書の "items" に処理件数を設定できる。
+        """
+        result = {"items": 0}
+        started = self._clock()
+        try:
+            yield result
+        finally:
+            self.record_stage(name, self._clock() - started, result["items"])
+
+    def get_summary(self):
+        """現在の集計を実行サマリーの辞書で返す"""
+        with self._lock:
+            summary = {
+                "started_at": self.started_at.isoformat(),
+                "finished_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "endpoints": copy.deepcopy(self.endpoints),
+                "rate_limit_waits": copy.deepcopy(self.rate_limit_waits),
+                "stages": copy.deepcopy(self.stages),
+            }
+        return _finalize(summary)
+
+    def write(self, directory, merge=False):
+        """実行サマリー（JSON）とPrometheus形式のファイルを書き出す
+
+        merge=True の場合は既存の実行サマリーに今回の集計を足し合わせる
+        （同じ実行の後続の処理が段階の所要時間を追記するときに使う）。
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        summary_path = directory / SUMMARY_FILENAME
+        summary = self.get_summary()
+
+        if merge and summary_path.exists():
+            try:
+                summary = merge_summaries(json_codec.load_file(summary_path), summary)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"既存の実行メトリクスを読み込めなかったため上書きします: {e}")
+
+        write_atomic(summary_path, json_codec.dumps(summary))
+        write_atomic(directory / PROMETHEUS_FILENAME, render_prometheus(summary).encode("utf-8"))
+        return summary
+
+
+_metrics = MetricsRegistry()
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """プロセス全体で共有するメトリクスを取得する"""
+    return _metrics
+
+
+def configure_metrics(registry=None):
+    """共有メトリクスを差し替える（Noneの場合は空の集計で作り直す）"""
+    global _metrics
+    with _metrics_lock:
+        _metrics = registry or MetricsRegistry()
+    return _metrics
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+PRデータの項目選択モジュール
+
+GitHubのREST APIのレスポンスには `*_url` のテンプレートや `_links`、head/base のリポジトリ全体、
+コメントやコミットごとのユーザー情報などが含まれますが、分析とレポートで使うのはその一部です。
+data.projection の設定に従い、サブリソースごとに残す項目だけを保存します。
+
+残す項目は "user.login" のようにドットでたどるパスで指定し、リストの要素には同じパスを適用します。
+パスの末尾の項目は値をそのまま残します。
+"""
+
+import gzip
+from pathlib import Path
+
+from .atomic_write import write_atomic
+from .pr_store import serialize_pr_data
+
+
+RAW_ARCHIVE_DIRNAME = "raw"
+
+# GraphQLコレクターが作る pr_details と同じ項目に、REST APIにだけある分析用の項目を加えたもの
+DEFAULT_KEEP = {
+    "basic_info": [
+        "id", "node_id", "number", "title", "state", "html_url", "body", "user.login",
+        "created_at", "updated_at", "closed_at", "merged_at", "merged", "draft",
+        "labels.id", "labels.node_id", "labels.name", "labels.color", "labels.description",
+        "head.ref", "head.sha", "base.ref", "base.sha",
+        "comments", "review_comments", "commits", "additions", "deletions", "changed_files",
+    ],
+    "labels": ["id", "node_id", "name", "color", "description"],
+    "comments": ["id", "node_id", "html_url", "body", "user.login", "created_at", "updated_at"],
+    "review_comments": [
+        "id", "node_id", "html_url", "body", "user.login", "created_at", "updated_at",
+        "path", "diff_hunk", "in_reply_to_id",
+    ],
+    "commits": [
+        "sha", "html_url", "commit.message", "commit.author.name", "commit.author.email", "commit.author.date",
+        "author.login",
+    ],
+    "files": ["filename", "previous_filename", "status", "additions", "deletions", "changes", "patch"],
+}
+
+
+def build_key_tree(paths):
+    """ドット区切りのパスのリストを、残す項目の木（{キー: 子の木}、空の木は値をそのまま残す）にする"""
+    tree = {}
+    for path in paths:
+        node = tree
+        keys = path.split(".")
+        for depth, key in enumerate(keys):
+            if key in node and not node[key] and depth < len(keys) - 1:
+                # 値全体を残す指定が先にある場合は、それより細かい指定を無視する
+                break
+            if depth == len(keys) - 1:
+                node[key] = {}
+            else:
+                node = node.setdefault(key, {})
+    return tree
+
+
+def project_value(value, tree):
+    """値から木に含まれる項目だけを残す（元の値は変更しない。キーの順序は元の値の順序のまま）"""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project_value(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project_value(item, tree[key]) for key, item in value.items() if key in tree}
+    return value
+
+
+class PRProjection:
+    """保存するPRデータの項目を選ぶクラス
+
+    keep に含まれないサブリソースと、state・updated_at などのトップレベルの項目はそのまま残す。
+    同じデータに何度適用しても結果は変わらない。
+    """
+
+    def __init__(self, keep=None, raw_archive=False):
+        """初期化（keep はサブリソースごとに DEFAULT_KEEP を上書きする）"""
+        self.keep = dict(DEFAULT_KEEP, **(keep or {}))
+        self.trees = {key: build_key_tree(paths) for key, paths in self.keep.items()}
+        self.raw_archive = raw_archive
+
+    @classmethod
+    def from_config(cls, config):
+        """data.projection の設定から作成する（無効な場合はNone）"""
+        projection_config = config.get("data", {}).get("projection") or {}
+        if not projection_config.get("enabled", False):
+            return None
+        return cls(keep=projection_config.get("keep"), raw_archive=projection_config.get("raw_archive", False))
+
+    def apply(self, pr_data):
+        """PRデータから残す項目だけを選んだ新しいPRデータを返す"""
+        return {
+            key: project_value(value, self.trees[key]) if key in self.trees else value
+            for key, value in pr_data.items()
+        }
+
+    @staticmethod
+    def archive_path(output_dir, pr_number):
+        """項目を選ぶ前のPRデータの保存先"""
+        return Path(output_dir) / RAW_ARCHIVE_DIRNAME / f"{pr_number}.json.gz"
+
+    def archive(self, pr_data, output_dir):
+        """項目を選ぶ前のPRデータを gzip で保存する（raw_archive が有効な場合のみ）"""
+        if not self.raw_archive:
+            return None
+        path = self.archive_path(output_dir, pr_data["basic_info"]["number"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, gzip.compress(serialize_pr_data(pr_data), mtime=0))
+        return path
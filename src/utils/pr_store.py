@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+PRデータ保存先モジュール
+
+PRデータの保存・読み込み・検索を data.storage_type に応じた保存先で行います。
+
+- file_per_pr: PRごとのJSONファイル（prs/<番号>.json）
+- sqlite: 番号・状態・更新日時・ラベル・セクションにインデックスを張った組み込みのSQLiteデータベース。
+  サブリソースはJSONのBLOBとして保存し、レポートは必要な列とBLOBだけを読み込む
+
+data.intern を有効にすると、多くのPRで繰り返し現れるリポジトリ・ユーザー・ラベルを内容のハッシュで
+1つずつ別に保存し、PRデータには {"$ref": "<種類>/<ハッシュ>"} の参照だけを残す。読み込むときは参照を
+元のオブジェクトに戻し、同じオブジェクトはすべてのPRで同じインスタンスを共有する。
+"""
+
+import abc
+import copy
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from . import json_codec
+from .atomic_write import write_atomic
+from .markdown_sections import extract_file_sections
+
+
+STORAGE_FILE_PER_PR = "file_per_pr"
+STORAGE_SQLITE = "sqlite"
+STORAGE_TYPES = (STORAGE_FILE_PER_PR, STORAGE_SQLITE)
+SQLITE_FILENAME = "prs.sqlite3"
+SELECT_BATCH_SIZE = 200
+# file_per_pr で保存したファイルのダイジェストを記録するファイル（.json ではないためPRデータとして読み込まれない）
+DIGEST_INDEX_FILENAME = ".pr_digests"
+DIGEST_FLUSH_INTERVAL = 100
+# 重複を除いたリポジトリ・ユーザー・ラベルの保存先（file_per_pr では base_dir のサブディレクトリ）
+INTERNED_DIRNAME = "_interned"
+INTERN_REF_KEY = "$ref"
+INTERN_REF_PATTERN = re.compile(r"^[a-z]+/[0-9a-f]{16}$")
+# 種類ごとの、重複を除くオブジェクトのパス（リストの要素には同じパスを適用する）
+INTERN_PATHS = {
+    "repositories": ("basic_info.head.repo", "basic_info.base.repo"),
+    "users": (
+        "basic_info.user", "basic_info.assignee", "basic_info.assignees", "basic_info.requested_reviewers",
+        "basic_info.merged_by", "comments.user", "review_comments.user", "commits.author", "commits.committer",
+    ),
+    "labels": ("basic_info.labels", "labels"),
+}
+
+SUB_RESOURCE_KEYS = ("labels", "comments", "review_comments", "commits", "files")
+# 専用の列に保存するPRデータのキー（これ以外のキーは extra 列にまとめて保存する）
+PR_DATA_KEYS = ("basic_info", "state", "updated_at") + SUB_RESOURCE_KEYS
+
+
+def _label_names(pr_data):
+    """PRデータのラベル名"""
+    return [label["name"] for label in pr_data.get("labels") or [] if label.get("name")]
+
+
+def serialize_pr_data(pr_data):
+    """PRデータを保存する形式（file_per_pr のファイルの内容と同じ）のバイト列にする"""
+    return json_codec.dumps(pr_data)
+
+
+def _digest(data):
+    """保存する内容のダイジェスト"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _map_path(value, keys, func):
+    """パスの末尾の値に func を適用した値を返す（途中と末尾のリストは要素ごとにたどる。元の値は変更しない）"""
+    if isinstance(value, list):
+        items = [_map_path(item, keys, func) for item in value]
+        return value if all(new is old for new, old in zip(items, value)) else items
+    if not keys:
+        return func(value)
+    if not isinstance(value, dict) or keys[0] not in value:
+        return value
+    child = _map_path(value[keys[0]], keys[1:], func)
+    # 変わらなかった場合は元の値を返し、参照のないPRデータを読み込むときにコピーしない
+    return value if child is value[keys[0]] else {**value, keys[0]: child}
+
+
+class InternTable(abc.ABC):
+    """内容のハッシュをキーにしたリポジトリ・ユーザー・ラベルの保存先の共通部分
+
+    一度読み込んだか保存したオブジェクトはメモリに残し、同じ参照には同じインスタンスを返す。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ref_for(kind, value):
+        """オブジェクトの参照（"<種類>/<内容のハッシュ>"）"""
+        canonical = json_codec.dumps(value, compact=True, sort_keys=True)
+        return f"{kind}/{hashlib.sha256(canonical).hexdigest()[:16]}"
+
+    def intern(self, pr_data):
+        """PRデータのリポジトリ・ユーザー・ラベルを保存し、参照に置き換えたPRデータを返す"""
+        for kind, paths in INTERN_PATHS.items():
+            for path in paths:
+                pr_data = _map_path(pr_data, path.split("."), lambda value, kind=kind: self._intern_value(kind, value))
+        return pr_data
+
+    def rehydrate(self, pr_data):
+        """PRデータの参照を元のオブジェクトに戻したPRデータを返す"""
+        for paths in INTERN_PATHS.values():
+            for path in paths:
+                pr_data = _map_path(pr_data, path.split("."), self._resolve)
+        return pr_data
+
+    def _intern_value(self, kind, value):
+        """オブジェクトを保存して参照を返す（オブジェクト以外と参照はそのまま返す）"""
+        if not isinstance(value, dict) or INTERN_REF_KEY in value:
+            return value
+        ref = self.ref_for(kind, value)
+        with self._lock:
+            known = ref in self._objects
+        if not known:
+            self._write(ref, value)
+            with self._lock:
+                self._objects.setdefault(ref, copy.deepcopy(value))
+        return {INTERN_REF_KEY: ref}
+
+    def _resolve(self, value):
+        """参照を元のオブジェクトに戻す（見つからない場合は参照のまま返す）"""
+        if not isinstance(value, dict) or list(value) != [INTERN_REF_KEY]:
+            return value
+        ref = value[INTERN_REF_KEY]
+        if not isinstance(ref, str) or not INTERN_REF_PATTERN.match(ref):
+            return value
+        with self._lock:
+            obj = self._objects.get(ref)
+        if obj is None:
+            obj = self._read(ref)
+            if obj is None:
+                print(f"参照先のオブジェクトが見つかりません: {ref}")
+                return value
+            with self._lock:
+                obj = self._objects.setdefault(ref, obj)
+        return obj
+
+    @abc.abstractmethod
+    def _write(self, ref, value):
+        """オブジェクトを保存する（保存済みの場合は何もしない）"""
+
+    @abc.abstractmethod
+    def _read(self, ref):
+        """保存済みのオブジェクトを読み込む（ない場合はNone）"""
+
+
+class FileInternTable(InternTable):
+    """オブジェクトを1つずつ <directory>/<種類>/<ハッシュ>.json に保存する保存先
+
+    内容が同じファイルは一度しか書き込まないため、書き込んだファイルは pop_written() で取り出せる。
+    """
+
+    def __init__(self, directory):
+        """初期化"""
+        super().__init__()
+        self.directory = Path(directory)
+        self._written = []
+
+    def path_for(self, ref):
+        """オブジェクトのファイルのパス"""
+        return self.directory / f"{ref}.json"
+
+    def _write(self, ref, value):
+        path = self.path_for(ref)
+        if path.exists():
+            return
+        os.makedirs(path.parent, exist_ok=True)
+        write_atomic(path, serialize_pr_data(value))
+        with self._lock:
+            self._written.append(path)
+
+    def _read(self, ref):
+        try:
+            return json_codec.load_file(self.path_for(ref))
+        except (OSError, ValueError):
+            return None
+
+    def pop_written(self):
+        """前回の呼び出し以降に新しく書き込んだファイルのパス"""
+        with self._lock:
+            written, self._written = self._written, []
+        return sorted(written)
+
+
+def _summary_basic_info(number, state, updated_at, title, html_url):
+    """インデックスの列から、レポートに必要な項目だけの基本情報を作る"""
+    return {"number": number, "title": title, "html_url": html_url, "state": state, "updated_at": updated_at}
+
+
+class PRStore(abc.ABC):
+    """PRデータの保存先の共通インターフェース
+
+    iter_prs(include) の include には読み込むサブリソースのキーを指定する（Noneはすべて）。
+    返すPRデータには常に "basic_info"（少なくとも number / title / html_url / state / updated_at）と
+    "state"・"updated_at" が含まれ、保存先によっては include 以外のキーも含まれる。
+    """
+
+    storage_type = None
+
+    def __init__(self):
+        """初期化"""
+        self._changes = set()
+        self._changes_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def save(self, pr_data):
+        """PRデータを保存する（保存済みの内容と同じ場合は書き込まない。保存できた場合はTrue）"""
+
+    def _record_change(self, pr_number):
+        """内容が変わって書き込んだPRを記録する"""
+        with self._changes_lock:
+            self._changes.add(pr_number)
+
+    def pop_changes(self):
+        """前回の呼び出し以降に内容が変わって書き込んだPR番号（昇順）"""
+        with self._changes_lock:
+            changes, self._changes = self._changes, set()
+        return sorted(changes)
+
+    @abc.abstractmethod
+    def changed_paths(self, pr_numbers):
+        """PR番号の保存先のファイルのパス"""
+
+    @abc.abstractmethod
+    def load(self, pr_number):
+        """保存済みのPRデータを読み込む（存在しないか読み込めない場合はNone）"""
+
+    @abc.abstractmethod
+    def numbers(self):
+        """保存済みのPR番号（昇順）"""
+
+    @abc.abstractmethod
+    def iter_prs(self, include=None):
+        """保存済みのPRデータを番号順に返すジェネレータ"""
+
+    def label_numbers(self, label_name):
+        """指定したラベルの付いたPR番号（昇順）"""
+        return [
+            pr_data["basic_info"]["number"] for pr_data in self.iter_prs(include=("labels",))
+            if label_name in _label_names(pr_data)
+        ]
+
+    def iter_section_rows(self):
+        """変更されたマークダウンのセクションを1件ずつ返すジェネレータ
+
+        {"number", "title", "url", "filename", "section"} を、PR番号・ファイル・見出しの順に返す。
+        """
+        for pr_data in self.iter_prs(include=("files",)):
+            basic_info = pr_data["basic_info"]
+            for file_info in extract_file_sections(pr_data.get("files")):
+                for section in file_info["sections"]:
+                    yield {
+                        "number": basic_info["number"],
+                        "title": basic_info.get("title"),
+                        "url": basic_info.get("html_url"),
+                        "filename": file_info["filename"],
+                        "section": section,
+                    }
+
+    def flush(self):
+        """書き込みを確定する"""
+
+    def close(self):
+        """保存先を閉じる"""
+        self.flush()
+
+    def __len__(self):
+        return len(self.numbers())
+
+
+class FilePerPRStore(PRStore):
+    """PRごとのJSONファイルに保存する保存先"""
+
+    storage_type = STORAGE_FILE_PER_PR
+
+    def __init__(self, directory, intern=False):
+        """初期化
+
+        intern が有効な場合はリポジトリ・ユーザー・ラベルを base_dir/_interned に分けて保存する。
+        読み込むときの参照の解決は intern の設定に関係なく行う。
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.intern = intern
+        self.interned = FileInternTable(self.directory / INTERNED_DIRNAME)
+        self.digest_index_path = self.directory / DIGEST_INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._digests = None
+        self._unflushed = 0
+
+    def path_for(self, pr_number):
+        """PRデータのファイルのパス"""
+        return self.directory / f"{pr_number}.json"
+
+    def changed_paths(self, pr_numbers):
+        """PR番号のファイルのパスと、前回の呼び出し以降に新しく書き込んだ重複除去のオブジェクトのファイルのパス"""
+        return [self.path_for(pr_number) for pr_number in pr_numbers] + self.interned.pop_written()
+
+    def _load_digests(self):
+        """ダイジェストの記録を読み込む（ロック保持中に呼ぶ。読み込めない場合は空から始める）"""
+        if self._digests is None:
+            try:
+                self._digests = json_codec.load_file(self.digest_index_path)
+            except (OSError, ValueError):
+                self._digests = {}
+        return self._digests
+
+    def _is_unchanged(self, filepath, pr_number, data, digest):
+        """ファイルの内容が data と同じか
+
+        記録したダイジェストとサイズ・更新日時が一致すればファイルを読まずに同じとみなし、
+        記録がないか古い場合（git checkout 直後など）はファイルを読んで比べる。
+        """
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return False
+        if stat.st_size != len(data):
+            return False
+
+        with self._lock:
+            entry = self._load_digests().get(str(pr_number))
+        if entry == [digest, stat.st_size, stat.st_mtime_ns]:
+            return True
+
+        try:
+            unchanged = _digest(filepath.read_bytes()) == digest
+        except OSError:
+            return False
+        if unchanged:
+            self._remember(pr_number, digest, stat)
+        return unchanged
+
+    def _remember(self, pr_number, digest, stat):
+        """書き込んだファイルのダイジェストを記録する（一定件数ごとに記録をファイルに書き出す）"""
+        with self._lock:
+            self._load_digests()[str(pr_number)] = [digest, stat.st_size, stat.st_mtime_ns]
+            self._unflushed += 1
+            flush = self._unflushed >= DIGEST_FLUSH_INTERVAL
+        if flush:
+            self.flush()
+
+    def save(self, pr_data):
+        """PRデータを個別のJSONファイルに保存する
+
+        内容が保存済みのファイルと同じ場合は書き込まず、変わった場合は一時ファイルに書いてから置き換える。
+        """
+        pr_number = pr_data["basic_info"]["number"]
+        os.makedirs(self.directory, exist_ok=True)
+        if self.intern:
+            pr_data = self.interned.intern(pr_data)
+
+        filepath = self.path_for(pr_number)
+        data = serialize_pr_data(pr_data)
+        digest = _digest(data)
+        if self._is_unchanged(filepath, pr_number, data, digest):
+            print(f"PR #{pr_number} のデータは変更がないため書き込みません")
+            return True
+
+        write_atomic(filepath, data)
+        self._remember(pr_number, digest, filepath.stat())
+        self._record_change(pr_number)
+        print(f"PR #{pr_number} のデータを {filepath} に保存しました")
+        return True
+
+    def flush(self):
+        """ダイジェストの記録をファイルに書き出す"""
+        with self._lock:
+            if not self._unflushed:
+                return
+            data = json_codec.dumps(self._digests, compact=True, sort_keys=True)
+            self._unflushed = 0
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.digest_index_path, data)
+
+    def load(self, pr_number):
+        """保存済みのPRデータを読み込む（存在しないか読み込めない場合はNone）"""
+        filepath = self.path_for(pr_number)
+        if not filepath.exists():
+            return None
+
+        try:
+            pr_data = json_codec.load_file(filepath)
+        except Exception as e:
+            print(f"{filepath}の読み込み中にエラーが発生しました: {e}")
+            return None
+        return self.interned.rehydrate(pr_data)
+
+    def numbers(self):
+        """保存済みのPR番号（last_run_info.json などPRデータ以外のファイルは含めない）"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(int(path.stem) for path in self.directory.glob("*.json") if path.stem.isdigit())
+
+    def iter_prs(self, include=None):
+        """保存済みのPRデータを番号順に返す（ファイル全体を読み込むため include に関係なくすべてのキーを含む）"""
+        for pr_number in self.numbers():
+            pr_data = self.load(pr_number)
+            if pr_data:
+                yield pr_data
+
+
+class SQLiteInternTable(InternTable):
+    """オブジェクトを SQLitePRStore の interned テーブルに保存する保存先"""
+
+    def __init__(self, store):
+        """初期化"""
+        super().__init__()
+        self.store = store
+
+    def _write(self, ref, value):
+        with self.store._lock, self.store._conn:
+            self.store._conn.execute(
+                "INSERT OR IGNORE INTO interned VALUES (?, ?)", (ref, self.store._encode(value))
+            )
+
+    def _read(self, ref):
+        rows = self.store._query("SELECT value FROM interned WHERE ref = ?", (ref,))
+        return self.store._decode(rows[0][0]) if rows else None
+
+
+class SQLitePRStore(PRStore):
+    """インデックス付きのSQLiteデータベースに保存する保存先
+
+    1つの接続を全スレッドで共有し、操作はロックで直列化する（書き込みは収集パイプラインの保存段だけが行う）。
+    """
+
+    storage_type = STORAGE_SQLITE
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS prs (
+        number INTEGER PRIMARY KEY,
+        state TEXT,
+        updated_at TEXT,
+        title TEXT,
+        html_url TEXT,
+        basic_info BLOB NOT NULL,
+        labels BLOB,
+        comments BLOB,
+        review_comments BLOB,
+        commits BLOB,
+        files BLOB,
+        extra BLOB,
+        key_order TEXT,
+        digest TEXT
+    );
+    CREATE INDEX IF NOT EXISTS prs_state ON prs (state);
+    CREATE INDEX IF NOT EXISTS prs_updated_at ON prs (updated_at);
+    CREATE TABLE IF NOT EXISTS pr_labels (
+        label TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        PRIMARY KEY (label, number)
+    );
+    CREATE INDEX IF NOT EXISTS pr_labels_number ON pr_labels (number);
+    CREATE TABLE IF NOT EXISTS pr_sections (
+        number INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        level INTEGER NOT NULL,
+        section TEXT NOT NULL,
+        line TEXT,
+        PRIMARY KEY (number, position)
+    );
+    CREATE INDEX IF NOT EXISTS pr_sections_section ON pr_sections (section);
+    CREATE TABLE IF NOT EXISTS interned (
+        ref TEXT PRIMARY KEY,
+        value BLOB NOT NULL
+    );
+    """
+
+    def __init__(self, path, intern=False):
+        """初期化（データベースがなければ作成する。intern が有効な場合は重複を interned テーブルに分けて保存する）"""
+        super().__init__()
+        self.path = Path(path)
+        self.intern = intern
+        self.interned = SQLiteInternTable(self)
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(prs)")]
+        if "digest" not in columns:
+            # digest 列がない以前のデータベースは列を追加する（既存の行は次の保存で書き込む）
+            self._conn.execute("ALTER TABLE prs ADD COLUMN digest TEXT")
+        self._conn.commit()
+
+    def changed_paths(self, pr_numbers):
+        """変わったPRがあればデータベースのファイルのパス"""
+        return [self.path] if pr_numbers else []
+
+    @staticmethod
+    def _encode(value):
+        """サブリソースをBLOBに変換する（値がない場合はNone）"""
+        if value is None:
+            return None
+        return json_codec.dumps(value, compact=True)
+
+    @staticmethod
+    def _decode(blob):
+        """BLOBをサブリソースに戻す"""
+        if blob is None:
+            return None
+        return json_codec.loads(blob)
+
+    def save(self, pr_data):
+        """PRデータを保存し、ラベルとセクションのインデックスを更新する（内容が保存済みと同じ場合は書き込まない）"""
+        # ラベルとセクションのインデックスは参照に置き換える前のPRデータから作る
+        stored_data = self.interned.intern(pr_data) if self.intern else pr_data
+        basic_info = stored_data["basic_info"]
+        pr_number = basic_info["number"]
+        digest = _digest(serialize_pr_data(stored_data))
+        extra = {key: value for key, value in stored_data.items() if key not in PR_DATA_KEYS}
+        row = (
+            pr_number,
+            stored_data.get("state", basic_info.get("state")),
+            stored_data.get("updated_at", basic_info.get("updated_at")),
+            basic_info.get("title"),
+            basic_info.get("html_url"),
+            self._encode(basic_info),
+        ) + tuple(self._encode(stored_data.get(key)) for key in SUB_RESOURCE_KEYS) + (
+            self._encode(extra or None), json_codec.dumps(list(stored_data), compact=True).decode("utf-8"), digest
+        )
+
+        section_rows = []
+        for file_info in extract_file_sections(pr_data.get("files")):
+            for section in file_info["sections"]:
+                section_rows.append((
+                    pr_number, len(section_rows), file_info["filename"], section["level"], section["title"],
+                    section["line"],
+                ))
+
+        with self._lock, self._conn:
+            stored = self._conn.execute("SELECT digest FROM prs WHERE number = ?", (pr_number,)).fetchone()
+            if stored is not None and stored[0] == digest:
+                print(f"PR #{pr_number} のデータは変更がないため書き込みません")
+                return True
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self._conn.execute("DELETE FROM pr_labels WHERE number = ?", (pr_number,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pr_labels VALUES (?, ?)",
+                [(label_name, pr_number) for label_name in _label_names(pr_data)],
+            )
+            self._conn.execute("DELETE FROM pr_sections WHERE number = ?", (pr_number,))
+            self._conn.executemany("INSERT INTO pr_sections VALUES (?, ?, ?, ?, ?, ?)", section_rows)
+
+        self._record_change(pr_number)
+        print(f"PR #{pr_number} のデータを {self.path} に保存しました")
+        return True
+
+    def _query(self, sql, params=()):
+        """SQLを実行してすべての行を返す"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _row_to_pr_data(self, row, keys):
+        """prs テーブルの行（number, state, updated_at, title, html_url, basic_info と keys の列）をPRデータに戻す"""
+        number, state, updated_at, title, html_url, basic_info = row[:6]
+        if basic_info is None:
+            basic_info = _summary_basic_info(number, state, updated_at, title, html_url)
+        else:
+            basic_info = self._decode(basic_info)
+
+        pr_data = {"basic_info": basic_info, "state": state, "updated_at": updated_at}
+        extra = None
+        key_order = None
+        for key, value in zip(keys, row[6:]):
+            if key == "extra":
+                extra = self._decode(value)
+            elif key == "key_order":
+                key_order = json_codec.loads(value) if value else None
+            elif value is not None:
+                pr_data[key] = self._decode(value)
+        pr_data.update(extra or {})
+        if key_order:
+            # 書き出したファイルが元のファイルと同じになるよう、保存時のキーとその順序に戻す
+            pr_data = {key: pr_data[key] for key in key_order if key in pr_data}
+        return self.interned.rehydrate(pr_data)
+
+    def _select(self, include, where="", params=()):
+        """include のサブリソースだけを読み込むSELECT文を、番号順に SELECT_BATCH_SIZE 件ずつ実行する
+
+        ロックを持ったまま呼び出し元に返さないよう、番号で区切って少しずつ読み込む。
+        """
+        if include is None:
+            keys = SUB_RESOURCE_KEYS + ("extra", "key_order")
+            basic_info_column = "basic_info"
+        else:
+            keys = tuple(key for key in SUB_RESOURCE_KEYS if key in include)
+            basic_info_column = "basic_info" if "basic_info" in include else "NULL"
+        columns = ", ".join(("number", "state", "updated_at", "title", "html_url", basic_info_column) + keys)
+        condition = f"({where}) AND number > ?" if where else "number > ?"
+
+        last_number = -1
+        while True:
+            rows = self._query(
+                f"SELECT {columns} FROM prs WHERE {condition} ORDER BY number LIMIT {SELECT_BATCH_SIZE}",
+                tuple(params) + (last_number,),
+            )
+            for row in rows:
+                yield self._row_to_pr_data(row, keys)
+            if len(rows) < SELECT_BATCH_SIZE:
+                return
+            last_number = rows[-1][0]
+
+    def load(self, pr_number):
+        """保存済みのPRデータを読み込む（存在しない場合はNone）"""
+        try:
+            pr_number = int(pr_number)
+        except (TypeError, ValueError):
+            return None
+        return next(self._select(None, "number = ?", (pr_number,)), None)
+
+    def numbers(self):
+        """保存済みのPR番号（昇順）"""
+        return [row[0] for row in self._query("SELECT number FROM prs ORDER BY number")]
+
+    def iter_prs(self, include=None):
+        """保存済みのPRデータを番号順に返す（include を指定した場合は基本情報をインデックスの列から作る）"""
+        yield from self._select(include)
+
+    def label_numbers(self, label_name):
+        """指定したラベルの付いたPR番号（ラベルのインデックスだけを使う）"""
+        rows = self._query("SELECT number FROM pr_labels WHERE label = ? ORDER BY number", (label_name,))
+        return [row[0] for row in rows]
+
+    def iter_section_rows(self):
+        """変更されたマークダウンのセクションを、セクションのインデックスから返す（パッチは読み込まない）"""
+        rows = self._query(
+            "SELECT s.number, p.title, p.html_url, s.filename, s.level, s.section, s.line "
+            "FROM pr_sections s JOIN prs p ON p.number = s.number ORDER BY s.number, s.position"
+        )
+        for number, title, html_url, filename, level, section, line in rows:
+            yield {
+                "number": number,
+                "title": title,
+                "url": html_url,
+                "filename": filename,
+                "section": {"level": level, "title": section, "line": line},
+            }
+
+    def flush(self):
+        """WALの内容をデータベースのファイルに書き戻す（コミットするファイルに書き込みを含めるため）"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """書き込みを確定してデータベースを閉じる"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def create_pr_store(config=None, directory=None, storage_type=None):
+    """設定の data.storage_type に応じた保存先を作成する
+
+    directory（省略時は data.base_dir）は file_per_pr ではJSONファイルの、sqlite ではデータベース
+    （data.sqlite_filename、省略時は prs.sqlite3）の置き場所になる。
+    data.intern が有効な場合は、リポジトリ・ユーザー・ラベルの重複を除いて保存する。
+    """
+    data_config = (config or {}).get("data", {})
+    storage_type = storage_type or data_config.get("storage_type", STORAGE_FILE_PER_PR)
+    directory = Path(directory or data_config.get("base_dir", "prs"))
+
+    intern = data_config.get("intern", False)
+    if storage_type == STORAGE_FILE_PER_PR:
+        return FilePerPRStore(directory, intern=intern)
+    if storage_type == STORAGE_SQLITE:
+        return SQLitePRStore(directory / data_config.get("sqlite_filename", SQLITE_FILENAME), intern=intern)
+    raise ValueError(f"未対応の storage_type です: {storage_type}（{', '.join(STORAGE_TYPES)} のいずれかを指定してください）")
+
+
+def copy_prs(source, target):
+    """source のすべてのPRデータを target に保存する（保存した件数を返す）"""
+    count = 0
+    for pr_data in source.iter_prs():
+        if target.save(pr_data):
+            count += 1
+    return count
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+レート制限スケジューラーモジュール
+
+レスポンスヘッダー（X-RateLimit-Remaining / X-RateLimit-Reset / Retry-After）から
+残りのAPI予算を追跡し、リセット時刻まで予算がもつようにリクエストの間隔を調整します。
+"""
+
+import threading
+import time
+
+from .retry_policy import parse_number
+
+
+DEFAULT_RESERVE = 100
+DEFAULT_BURST = 100
+MAX_SLEEP_CHUNK = 5.0
+# 順番を待っているテナントが次のトークンを確認するまでの間隔（秒）
+FAIR_SHARE_POLL = 0.01
+
+
+class _Bucket:
+    """1つのレート制限リソース（core, graphql など）の状態"""
+
+    def __init__(self, burst):
+        """初期化"""
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.tokens = float(burst)
+        self.last_refill = None
+
+
+class RateLimitScheduler:
+    """全スレッドで共有するトークンバケット方式のレート制限スケジューラー
+
+    バケットには最大 burst 件分のトークンが貯まり、(残り予算 - reserve) / (リセットまでの秒数) の速度で補充される。
+    残り予算が reserve 以下になるとリセット時刻まで、Retry-After を受け取った場合は指定秒数だけ全リクエストを待たせる。
+    acquire() に tenant（収集するリポジトリなど）を指定すると、トークンを待っているテナントの間では
+    これまでに取得したトークン数の少ないテナントから順に割り当て、スレッド数の多いテナントが予算を独占しないようにする。
+    """
+
+    def __init__(self, reserve=DEFAULT_RESERVE, burst=DEFAULT_BURST, wait_for_reset=True,
+                 clock=time.time, sleep=time.sleep):
+        """初期化
+
+        Args:
+            reserve: 使わずに残しておくリクエスト数
+            burst: 待機せずに連続して送れる最大リクエスト数
+            wait_for_reset: 予算を使い切った場合にリセット時刻まで待機するか
+            clock: 現在時刻（UNIX時間）を返す関数
+            sleep: 待機に使う関数
+        """
+        self.reserve = reserve
+        self.burst = max(1, burst)
+        self.wait_for_reset = wait_for_reset
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._paused_until = 0.0
+        # バケットごとの、テナントが取得したトークン数と、トークンを待っているスレッド数
+        self._served = {}
+        self._waiting = {}
+        self.total_wait_seconds = 0.0
+        self.wait_count = 0
+
+    def _bucket(self, resource, key=None):
+        """リソース（トークンごとに分ける場合は key も）のバケットを取得する（ロック保持中に呼ぶ）"""
+        bucket_key = (key, resource)
+        if bucket_key not in self._buckets:
+            self._buckets[bucket_key] = _Bucket(self.burst)
+        return self._buckets[bucket_key]
+
+    def _compute_wait(self, bucket, now):
+        """次のリクエストまでに待つべき秒数を計算する（ロック保持中に呼ぶ）"""
+        if self._paused_until > now:
+            return self._paused_until - now
+
+        if bucket.remaining is None or bucket.reset is None:
+            return 0.0
+
+        if now >= bucket.reset:
+            # リセット時刻を過ぎたので、次のレスポンスで新しい予算がわかるまで制限しない
+            bucket.remaining = None
+            bucket.reset = None
+            bucket.tokens = float(self.burst)
+            bucket.last_refill = None
+            return 0.0
+
+        budget = bucket.remaining - self.reserve
+        if budget <= 0:
+            return bucket.reset - now + 1 if self.wait_for_reset else 0.0
+
+        rate = budget / max(bucket.reset - now, 1.0)
+        if bucket.last_refill is not None:
+            bucket.tokens = min(float(self.burst), bucket.tokens + (now - bucket.last_refill) * rate)
+        bucket.last_refill = now
+
+        if bucket.tokens >= 1:
+            return 0.0
+        return (1 - bucket.tokens) / rate
+
+    def _start_waiting(self, bucket_key, tenant):
+        """テナントのスレッドがトークンを待ち始めたことを記録する（ロック保持中に呼ぶ）"""
+        waiting = self._waiting.setdefault(bucket_key, {})
+        served = self._served.setdefault(bucket_key, {})
+        others = [served.get(other, 0) for other, count in waiting.items() if count and other != tenant]
+        if not waiting.get(tenant) and others:
+            # 待っていなかった間の分をまとめて取り返さないよう、待機中のテナントの最小の取得数から数える
+            served[tenant] = max(served.get(tenant, 0), min(others))
+        waiting[tenant] = waiting.get(tenant, 0) + 1
+
+    def _stop_waiting(self, bucket_key, tenant):
+        """テナントのスレッドがトークンを待ち終えたことを記録する（ロック保持中に呼ぶ）"""
+        waiting = self._waiting[bucket_key]
+        waiting[tenant] -= 1
+        if not waiting[tenant]:
+            del waiting[tenant]
+
+    def _is_turn(self, bucket_key, tenant):
+        """待機中のほかのテナントより多くのトークンを取得していないか（ロック保持中に呼ぶ）"""
+        served = self._served.get(bucket_key, {})
+        mine = served.get(tenant, 0)
+        return all(
+            mine <= served.get(other, 0)
+            for other, count in self._waiting.get(bucket_key, {}).items() if count and other != tenant
+        )
+
+    def acquire(self, resource="core", key=None, tenant=None):
+        """リクエストを送ってよくなるまで待機する（待機した秒数を返す）
+
+        key にはトークンの識別子を指定し、トークンごとに別の予算として扱う。
+        tenant を指定した場合は、同じバケットを待っているテナントの間で公平にトークンを割り当てる。
+        """
+        bucket_key = (key, resource)
+        waited = 0.0
+        waiting = False
+        try:
+            while True:
+                with self._lock:
+                    bucket = self._bucket(resource, key)
+                    now = self._clock()
+                    wait_seconds = self._compute_wait(bucket, now)
+                    if tenant is not None:
+                        if not waiting and (wait_seconds > 0 or self._waiting.get(bucket_key)):
+                            self._start_waiting(bucket_key, tenant)
+                            waiting = True
+                        if wait_seconds <= 0 and not self._is_turn(bucket_key, tenant):
+                            wait_seconds = FAIR_SHARE_POLL
+                    if wait_seconds <= 0:
+                        bucket.tokens -= 1
+                        if bucket.remaining is not None:
+                            bucket.remaining -= 1
+                        if tenant is not None:
+                            served = self._served.setdefault(bucket_key, {})
+                            served[tenant] = served.get(tenant, 0) + 1
+                        if waited > 0:
+                            self.total_wait_seconds += waited
+                            self.wait_count += 1
+                        return waited
+
+                # 他のスレッドが受け取ったヘッダーで状況が変わり得るため、長い待機は分割する
+                chunk = min(wait_seconds, MAX_SLEEP_CHUNK)
+                self._sleep(chunk)
+                waited += chunk
+        finally:
+            if waiting:
+                with self._lock:
+                    self._stop_waiting(bucket_key, tenant)
+
+    def update(self, resource="core", remaining=None, reset=None, limit=None, key=None):
+        """残り予算とリセット時刻を更新する"""
+        if remaining is None or reset is None:
+            return
+
+        with self._lock:
+            bucket = self._bucket(resource, key)
+            if bucket.reset is not None and reset == bucket.reset and bucket.remaining is not None:
+                # 並列リクエストのレスポンスは順不同で届くため、同じ期間内では小さい方を信用する
+                bucket.remaining = min(bucket.remaining, remaining)
+            else:
+                bucket.remaining = remaining
+                bucket.reset = reset
+            if limit is not None:
+                bucket.limit = limit
+
+    def pause(self, seconds):
+        """全リクエストを指定秒数だけ停止する"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def update_from_headers(self, headers, key=None):
+        """レスポンスヘッダーから残り予算と Retry-After を反映する"""
+        if not headers:
+            return
+
+        retry_after = parse_number(headers.get("Retry-After"))
+        if retry_after is not None:
+            self.pause(retry_after)
+
+        remaining = parse_number(headers.get("X-RateLimit-Remaining"))
+        reset = parse_number(headers.get("X-RateLimit-Reset"))
+        limit = parse_number(headers.get("X-RateLimit-Limit"))
+        resource = headers.get("X-RateLimit-Resource")
+        if not isinstance(resource, str):
+            resource = "core"
+        self.update(resource, remaining, reset, limit, key=key)
+
+    def get_stats(self):
+        """スケジューラーの状態と待機時間の統計を取得する"""
+        with self._lock:
+            return {
+                "total_wait_seconds": self.total_wait_seconds,
+                "wait_count": self.wait_count,
+                "resources": {
+                    (resource if key is None else f"{resource}:{key}"): {
+                        "limit": bucket.limit,
+                        "remaining": bucket.remaining,
+                        "reset": bucket.reset,
+                    }
+                    for (key, resource), bucket in self._buckets.items()
+                },
+                "tenants": {
+                    tenant: sum(served.get(tenant, 0) for served in self._served.values())
+                    for tenant in sorted({tenant for served in self._served.values() for tenant in served})
+                },
+            }
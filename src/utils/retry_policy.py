@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+再試行ポリシーモジュール
+
+GitHub APIのエラーレスポンスを種類ごとに分類し、再試行するかどうかと待機時間を決めます。
+プライマリのレート制限はリセット時刻まで、セカンダリのレート制限は Retry-After（なければ1分）だけ待ち、
+サーバーエラーと通信エラーは指数バックオフで再試行します。一時的なエラーが続いた場合は
+サーキットブレーカーが開き、全ワーカーのリクエストを一定時間止めます。
+"""
+
+import random
+import threading
+import time
+
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAX_ELAPSED_SECONDS = 600
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN_SECONDS = 60.0
+DEFAULT_MAX_COOLDOWN_SECONDS = 900.0
+
+# GitHubのドキュメントでは、Retry-After のないセカンダリレート制限は少なくとも1分待つよう推奨されている
+SECONDARY_RATE_LIMIT_WAIT = 60.0
+
+PRIMARY_RATE_LIMIT = "primary_rate_limit"
+SECONDARY_RATE_LIMIT = "secondary_rate_limit"
+SERVER_ERROR = "server_error"
+NETWORK_ERROR = "network_error"
+UNAUTHORIZED = "unauthorized"
+FORBIDDEN = "forbidden"
+CLIENT_ERROR = "client_error"
+
+RETRYABLE_FAILURES = (PRIMARY_RATE_LIMIT, SECONDARY_RATE_LIMIT, SERVER_ERROR, NETWORK_ERROR)
+# プライマリのレート制限は予算を使い切っただけなので、サーキットブレーカーの失敗には数えない
+BREAKER_FAILURES = (SECONDARY_RATE_LIMIT, SERVER_ERROR, NETWORK_ERROR)
+
+_SECONDARY_RATE_LIMIT_MESSAGES = ("secondary rate limit", "abuse detection")
+
+
+def parse_number(value):
+    """ヘッダーの値を数値に変換する（変換できない場合はNone）"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def classify_response(status_code, headers=None, body=""):
+    """レスポンスの失敗の種類を返す（成功の場合はNone）
+
+    403 と 429 は Retry-After やエラーメッセージからセカンダリレート制限を、
+    X-RateLimit-Remaining: 0 からプライマリレート制限を見分け、それ以外の403は権限エラーとする。
+    """
+    if status_code < 400:
+        return None
+    if status_code == 401:
+        return UNAUTHORIZED
+    if status_code in (403, 429):
+        headers = headers or {}
+        message = (body or "").lower()
+        if headers.get("Retry-After") is not None or any(text in message for text in _SECONDARY_RATE_LIMIT_MESSAGES):
+            return SECONDARY_RATE_LIMIT
+        if parse_number(headers.get("X-RateLimit-Remaining")) == 0:
+            return PRIMARY_RATE_LIMIT
+        return SECONDARY_RATE_LIMIT if status_code == 429 else FORBIDDEN
+    if status_code >= 500:
+        return SERVER_ERROR
+    return CLIENT_ERROR
+
+
+class CircuitBreaker:
+    """一時的なエラーが続いたときにリクエスト全体を止めるサーキットブレーカー
+
+    連続した失敗が failure_threshold 件に達すると開き、止める秒数を返す。
+    開くたびに止める時間を倍にし（max_cooldown まで）、成功すると元に戻す。
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN_SECONDS,
+                 max_cooldown=DEFAULT_MAX_COOLDOWN_SECONDS):
+        """初期化"""
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.consecutive_trips = 0
+        self.trips = 0
+        self.total_open_seconds = 0.0
+
+    def record_success(self):
+        """成功したリクエストを記録する"""
+        with self._lock:
+            self.consecutive_failures = 0
+            self.consecutive_trips = 0
+
+    def record_failure(self):
+        """一時的なエラーを記録する（ブレーカーが開いた場合は止める秒数、それ以外は0を返す）"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures < self.failure_threshold:
+                return 0.0
+            self.consecutive_failures = 0
+            pause = min(self.max_cooldown, self.cooldown * 2 ** self.consecutive_trips)
+            self.consecutive_trips += 1
+            self.trips += 1
+            self.total_open_seconds += pause
+            return pause
+
+    def get_stats(self):
+        """ブレーカーの統計を取得する"""
+        with self._lock:
+            return {
+                "trips": self.trips,
+                "total_open_seconds": self.total_open_seconds,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+class RetryPolicy:
+    """失敗の種類ごとに再試行するかどうかと待機時間を決めるクラス"""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, max_elapsed=DEFAULT_MAX_ELAPSED_SECONDS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, wait_for_reset=True,
+                 breaker=None, clock=time.time, sleep=time.sleep, jitter=random.random):
+        """初期化
+
+        Args:
+            max_retries: 1つのリクエストを再試行する最大回数
+            max_elapsed: 最初の送信から諦めるまでの最大秒数（レート制限の待機も含む）
+            base_delay: 指数バックオフの初回の待機時間の上限（秒）
+            max_delay: 指数バックオフの待機時間の上限（秒）
+            wait_for_reset: プライマリレート制限でリセット時刻まで待つか（Falseの場合は諦める）
+            breaker: サーキットブレーカー（省略時は既定値で作成する）
+            clock: 現在時刻（UNIX時間）を返す関数（X-RateLimit-Reset との比較に使う）
+            sleep: 待機に使う関数
+            jitter: 0以上1未満の乱数を返す関数（バックオフの待機時間をばらつかせる）
+        """
+        self.max_retries = max_retries
+        self.max_elapsed = max_elapsed
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.wait_for_reset = wait_for_reset
+        self.breaker = breaker or CircuitBreaker()
+        self.clock = clock
+        self.sleep = sleep
+        self._jitter = jitter
+
+    def retry_delay(self, failure, attempt, elapsed, headers=None):
+        """再試行までの待機秒数を返す（再試行しない場合はNone）
+
+        Args:
+            failure: classify_response の戻り値、または NETWORK_ERROR
+            attempt: これから行う再試行が何回目か（1から数える）
+            elapsed: 最初の送信からの経過秒数
+            headers: 失敗したレスポンスのヘッダー
+        """
+        if failure not in RETRYABLE_FAILURES or attempt > self.max_retries:
+            return None
+
+        headers = headers or {}
+        if failure == PRIMARY_RATE_LIMIT:
+            if not self.wait_for_reset:
+                return None
+            reset = parse_number(headers.get("X-RateLimit-Reset"))
+            delay = max(0.0, reset - self.clock()) + 1 if reset is not None else self.max_delay
+        elif failure == SECONDARY_RATE_LIMIT:
+            retry_after = parse_number(headers.get("Retry-After"))
+            delay = retry_after if retry_after is not None else SECONDARY_RATE_LIMIT_WAIT
+        else:
+            # フルジッター付きの指数バックオフ
+            delay = self._jitter() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+        if elapsed + delay > self.max_elapsed:
+            return None
+        return delay
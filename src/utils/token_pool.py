@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+GitHubトークンプールモジュール
+
+複数のトークンの残り予算をレスポンスヘッダーから追跡し、最も余裕のあるトークンにリクエストを振り分けます。
+認証エラー（401 と、トークン自体の権限が原因の403）になったトークンは一定時間使用しません。
+"""
+
+import hashlib
+import threading
+import time
+
+
+DEFAULT_TOKEN_LIMIT = 5000
+DEFAULT_QUARANTINE_SECONDS = 3600
+
+# 403の本文にこれらが含まれる場合は、リソースではなくトークン自体の問題（SAML未承認・権限不足・失効など）とみなす
+_TOKEN_FORBIDDEN_MESSAGES = (
+    "saml enforcement",
+    "personal access token",
+    "oauth app access restrictions",
+    "token has expired",
+    "token expired",
+)
+
+
+class NoAvailableTokenError(Exception):
+    """使用できるトークンが残っていない場合の例外"""
+
+
+def token_fingerprint(token):
+    """ログや統計に使うトークンの識別子（トークン自体は出力しない）"""
+    if not token:
+        return None
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:8]
+
+
+def token_from_headers(headers):
+    """Authorizationヘッダーからトークンを取り出す"""
+    authorization = (headers or {}).get("Authorization", "")
+    prefix = "token "
+    return authorization[len(prefix):] if authorization.startswith(prefix) else None
+
+
+class _TokenState:
+    """1つのトークンの残り予算と隔離状態"""
+
+    def __init__(self, token):
+        """初期化"""
+        self.token = token
+        self.fingerprint = token_fingerprint(token)
+        self.limit = DEFAULT_TOKEN_LIMIT
+        self.remaining = None
+        self.reset = None
+        self.quarantined_until = 0.0
+        self.quarantine_reason = None
+        self.requests = 0
+
+
+class TokenPool:
+    """複数トークンの予算を管理し、リクエストごとに使うトークンを選ぶクラス"""
+
+    def __init__(self, tokens, quarantine_seconds=DEFAULT_QUARANTINE_SECONDS, clock=time.time):
+        """初期化
+
+        Args:
+            tokens: 使用するトークンのリスト（重複は除く）
+            quarantine_seconds: 403になったトークンを使用しない秒数（401は無期限）
+            clock: 現在時刻（UNIX時間）を返す関数
+        """
+        unique_tokens = list(dict.fromkeys(token for token in tokens if token))
+        if not unique_tokens:
+            raise ValueError("トークンプールには1つ以上のトークンが必要です")
+
+        self.quarantine_seconds = quarantine_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {token: _TokenState(token) for token in unique_tokens}
+
+    def __len__(self):
+        return len(self._states)
+
+    def _headroom(self, state, now):
+        """トークンの残り予算の見込み（リセット時刻を過ぎていれば上限まで回復したとみなす）"""
+        if state.remaining is None or (state.reset is not None and now >= state.reset):
+            return state.limit
+        return state.remaining
+
+    def _available_states(self, now):
+        """隔離されていないトークンの一覧（ロック保持中に呼ぶ）"""
+        return [state for state in self._states.values() if state.quarantined_until <= now]
+
+    def acquire(self):
+        """最も残り予算の多いトークンを選んで返す"""
+        with self._lock:
+            now = self._clock()
+            candidates = self._available_states(now)
+            if not candidates:
+                raise NoAvailableTokenError("すべてのトークンが認証エラーで隔離されています")
+
+            state = max(candidates, key=lambda candidate: self._headroom(candidate, now))
+            if state.reset is not None and now >= state.reset:
+                state.remaining = None
+                state.reset = None
+            if state.remaining is not None:
+                # 並列リクエスト分を見込んで先に減らしておく（次のレスポンスヘッダーで補正される）
+                state.remaining -= 1
+            state.requests += 1
+            return state.token
+
+    def has_available_token(self, exclude=None):
+        """exclude 以外に使用できるトークンがあるか"""
+        with self._lock:
+            now = self._clock()
+            return any(state.token != exclude for state in self._available_states(now))
+
+    def update(self, token, remaining=None, reset=None, limit=None):
+        """トークンの残り予算を更新する"""
+        with self._lock:
+            state = self._states.get(token)
+            if state is None or remaining is None:
+                return
+            if limit is not None:
+                state.limit = limit
+            if state.reset is not None and reset == state.reset and state.remaining is not None:
+                state.remaining = min(state.remaining, remaining)
+            else:
+                state.remaining = remaining
+                state.reset = reset
+
+    def quarantine(self, token, reason, seconds=None):
+        """トークンを隔離する（seconds=Noneの場合は無期限）"""
+        with self._lock:
+            state = self._states.get(token)
+            if state is None:
+                return
+            state.quarantined_until = float("inf") if seconds is None else self._clock() + seconds
+            state.quarantine_reason = reason
+        print(f"トークン {state.fingerprint} を隔離しました: {reason}")
+
+    def record_response(self, token, status_code, headers, rate_limited=None, body=""):
+        """レスポンスを反映する（トークンを隔離した場合はTrueを返す）
+
+        401は無効なトークンとして無期限に、本文がトークン自体の問題を示す403は quarantine_seconds の間だけ隔離する。
+        それ以外の403（リポジトリやリソースへの権限がないなど）はどのトークンでも同じ結果になるため隔離しない。
+        rate_limited を省略した場合は、残り予算0または Retry-After をレート制限とみなす
+        （本文のメッセージでしか判断できないセカンダリレート制限は呼び出し側で判定して渡す）。
+        """
+        remaining = _parse_int(headers.get("X-RateLimit-Remaining")) if headers else None
+        reset = _parse_int(headers.get("X-RateLimit-Reset")) if headers else None
+        limit = _parse_int(headers.get("X-RateLimit-Limit")) if headers else None
+        self.update(token, remaining, reset, limit)
+
+        if status_code == 401:
+            self.quarantine(token, "401 Unauthorized")
+            return True
+
+        if rate_limited is None:
+            rate_limited = remaining == 0 or (headers is not None and headers.get("Retry-After") is not None)
+        if status_code == 403 and not rate_limited and is_token_forbidden(body):
+            self.quarantine(token, "403 Forbidden", self.quarantine_seconds)
+            return True
+
+        return False
+
+    def get_stats(self):
+        """トークンごとの状態を取得する"""
+        with self._lock:
+            now = self._clock()
+            return [
+                {
+                    "token": state.fingerprint,
+                    "requests": state.requests,
+                    "remaining": self._headroom(state, now),
+                    "reset": state.reset,
+                    "quarantined": state.quarantined_until > now,
+                    "quarantine_reason": state.quarantine_reason,
+                }
+                for state in self._states.values()
+            ]
+
+
+def is_token_forbidden(body):
+    """403の本文がトークン自体の問題（SAML未承認・権限不足・失効など）を示すか"""
+    message = (body or "").lower()
+    return any(text in message for text in _TOKEN_FORBIDDEN_MESSAGES)
+
+
+def _parse_int(value):
+    """ヘッダーの値を整数に変換する（変換できない場合はNone）"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
@@ -12,6 +12,19 @@ from pathlib import Path
 import pytest
 import yaml
 
+from src.utils import github_api, metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_api_state():
+    """テストごとに共有APIの状態を初期化する（リポジトリ内にキャッシュを書き込まない）"""
+    github_api.configure_response_cache(None)
+    github_api.configure_rate_limiter()
+    github_api.configure_retry_policy()
+    metrics.configure_metrics()
+    yield
+    github_api.configure_response_cache(None)
+
 
 @pytest.fixture
 def config_fixture():
@@ -33,7 +46,8 @@ def config_fixture():
         "api": {
             "retry_count": 3,
             "rate_limit_wait": True,
-            "request_delay": 0.1
+            "rate_limit_reserve": 100,
+            "rate_limit_burst": 100
         },
         "collectors": {
             "update_interval": 3600,
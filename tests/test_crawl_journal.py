@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+クロールジャーナルのテスト
+"""
+
+from unittest.mock import patch
+
+from src.collectors.crawl_journal import CrawlJournal
+from src.collectors.pr_collector import PRCollector
+
+
+def test_journal_roundtrip(temp_data_dir):
+    """記録した進行状況が読み込み直しても保たれるテスト"""
+    path = CrawlJournal.path_for(temp_data_dir)
+    journal = CrawlJournal.start(path, limit=10)
+    journal.add_pending([{"number": 3, "updated_at": "2023-01-03T00:00:00Z"}, {"number": 2}])
+    journal.record_page(1, 2)
+    journal.mark_completed(3)
+    journal.save()
+
+    loaded = CrawlJournal.load(path)
+    assert loaded.next_page == 2
+    assert loaded.listed_count == 2
+    assert loaded.limit == 10
+    assert not loaded.listing_done
+    assert loaded.skip_completed([{"number": 3}, {"number": 2}]) == [{"number": 2}]
+    assert loaded.resume_prs() == [{"number": 2, "updated_at": None}]
+    assert list(temp_data_dir.glob("*.json")) == []
+
+
+def test_load_broken_journal(temp_data_dir):
+    """壊れたジャーナルは読み込まないテスト"""
+    path = CrawlJournal.path_for(temp_data_dir)
+    path.write_text("{", encoding="utf-8")
+    assert CrawlJournal.load(path) is None
+
+
+@patch("src.collectors.pr_collector.check_rate_limit")
+def test_resume_interrupted_crawl(mock_rate_limit, config_fixture, temp_data_dir):
+    """中断したクロールを再開すると、未完了のPRと残りのページだけを取得するテスト"""
+    collector = PRCollector(config_fixture)
+    requested_pages = []
+    fetched = []
+    pages = {1: [{"number": 5}, {"number": 4}, {"number": 3}], 2: [{"number": 2}, {"number": 1}], 3: []}
+    failing = {"page": 2, "pr": 4}
+
+    def fake_request(url, params=None):
+        requested_pages.append(params["page"])
+        if params["page"] == failing["page"]:
+            raise ConnectionError("connection reset")
+        return pages[params["page"]]
+
+    def fake_fetch_prs(prs, executor=None, output_dir=None):
+        fetched.extend(pr["number"] for pr in prs)
+        return [
+            None if pr["number"] == failing["pr"] else {"basic_info": {"number": pr["number"]}, "updated_at": None}
+            for pr in prs
+        ]
+
+    path = CrawlJournal.path_for(temp_data_dir)
+    with patch.object(collector, "_request", side_effect=fake_request), \
+            patch.object(collector, "fetch_prs", side_effect=fake_fetch_prs):
+        journal = CrawlJournal.start(path)
+        collector.update_pr_data(output_dir=temp_data_dir, journal=journal)
+
+        assert not journal.listing_done
+        assert journal.get_summary()["completed"] == 2
+        assert journal.failed_count == 1
+
+        failing.update(page=None, pr=None)
+        requested_pages.clear()
+        fetched.clear()
+        resumed = CrawlJournal.load(path)
+        updated = collector.update_pr_data(output_dir=temp_data_dir, journal=resumed)
+
+    assert requested_pages == [2, 3]
+    assert fetched == [4, 2, 1]
+    assert [pr["basic_info"]["number"] for pr in updated] == [4, 2, 1]
+    assert resumed.listing_done
+    assert resumed.get_summary()["completed"] == 5
+    assert resumed.failed_count == 0
+
+
+@patch("src.collectors.pr_collector.check_rate_limit")
+def test_failed_prs_carry_over_to_next_crawl(mock_rate_limit, config_fixture, temp_data_dir):
+    """取得できなかったPRは完了したクロールから次のクロールに引き継いで取得し直すテスト"""
+    collector = PRCollector(config_fixture)
+    fetched = []
+
+    def fake_fetch_prs(prs, executor=None, output_dir=None):
+        fetched.extend(pr["number"] for pr in prs)
+        return [{"basic_info": {"number": pr["number"]}, "updated_at": pr.get("updated_at")} for pr in prs]
+
+    path = CrawlJournal.path_for(temp_data_dir)
+    previous = CrawlJournal.start(path)
+    previous.add_pending([{"number": 7, "updated_at": "2023-01-01T00:00:00Z"}])
+    previous.settle()
+    previous.finish()
+    carry_over = previous.failed_prs()
+    assert carry_over == [{"number": 7, "updated_at": "2023-01-01T00:00:00Z"}]
+
+    with patch.object(collector, "_request", return_value=[]), \
+            patch.object(collector, "fetch_prs", side_effect=fake_fetch_prs):
+        journal = CrawlJournal.start(path, carry_over=carry_over)
+        collector.update_pr_data(output_dir=temp_data_dir, journal=journal)
+
+    assert fetched == [7]
+    assert journal.failed_prs() == []
+    assert journal.get_summary()["completed"] == 1
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+偽GitHub APIサーバーのテスト
+"""
+
+import pytest
+import requests
+
+from src.collectors.pr_collector import PRCollector
+from src.utils.fake_github import FakeGitHubRepository, FakeGitHubServer
+from src.utils.github_api import CredentialProvider, configure_rate_limiter, parse_link_header
+from src.utils.pr_store import create_pr_store
+from src.utils.rate_limiter import RateLimitScheduler
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def repository():
+    """合成したリポジトリ"""
+    return FakeGitHubRepository.synthetic("test-owner", "test-repo", pr_count=25, seed=1)
+
+
+def test_synthetic_data_is_deterministic():
+    """同じ乱数の種からは同じデータが作られるテスト"""
+    first = FakeGitHubRepository.synthetic("o", "r", pr_count=5, seed=3)
+    second = FakeGitHubRepository.synthetic("o", "r", pr_count=5, seed=3)
+    assert first.prs == second.prs
+    assert first.prs[1]["basic_info"]["comments"] == len(first.prs[1]["comments"])
+
+
+def test_pagination_and_etag(repository):
+    """Linkヘッダーでページをたどれ、ETagが一致すれば304を返すテスト"""
+    with FakeGitHubServer(repository) as server:
+        url = f"{server.url}/repos/test-owner/test-repo/pulls"
+        response = requests.get(url, params={"state": "all", "per_page": 10})
+        assert response.status_code == 200
+        assert len(response.json()) == 10
+
+        links = parse_link_header(response.headers["Link"])
+        assert "page=3" in links["last"]
+        last = requests.get(links["last"])
+        assert len(last.json()) == 5
+        assert "next" not in parse_link_header(last.headers["Link"])
+
+        etag = response.headers["ETag"]
+        not_modified = requests.get(url, params={"state": "all", "per_page": 10}, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["X-RateLimit-Used"] == last.headers["X-RateLimit-Used"]
+
+        assert requests.get(f"{server.url}/repos/test-owner/test-repo/pulls/999").status_code == 404
+        stats = server.get_stats()
+    assert stats["pulls"] == 3
+    assert stats["not_modified"] == 1
+
+
+def test_rate_limits(repository):
+    """プライマリとセカンダリのレート制限を再現するテスト"""
+    clock = FakeClock()
+    url = "/repos/test-owner/test-repo/issues/1/comments"
+
+    with FakeGitHubServer(repository, rate_limit=2, rate_limit_window=60, clock=clock) as server:
+        headers = {"Authorization": "token a"}
+        assert requests.get(server.url + url, headers=headers).headers["X-RateLimit-Remaining"] == "1"
+        assert requests.get(server.url + url, headers=headers).status_code == 200
+        limited = requests.get(server.url + url, headers=headers)
+        assert limited.status_code == 403
+        assert limited.headers["X-RateLimit-Remaining"] == "0"
+        assert requests.get(server.url + url, headers={"Authorization": "token b"}).status_code == 200
+
+        clock.now += 60
+        assert requests.get(server.url + url, headers=headers).status_code == 200
+
+    with FakeGitHubServer(repository, secondary_limit=2, secondary_window=10, clock=clock) as server:
+        assert requests.get(server.url + url).status_code == 200
+        assert requests.get(server.url + url).status_code == 200
+        limited = requests.get(server.url + url)
+        assert limited.status_code == 403
+        assert limited.headers["Retry-After"] == "10"
+
+
+def test_collector_against_fake_server(repository, config_fixture, temp_data_dir):
+    """api_base_url を偽サーバーに向けてPRデータを収集できるテスト"""
+    # 1時間あたり5000件の予算を均等に使うペース配分で待たないよう、バーストを大きくする
+    configure_rate_limiter(RateLimitScheduler(reserve=0, burst=1000))
+    with FakeGitHubServer(repository) as server:
+        config_fixture["github"]["api_base_url"] = server.url
+        collector = PRCollector(config_fixture, CredentialProvider(config_fixture, token="test-token"))
+        updated = collector.update_pr_data(output_dir=temp_data_dir)
+        stats = server.get_stats()
+
+    assert sorted(pr["basic_info"]["number"] for pr in updated) == list(range(1, 26))
+    saved = collector.load_pr_from_file(7, temp_data_dir)
+    assert saved["comments"] == repository.prs[7]["comments"]
+    assert saved["files"] == repository.prs[7]["files"]
+    assert stats["pulls/:number"] == 25
+    assert stats["pulls/:number/files"] == 25
+
+
+@pytest.mark.parametrize("storage_type", ["file_per_pr", "sqlite"])
+def test_repository_from_interned_store(tmp_path, repository, storage_type):
+    """保存先から読み込んだPRデータは、参照に置き換えて保存されたオブジェクトも元に戻して返すテスト"""
+    store = create_pr_store({"data": {"intern": True}}, tmp_path, storage_type)
+    for pr_details in repository.prs.values():
+        store.save(pr_details)
+    store.close()
+
+    loaded = FakeGitHubRepository.from_pr_directory("test-owner", "test-repo", tmp_path)
+
+    assert loaded.prs == repository.prs
@@ -7,7 +7,14 @@ import os
 import pytest
 from unittest.mock import patch, MagicMock
 
-from src.utils.github_api import get_github_token, get_headers, make_github_api_request
+from src.utils.github_api import (
+    CredentialProvider,
+    get_github_token,
+    get_headers,
+    iter_github_api_items,
+    make_github_api_request,
+    parse_link_header,
+)
 
 
 @pytest.fixture
@@ -30,15 +37,91 @@ def test_get_headers_with_token(mock_env_token):
     assert headers["Authorization"] == "token test-token"
 
 
-@patch("src.utils.github_api.requests.get")
-def test_make_github_api_request(mock_get):
+@patch("src.utils.github_api.get_session_pool")
+def test_make_github_api_request(mock_get_session_pool):
     """GitHub APIリクエストのテスト"""
-    mock_response = MagicMock()
+    mock_response = MagicMock(status_code=200, content=b'{"key": "value"}')
     mock_response.json.return_value = {"key": "value"}
-    mock_get.return_value = mock_response
+    mock_request = mock_get_session_pool.return_value.request
+    mock_request.return_value = mock_response
     
     result = make_github_api_request("https://api.github.com/test")
     
     assert result == {"key": "value"}
-    mock_get.assert_called_once()
+    mock_request.assert_called_once()
     assert mock_response.raise_for_status.called
+
+
+@patch("src.utils.github_api.load_config")
+def test_credential_provider_caches_token(mock_load_config, config_fixture):
+    """トークンと設定が一度だけ解決されるテスト"""
+    mock_load_config.return_value = config_fixture
+    provider = CredentialProvider()
+    
+    with patch.dict(os.environ, {}, clear=True), patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0, stdout="gh-token\n")
+        for _ in range(5):
+            headers = provider.get_headers()
+    
+    assert headers["Authorization"] == "token gh-token"
+    assert mock_run.call_count == 1
+    assert mock_load_config.call_count == 1
+
+
+def test_credential_provider_invalidate(config_fixture):
+    """invalidateで認証情報が再解決されるテスト"""
+    provider = CredentialProvider(config_fixture)
+    
+    with patch.dict(os.environ, {"GITHUB_TOKEN": "old-token"}):
+        assert provider.get_token() == "old-token"
+    with patch.dict(os.environ, {"GITHUB_TOKEN": "new-token"}):
+        assert provider.get_token() == "old-token"
+        provider.invalidate()
+        assert provider.get_token() == "new-token"
+
+
+def test_credential_provider_headers_are_copies(config_fixture):
+    """返されたヘッダーを変更してもキャッシュに影響しないテスト"""
+    provider = CredentialProvider(config_fixture, token="fixed-token")
+    
+    headers = provider.get_headers()
+    headers["If-None-Match"] = "etag"
+    
+    assert "If-None-Match" not in provider.get_headers()
+
+
+def test_parse_link_header():
+    """Linkヘッダーの解析テスト"""
+    links = parse_link_header(
+        '<https://api.github.com/x?page=2>; rel="next", <https://api.github.com/x?page=5>; rel="last"'
+    )
+    
+    assert links == {"next": "https://api.github.com/x?page=2", "last": "https://api.github.com/x?page=5"}
+    assert parse_link_header(None) == {}
+
+
+@patch("src.utils.github_api.fetch_github_api")
+def test_iter_github_api_items_follows_next(mock_fetch):
+    """rel="next" をたどって全ページの要素を返すテスト"""
+    mock_fetch.side_effect = [
+        ([{"id": 1}, {"id": 2}], {"Link": '<https://api.github.com/x?page=2&per_page=100>; rel="next"'}),
+        ([{"id": 3}], {}),
+    ]
+    
+    items = list(iter_github_api_items("https://api.github.com/x", headers={}))
+    
+    assert [item["id"] for item in items] == [1, 2, 3]
+    assert mock_fetch.call_args_list[0].kwargs["params"] == {"per_page": 100}
+    assert mock_fetch.call_args_list[1].args[0] == "https://api.github.com/x?page=2&per_page=100"
+    assert mock_fetch.call_args_list[1].kwargs["params"] is None
+
+
+@patch("src.utils.github_api.fetch_github_api")
+def test_iter_github_api_items_max_items(mock_fetch):
+    """max_items で取得を打ち切るテスト"""
+    mock_fetch.return_value = ([{"id": i} for i in range(100)], {"Link": '<https://next>; rel="next"'})
+    
+    items = list(iter_github_api_items("https://api.github.com/x", headers={}, max_items=3))
+    
+    assert len(items) == 3
+    assert mock_fetch.call_count == 1
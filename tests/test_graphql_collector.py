@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+GraphQLコレクターのテスト
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from src.collectors.graphql_collector import GraphQLPRCollector, build_batch_query
+from src.collectors.pr_collector import PRCollector, create_collector
+from src.utils.github_api import CredentialProvider
+
+
+def _connection(nodes, has_next_page=False, end_cursor=None):
+    """GraphQLのコネクションを作成する"""
+    return {
+        "totalCount": len(nodes),
+        "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+        "nodes": nodes,
+    }
+
+
+def _comment(database_id, body):
+    """コメントノードを作成する"""
+    return {
+        "id": f"IC_{database_id}",
+        "databaseId": database_id,
+        "url": f"https://github.com/o/r/pull/1#issuecomment-{database_id}",
+        "body": body,
+        "createdAt": "2023-01-01T00:00:00Z",
+        "updatedAt": "2023-01-01T00:00:00Z",
+        "author": {"login": "commenter"},
+    }
+
+
+def _pull_request(number):
+    """PRノードを作成する（PR #2 はコメントが2ページに分かれる）"""
+    comments = [_comment(number * 10 + 1, "first")]
+    return {
+        "id": f"PR_{number}",
+        "number": number,
+        "title": f"PR {number}",
+        "state": "MERGED" if number == 2 else "OPEN",
+        "body": "本文",
+        "url": f"https://github.com/o/r/pull/{number}",
+        "createdAt": "2023-01-01T00:00:00Z",
+        "updatedAt": "2023-01-02T00:00:00Z",
+        "closedAt": None,
+        "mergedAt": None,
+        "isDraft": False,
+        "additions": 3,
+        "deletions": 1,
+        "changedFiles": 1,
+        "headRefName": "feature",
+        "headRefOid": "aaa",
+        "baseRefName": "main",
+        "baseRefOid": "bbb",
+        "author": {"login": "author"},
+        "labels": _connection([{"id": "L_1", "name": "教育", "color": "ff0000", "description": None}]),
+        "comments": _connection(comments, has_next_page=number == 2, end_cursor="cursor-1"),
+        "reviewThreads": _connection([
+            {"comments": {"pageInfo": {"hasNextPage": False}, "nodes": [
+                {**_comment(500 + number, "review"), "path": "a.md", "diffHunk": "@@", "replyTo": None}
+            ]}}
+        ]),
+        "commits": _connection([{"commit": {
+            "oid": "abc", "url": "https://github.com/o/r/commit/abc", "message": "msg", "committedDate": "2023-01-01T00:00:00Z",
+            "author": {"name": "a", "email": "a@example.com", "date": "2023-01-01T00:00:00Z", "user": {"login": "author"}},
+        }}]),
+        "files": _connection([{"path": "a.md", "additions": 3, "deletions": 1, "changeType": "MODIFIED"}]),
+    }
+
+
+class _GraphQLHandler(BaseHTTPRequestHandler):
+    """GraphQLとREST（変更ファイル）を返すローカルのダミーAPI"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests = []
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query, variables = payload["query"], payload["variables"]
+        self.requests.append(("POST", variables))
+
+        if "$after" in query:
+            connection = _connection([_comment(99, "second page")])
+            self._send_json({"data": {"repository": {"pullRequest": {"comments": connection}}}})
+            return
+
+        repository = {}
+        for alias, number in re.findall(r"(pr\d+): pullRequest\(number: (\d+)\)", query):
+            repository[alias] = _pull_request(int(number)) if int(number) != 404 else None
+        self._send_json({"data": {"repository": repository}})
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        self._send_json([{"filename": "a.md", "status": "modified", "patch": "@@ -1 +1 @@\n+## 新しい見出し"}])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def graphql_config(config_fixture):
+    """ローカルのダミーAPIを向いた設定を提供する"""
+    _GraphQLHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GraphQLHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    config_fixture["github"]["api_base_url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    config_fixture["collectors"]["backend"] = "graphql"
+    config_fixture["graphql"] = {"batch_size": 2, "fetch_patches": True}
+    yield config_fixture
+    
+    server.shutdown()
+    server.server_close()
+
+
+def test_build_batch_query():
+    """PR番号ごとのエイリアスを含むクエリを組み立てるテスト"""
+    query = build_batch_query([1, 2])
+    
+    assert "pr1: pullRequest(number: 1)" in query
+    assert "pr2: pullRequest(number: 2)" in query
+    assert "reviewThreads(first: 100)" in query
+    assert "files(first: 100)" in query
+    assert "files(first" not in build_batch_query([1], ("labels", "comments"))
+
+
+def test_files_connection_skipped_when_patches_come_from_rest(config_fixture):
+    """fetch_patches が有効な場合は一括クエリで files のコネクションを取得しないテスト"""
+    credentials = CredentialProvider(config_fixture, token="t")
+    config_fixture["graphql"] = {"fetch_patches": True}
+    assert "files" not in GraphQLPRCollector(config_fixture, credentials).connection_names
+    config_fixture["graphql"] = {"fetch_patches": False}
+    assert "files" in GraphQLPRCollector(config_fixture, credentials).connection_names
+
+
+def test_create_collector_selects_backend(config_fixture):
+    """collectors.backend でコレクターを選択するテスト"""
+    credentials = CredentialProvider(config_fixture, token="t")
+    assert type(create_collector(config_fixture, credentials)) is PRCollector
+    
+    config_fixture["collectors"]["backend"] = "graphql"
+    assert isinstance(create_collector(config_fixture, credentials), GraphQLPRCollector)
+    
+    config_fixture["collectors"]["backend"] = "unknown"
+    with pytest.raises(ValueError):
+        create_collector(config_fixture, credentials)
+
+
+def test_get_pr_details_batch(graphql_config):
+    """一括取得した結果がREST形式に変換されるテスト"""
+    collector = GraphQLPRCollector(graphql_config, CredentialProvider(graphql_config, token="t"))
+    
+    results = collector.get_pr_details_batch([1, 2, 404])
+    
+    assert results[404] is None
+    pr1, pr2 = results[1], results[2]
+    assert list(pr1.keys()) == [
+        "basic_info", "state", "updated_at", "labels", "comments", "review_comments", "commits", "files"
+    ]
+    assert pr1["state"] == "open"
+    assert pr2["state"] == "closed"
+    assert pr1["basic_info"]["html_url"] == "https://github.com/o/r/pull/1"
+    assert pr1["labels"][0]["name"] == "教育"
+    assert pr1["review_comments"][0]["path"] == "a.md"
+    assert pr1["commits"][0]["sha"] == "abc"
+    assert pr1["files"][0]["patch"] == "@@ -1 +1 @@\n+## 新しい見出し"
+    assert [comment["body"] for comment in pr2["comments"]] == ["first", "second page"]
+    assert pr2["basic_info"]["comments"] == 2
+
+
+def test_update_pr_data_with_graphql(graphql_config, temp_data_dir):
+    """GraphQLバックエンドでPRをバッチ取得して保存するテスト"""
+    graphql_config["graphql"]["fetch_patches"] = False
+    collector = GraphQLPRCollector(graphql_config, CredentialProvider(graphql_config, token="t"))
+    
+    updated = collector.collect_prs([{"number": n} for n in (1, 3, 5)], temp_data_dir)
+    
+    assert [pr["basic_info"]["number"] for pr in updated] == [1, 3, 5]
+    assert updated[0]["files"] == [
+        {"filename": "a.md", "status": "modified", "additions": 3, "deletions": 1, "changes": 4}
+    ]
+    assert sorted(path.name for path in temp_data_dir.glob("*.json")) == ["1.json", "3.json", "5.json"]
+    assert [method for method, _ in _GraphQLHandler.requests] == ["POST", "POST"]
+
+
+def test_incremental_graphql_refreshes_stored_prs(graphql_config, temp_data_dir, sample_pr_details):
+    """増分更新モードでは保存済みのPRを差分で取得し直し、保存されていないPRだけを一括取得するテスト"""
+    graphql_config["graphql"]["fetch_patches"] = False
+    graphql_config["collectors"]["incremental"] = True
+    collector = GraphQLPRCollector(graphql_config, CredentialProvider(graphql_config, token="t"))
+    collector.save_pr_to_file(sample_pr_details, temp_data_dir)
+    refreshed = dict(sample_pr_details, updated_at="2023-01-05T00:00:00Z")
+
+    with patch.object(collector, "refresh_pr_details", return_value=refreshed) as mock_refresh:
+        results = collector.fetch_prs([{"number": 1}, {"number": 3}], output_dir=temp_data_dir)
+
+    assert results[0] is refreshed
+    assert mock_refresh.call_args.args[0] == 1
+    assert results[1]["basic_info"]["number"] == 3
+    assert [variables for _, variables in _GraphQLHandler.requests] == [{"owner": "test-owner", "name": "test-repo"}]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+HTTPレスポンスキャッシュのテスト
+"""
+
+from unittest.mock import patch, MagicMock
+
+from src.utils.github_api import fetch_github_api
+from src.utils.http_cache import ResponseCache
+
+
+def _response(status_code, body=None, headers=None):
+    """ダミーのレスポンスを作成する"""
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body
+    response.headers = headers or {}
+    return response
+
+
+def test_store_and_get(tmp_path):
+    """検証子付きのレスポンスを保存・取得するテスト"""
+    cache = ResponseCache(tmp_path)
+    
+    assert cache.store("https://api.github.com/a", {"page": 1}, [{"id": 1}], etag='"abc"')
+    entry = cache.get("https://api.github.com/a", {"page": 1})
+    
+    assert entry["body"] == [{"id": 1}]
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"abc"'}
+    assert cache.get("https://api.github.com/a", {"page": 2}) is None
+
+
+def test_store_without_validators_is_skipped(tmp_path):
+    """検証子がないレスポンスは保存しないテスト"""
+    cache = ResponseCache(tmp_path)
+    
+    assert cache.store("https://api.github.com/a", None, {"id": 1}) is False
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_eviction_by_size(tmp_path):
+    """最大サイズを超えると古いエントリから削除されるテスト"""
+    cache = ResponseCache(tmp_path, max_bytes=600)
+    
+    for i in range(5):
+        cache.store(f"https://api.github.com/{i}", None, {"data": "x" * 100}, etag=f'"{i}"')
+    
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 600
+    assert stats["evictions"] > 0
+    assert cache.get("https://api.github.com/0") is None
+    assert cache.get("https://api.github.com/4") is not None
+    
+    reopened = ResponseCache(tmp_path, max_bytes=600)
+    assert reopened.get_stats()["entries"] == stats["entries"]
+
+
+@patch("src.utils.github_api.get_session_pool")
+def test_fetch_uses_conditional_request(mock_get_session_pool, tmp_path):
+    """2回目のリクエストで条件付きリクエストを送り、304で保存済みの本文を返すテスト"""
+    cache = ResponseCache(tmp_path)
+    mock_request = mock_get_session_pool.return_value.request
+    mock_request.side_effect = [
+        _response(200, [{"id": 1}], {"ETag": '"v1"', "Link": '<https://next>; rel="next"'}),
+        _response(304),
+    ]
+    url = "https://api.github.com/repos/o/r/issues/1/labels"
+    
+    first, _ = fetch_github_api(url, headers={"Accept": "json"}, cache=cache)
+    second, headers = fetch_github_api(url, headers={"Accept": "json"}, cache=cache)
+    
+    assert first == second == [{"id": 1}]
+    assert headers["Link"] == '<https://next>; rel="next"'
+    assert mock_request.call_args_list[1].kwargs["headers"]["If-None-Match"] == '"v1"'
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
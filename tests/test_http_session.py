@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+HTTPセッション管理のテスト
+"""
+
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.http_session import HTTPSessionPool, SessionStats
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """keep-aliveに対応したローカルのダミーAPI"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    """ローカルHTTPサーバーを起動する"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connections(local_server):
+    """連続したリクエストで接続が再利用されるテスト"""
+    pool = HTTPSessionPool(pool_connections=1, pool_maxsize=1)
+    
+    for i in range(10):
+        response = pool.get(f"{local_server}/items/{i}")
+        assert response.json() == {"path": f"/items/{i}"}
+    
+    stats = pool.get_stats()
+    assert stats["requests"] == 10
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 9
+    pool.close()
+
+
+def test_session_is_shared_across_threads(local_server):
+    """複数スレッドからの利用で接続数がプールサイズに収まるテスト"""
+    pool = HTTPSessionPool(pool_connections=1, pool_maxsize=4)
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda i: pool.get(f"{local_server}/{i}").status_code, range(40)))
+    
+    stats = pool.get_stats()
+    assert results == [200] * 40
+    assert stats["requests"] == 40
+    assert stats["new_connections"] <= 4
+    pool.close()
+
+
+def test_request_times_out_on_silent_server():
+    """応答を返さない接続でも設定した読み取りタイムアウトで諦めるテスト"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    pool = HTTPSessionPool(pool_connections=1, pool_maxsize=1, connect_timeout=1, read_timeout=0.2)
+    try:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            pool.get(f"http://127.0.0.1:{listener.getsockname()[1]}/hang")
+        assert pool.get_stats()["requests"] == 1
+    finally:
+        pool.close()
+        listener.close()
+
+
+def test_explicit_timeout_overrides_default(local_server):
+    """呼び出し側が指定した timeout がプールの既定値より優先されるテスト"""
+    pool = HTTPSessionPool(pool_connections=1, pool_maxsize=1, connect_timeout=1, read_timeout=0.001)
+
+    response = pool.get(f"{local_server}/items/1", timeout=5)
+
+    assert response.json() == {"path": "/items/1"}
+    pool.close()
+
+
+def test_latency_percentiles():
+    """リクエストの所要時間から分位点が計算されるテスト"""
+    stats = SessionStats()
+    for ms in range(1, 101):
+        stats.record_request()
+        stats.record_latency(ms / 1000)
+    
+    snapshot = stats.snapshot()
+    assert snapshot["latency_p50_seconds"] == 0.05
+    assert snapshot["latency_p95_seconds"] == 0.095
+    assert snapshot["latency_p99_seconds"] == 0.099
+    assert snapshot["total_latency_seconds"] == pytest.approx(5.05)
+    assert SessionStats().snapshot()["latency_p99_seconds"] is None
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+JSONの読み書きのテスト
+"""
+
+import json
+
+import pytest
+
+from src.utils import json_codec
+from src.utils.json_codec import available_backends, configure_json_backend
+
+
+@pytest.fixture(params=sorted(available_backends()))
+def backend(request):
+    """インストールされているバックエンドごとに共有のバックエンドを切り替える"""
+    yield configure_json_backend(request.param)
+    configure_json_backend()
+
+
+def test_output_matches_stdlib(backend, sample_pr_details):
+    """整形と compact の出力が標準ライブラリの json.dumps と同じバイト列になるテスト"""
+    value = dict(sample_pr_details, extra={"text": "改行\n\tタブ \"引用\" \x7f  ", "empty": [], "nested": {}})
+    assert json_codec.dumps(value) == json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8")
+    assert json_codec.dumps(value, compact=True, sort_keys=True) == json.dumps(
+        value, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    assert json_codec.loads(json_codec.dumps(value)) == value
+
+
+def test_values_outside_backend_range(backend):
+    """バックエンドで扱えない大きな整数も標準ライブラリと同じように書き出せるテスト"""
+    value = {"big": 2 ** 70}
+    assert json_codec.dumps(value, compact=True) == b'{"big":1180591620717411303424}'
+
+
+def test_file_round_trip(backend, tmp_path):
+    """ファイルに書き込んだ値をそのまま読み込めるテスト"""
+    path = tmp_path / "value.json"
+    json_codec.dump_file({"title": "テスト"}, path)
+    assert path.read_text(encoding="utf-8") == '{\n  "title": "テスト"\n}'
+    assert json_codec.load_file(path) == {"title": "テスト"}
+
+
+def test_unknown_backend():
+    """使えないバックエンドを指定するとエラーになるテスト"""
+    with pytest.raises(ValueError):
+        configure_json_backend("unknown")
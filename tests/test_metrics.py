@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+実行メトリクスのテスト
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from src.utils.github_api import configure_retry_policy, make_github_api_request
+from src.utils.metrics import (
+    PROMETHEUS_FILENAME,
+    SUMMARY_FILENAME,
+    MetricsRegistry,
+    endpoint_name,
+    get_metrics,
+)
+from src.utils.retry_policy import RetryPolicy
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_endpoint_name():
+    """URLからリポジトリとPR番号を除いたエンドポイント名を作るテスト"""
+    assert endpoint_name("https://api.github.com/repos/o/r/pulls") == "pulls"
+    assert endpoint_name("https://api.github.com/repos/o/r/pulls/12/files?page=2") == "pulls/:number/files"
+    assert endpoint_name("https://api.github.com/repos/o/r/issues/3/comments") == "issues/:number/comments"
+    assert endpoint_name("https://api.github.com/graphql") == "graphql"
+    assert endpoint_name("https://api.github.com/rate_limit") == "rate_limit"
+
+
+def test_summary_and_prometheus(tmp_path):
+    """記録した値が実行サマリーとPrometheus形式のファイルに書き出されるテスト"""
+    clock = FakeClock()
+    registry = MetricsRegistry(clock=clock)
+    registry.record_request("pulls", 200, 0.02, response_bytes=1000)
+    registry.record_request("pulls", 304, 0.004)
+    registry.record_request("pulls", 502, 0.3)
+    registry.record_request("pulls", seconds=1.5, error="ConnectionError")
+    registry.record_retry("pulls", "502")
+    registry.record_rate_limit_wait("core", 2.5)
+    with registry.stage("collect") as stage:
+        clock.now = 4.0
+        stage["items"] = 3
+
+    summary = registry.write(tmp_path)
+    pulls = summary["endpoints"]["pulls"]
+    assert pulls["status"] == {"200": 1, "304": 1, "502": 1}
+    assert pulls["errors"] == {"502": 1, "ConnectionError": 1}
+    assert pulls["latency_seconds"]["count"] == 4
+    assert pulls["latency_seconds"]["p50"] == 0.025
+    assert summary["totals"] == {
+        "requests": 4, "errors": 2, "retries": 1, "not_modified": 1, "response_bytes": 1000,
+        "rate_limit_wait_seconds": 2.5,
+    }
+    assert summary["stages"]["collect"] == {"seconds": 4.0, "items": 3, "runs": 1}
+
+    with open(tmp_path / SUMMARY_FILENAME, encoding="utf-8") as f:
+        assert json.load(f) == summary
+    prometheus = (tmp_path / PROMETHEUS_FILENAME).read_text(encoding="utf-8")
+    assert 'pr_analysis_github_requests_total{endpoint="pulls",status="304"} 1' in prometheus
+    assert 'pr_analysis_github_request_duration_seconds_bucket{endpoint="pulls",le="0.025"} 2' in prometheus
+    assert 'pr_analysis_github_request_duration_seconds_bucket{endpoint="pulls",le="+Inf"} 4' in prometheus
+    assert 'pr_analysis_stage_duration_seconds{stage="collect"} 4.0' in prometheus
+
+
+def test_write_merges_later_stages(tmp_path):
+    """merge=True で同じ実行の後続の処理の集計が足し合わされるテスト"""
+    collector_run = MetricsRegistry()
+    collector_run.record_request("pulls", 200, 0.1)
+    collector_run.record_stage("collect", 10.0, 5)
+    collector_run.write(tmp_path)
+
+    report_run = MetricsRegistry()
+    report_run.record_request("pulls", 200, 0.1)
+    report_run.record_stage("label_report", 2.0)
+    summary = report_run.write(tmp_path, merge=True)
+
+    assert summary["endpoints"]["pulls"]["requests"] == 2
+    assert summary["endpoints"]["pulls"]["latency_seconds"]["count"] == 2
+    assert set(summary["stages"]) == {"collect", "label_report"}
+    assert summary["started_at"] == collector_run.get_summary()["started_at"]
+
+
+@patch("src.utils.github_api.get_session_pool")
+def test_api_requests_are_instrumented(mock_get_session_pool):
+    """APIリクエストの失敗と再試行がエンドポイントごとに記録されるテスト"""
+    configure_retry_policy(RetryPolicy(sleep=lambda seconds: None))
+    response = MagicMock(status_code=200, content=b"[]", headers={})
+    response.json.return_value = []
+    mock_get_session_pool.return_value.request.side_effect = [requests.exceptions.ConnectionError(), response]
+
+    assert make_github_api_request("https://api.github.com/repos/o/r/pulls/1/files") == []
+
+    files = get_metrics().get_summary()["endpoints"]["pulls/:number/files"]
+    assert files["requests"] == 2
+    assert files["status"] == {"200": 1}
+    assert files["errors"] == {"ConnectionError": 1}
+    assert files["retries"] == {"network_error": 1}
+    assert files["response_bytes"] == 2
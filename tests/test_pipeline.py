@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+収集パイプラインのテスト
+"""
+
+import threading
+import time
+
+from src.collectors.pipeline import CollectionPipeline
+
+
+class FakeCollector:
+    """パイプラインに渡す最小限のコレクター"""
+
+    def __init__(self, max_workers=4, pipeline_batch_size=1, fail_numbers=()):
+        self.max_workers = max_workers
+        self.pipeline_batch_size = pipeline_batch_size
+        self.fail_numbers = set(fail_numbers)
+        self.fetch_calls = []
+        self.saved = []
+        self._lock = threading.Lock()
+
+    def fetch_prs(self, prs, executor=None, output_dir=None):
+        with self._lock:
+            self.fetch_calls.append([pr["number"] for pr in prs])
+        # 後ろのPRほど早く終わるようにして、完了順と一覧の順序をずらす
+        time.sleep(0.01 * (10 - prs[0]["number"] % 10))
+        return [
+            None if pr["number"] in self.fail_numbers else {
+                "basic_info": {"number": pr["number"]},
+                "state": "open",
+                "updated_at": "2023-01-01T00:00:00Z",
+                "comments": [{"id": pr["number"]}],
+            }
+            for pr in prs
+        ]
+
+    def save_pr_to_file(self, pr_details, output_dir=None):
+        with self._lock:
+            self.saved.append(pr_details["basic_info"]["number"])
+
+
+def _pages(*page_sizes):
+    """PR一覧のページを作成する"""
+    number = 1
+    for size in page_sizes:
+        yield [{"number": number + i} for i in range(size)]
+        number += size
+
+
+def test_pipeline_keeps_listing_order():
+    """詳細取得の完了順に関係なく一覧の順序で結果が返り、取得できなかったPRは除かれるテスト"""
+    collector = FakeCollector(fail_numbers={4})
+    pipeline = CollectionPipeline(collector, queue_size=2)
+
+    results = pipeline.run(_pages(3, 3, 1))
+
+    assert [pr["basic_info"]["number"] for pr in results] == [1, 2, 3, 5, 6, 7]
+    assert sorted(collector.saved) == [1, 2, 3, 5, 6, 7]
+    assert pipeline.listed_count == 7
+
+    stats = {stage["stage"]: stage for stage in pipeline.get_stats()}
+    assert stats["list"]["items"] == 7
+    assert stats["detail"]["items"] == 7
+    assert stats["write"]["items"] == 6
+
+
+def test_pipeline_batches_and_filter():
+    """pipeline_batch_size 件ずつ詳細取得に回し、ページごとにフィルターが適用されるテスト"""
+    collector = FakeCollector(max_workers=1, pipeline_batch_size=2)
+    pipeline = CollectionPipeline(
+        collector, pr_filter=lambda prs: [pr for pr in prs if pr["number"] != 2]
+    )
+
+    pipeline.run(_pages(3, 2))
+
+    assert collector.fetch_calls == [[1, 3], [4, 5]]
+
+
+def test_pipeline_without_details():
+    """keep_details=False の場合は番号と更新日時だけを返すテスト"""
+    collector = FakeCollector()
+    pipeline = CollectionPipeline(collector, keep_details=False)
+
+    results = pipeline.run(_pages(2))
+
+    assert results == [
+        {"basic_info": {"number": n}, "state": "open", "updated_at": "2023-01-01T00:00:00Z"} for n in (1, 2)
+    ]
+
+
+def test_pipeline_survives_on_saved_errors():
+    """on_saved がエラーになっても保存段が止まらず、残りのPRを保存できるテスト"""
+    collector = FakeCollector()
+
+    def on_saved(pr_details):
+        if pr_details["basic_info"]["number"] == 1:
+            raise OSError("ジャーナルを書き込めません")
+
+    pipeline = CollectionPipeline(collector, on_saved=on_saved)
+
+    results = pipeline.run(_pages(3))
+
+    assert [pr["basic_info"]["number"] for pr in results] == [2, 3]
+    assert sorted(collector.saved) == [1, 2, 3]
@@ -10,6 +10,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 
 from src.collectors.pr_collector import PRCollector
+from src.utils.github_api import CredentialProvider
 
 
 def test_init_with_config(config_fixture):
@@ -20,6 +21,18 @@ def test_init_with_config(config_fixture):
     assert collector.api_base_url == "https://api.github.com"
 
 
+@patch("src.collectors.pr_collector.make_github_api_request")
+def test_injected_credentials(mock_api_request, config_fixture):
+    """注入したCredentialProviderがリクエストに渡されるテスト"""
+    credentials = CredentialProvider(config_fixture, token="injected-token")
+    mock_api_request.return_value = {"number": 1}
+    
+    collector = PRCollector(config_fixture, credentials)
+    collector.get_pr_by_number(1)
+    
+    assert mock_api_request.call_args.kwargs["credentials"] is credentials
+
+
 @patch("src.collectors.pr_collector.make_github_api_request")
 def test_get_pull_requests(mock_api_request, config_fixture):
     """Pull Requestの取得テスト"""
@@ -37,11 +50,12 @@ def test_get_pull_requests(mock_api_request, config_fixture):
     mock_api_request.assert_called_once()
 
 
+@patch("src.collectors.pr_collector.get_all_github_api_items")
 @patch("src.collectors.pr_collector.make_github_api_request")
-def test_get_pr_details(mock_api_request, config_fixture, sample_pr_basic_info, sample_pr_comments, sample_pr_labels):
+def test_get_pr_details(mock_api_request, mock_all_items, config_fixture, sample_pr_basic_info, sample_pr_comments, sample_pr_labels):
     """PR詳細情報の取得テスト"""
-    mock_api_request.side_effect = [
-        sample_pr_basic_info,  # get_pr_by_number
+    mock_api_request.return_value = sample_pr_basic_info  # get_pr_by_number
+    mock_all_items.side_effect = [
         sample_pr_labels,      # get_pr_labels
         sample_pr_comments,    # get_pr_comments
         [],                    # get_pr_review_comments
@@ -57,7 +71,8 @@ def test_get_pr_details(mock_api_request, config_fixture, sample_pr_basic_info,
     assert pr_details["comments"] == sample_pr_comments
     assert len(pr_details["commits"]) == 1
     assert len(pr_details["files"]) == 1
-    assert mock_api_request.call_count == 6
+    assert mock_api_request.call_count == 1
+    assert mock_all_items.call_count == 5
 
 
 def test_save_pr_to_file(config_fixture, sample_pr_details, temp_data_dir):
@@ -77,3 +92,229 @@ def test_save_pr_to_file(config_fixture, sample_pr_details, temp_data_dir):
     assert saved_data["basic_info"]["title"] == "テスト用PR"
     assert "labels" in saved_data
     assert len(saved_data["labels"]) == 1
+
+
+def _fake_api_response(url, params=None, **kwargs):
+    """PR番号に応じたダミーのPR基本情報を返す"""
+    number = int(url.rstrip("/").split("/")[-1])
+    return {"number": number, "state": "open", "updated_at": "2023-01-02T00:00:00Z"}
+
+
+def _fake_api_items(url, **kwargs):
+    """URLに応じたダミーの一覧APIレスポンスを返す"""
+    parts = url.rstrip("/").split("/")
+    if parts[-1] == "files" and parts[-2] == "3":
+        raise RuntimeError("files error")
+    return [{"resource": parts[-1], "number": int(parts[-2])}]
+
+
+@patch("src.collectors.pr_collector.check_rate_limit")
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+@patch("src.collectors.pr_collector.make_github_api_request")
+def test_update_pr_data_parallel(mock_api_request, mock_all_items, mock_rate_limit, config_fixture, temp_data_dir):
+    """並列取得でも結果の順序とPR単位のエラー分離が保たれるテスト"""
+    config_fixture["collectors"]["max_workers"] = 4
+    mock_rate_limit.return_value = (5000, None)
+    mock_api_request.side_effect = _fake_api_response
+    mock_all_items.side_effect = _fake_api_items
+    
+    collector = PRCollector(config_fixture)
+    prs = [{"number": n} for n in range(1, 7)]
+    with patch.object(collector, "iter_pull_request_pages", return_value=[prs[:4], prs[4:]]):
+        updated = collector.update_pr_data(output_dir=temp_data_dir)
+    
+    # ファイルを取得できないPR #3 は空のリストで保存せず、再取得でも失敗したため failed_prs に残る
+    assert [pr["basic_info"]["number"] for pr in updated] == [1, 2, 4, 5, 6]
+    assert list(updated[0].keys()) == [
+        "basic_info", "state", "updated_at", "labels", "comments", "review_comments", "commits", "files"
+    ]
+    assert sorted(path.name for path in temp_data_dir.glob("*.json")) == ["1.json", "2.json", "4.json", "5.json", "6.json"]
+    assert collector.failed_prs == [3]
+    assert mock_api_request.call_count == 6
+    # 再取得では失敗したファイルだけを取得し直す
+    assert mock_all_items.call_count == 31
+
+
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+@patch("src.collectors.pr_collector.make_github_api_request")
+def test_retry_pass_fetches_only_failed_sub_resources(mock_api_request, mock_all_items, config_fixture, temp_data_dir):
+    """一時的に失敗したサブリソースだけが再取得で補われて保存されるテスト"""
+    mock_api_request.side_effect = _fake_api_response
+    failures = iter([RuntimeError("temporary")])
+
+    def flaky_items(url, **kwargs):
+        if url.endswith("/3/commits"):
+            error = next(failures, None)
+            if error:
+                raise error
+        return _fake_api_items(url.replace("/3/files", "/3/files-ok"), **kwargs)
+
+    mock_all_items.side_effect = flaky_items
+    collector = PRCollector(config_fixture)
+    assert collector._fetch_pr({"number": 3}) is None
+    assert collector.retry_queue[0]["missing"] == ["commits"]
+
+    saved = collector.retry_failed_prs(temp_data_dir)
+    assert [pr["basic_info"]["number"] for pr in saved] == [3]
+    assert saved[0]["commits"] == [{"resource": "commits", "number": 3}]
+    assert collector.load_pr_from_file(3, temp_data_dir)["comments"] == [{"resource": "comments", "number": 3}]
+    assert collector.retry_queue == [] and collector.failed_prs == []
+    assert mock_api_request.call_count == 1
+    assert mock_all_items.call_count == 6
+
+
+def test_detect_changed_sub_resources(sample_pr_details):
+    """カウンターやheadが変化したサブリソースだけが検出されるテスト"""
+    stored = sample_pr_details
+    stored["basic_info"].update({"comments": 1, "review_comments": 0, "commits": 1, "changed_files": 1, "head": {"sha": "a"}})
+    
+    latest = dict(stored["basic_info"])
+    assert PRCollector.detect_changed_sub_resources(stored, latest) == []
+    
+    latest["comments"] = 2
+    assert PRCollector.detect_changed_sub_resources(stored, latest) == ["comments"]
+    
+    latest["head"] = {"sha": "b"}
+    assert PRCollector.detect_changed_sub_resources(stored, latest) == ["comments", "commits", "files"]
+
+
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+@patch("src.collectors.pr_collector.make_github_api_request")
+def test_incremental_refresh(mock_api_request, mock_all_items, config_fixture, sample_pr_details, temp_data_dir):
+    """増分更新で変化のないPRはスキップし、変化したサブリソースだけを取得し直すテスト"""
+    config_fixture["collectors"]["incremental"] = True
+    collector = PRCollector(config_fixture)
+    
+    stored = sample_pr_details
+    stored["basic_info"].update({"comments": 1, "review_comments": 0, "commits": 1, "changed_files": 1, "head": {"sha": "a"}})
+    collector.save_pr_to_file(stored, temp_data_dir)
+    
+    unchanged = {"number": 1, "updated_at": stored["updated_at"]}
+    assert collector.filter_unchanged_prs([unchanged], temp_data_dir) == []
+    
+    latest = dict(stored["basic_info"], comments=2, updated_at="2023-01-03T00:00:00Z", labels=[{"name": "new"}])
+    new_comments = [{"id": 1}, {"id": 2}]
+    mock_api_request.return_value = latest
+    mock_all_items.return_value = new_comments
+    
+    updated = collector.collect_prs([{"number": 1, "updated_at": latest["updated_at"]}], temp_data_dir)
+    
+    assert mock_all_items.call_count == 1
+    assert mock_all_items.call_args.args[0].endswith("/issues/1/comments")
+    refreshed = collector.load_pr_from_file(1, temp_data_dir)
+    assert refreshed == updated[0]
+    assert refreshed["comments"] == new_comments
+    assert refreshed["labels"] == [{"name": "new"}]
+    assert refreshed["files"] == stored["files"]
+    assert refreshed["updated_at"] == "2023-01-03T00:00:00Z"
+    assert list(refreshed.keys()) == list(stored.keys())
+
+
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+def test_refresh_fetches_edited_comments(mock_all_items, config_fixture, sample_pr_details):
+    """件数が変わらなくても更新日時が進んだ場合は、編集されたコメントを since で取得して統合するテスト"""
+    collector = PRCollector(config_fixture)
+    stored = sample_pr_details
+    stored["basic_info"].update({"comments": 1, "review_comments": 0, "commits": 1, "changed_files": 1, "head": {"sha": "a"}})
+    latest = dict(stored["basic_info"], updated_at="2023-01-03T00:00:00Z")
+    edited = dict(stored["comments"][0], body="編集後のコメント")
+    mock_all_items.return_value = [edited]
+
+    refreshed = collector.merge_pr_data(stored, latest)
+
+    assert refreshed["comments"] == [edited]
+    assert mock_all_items.call_count == 1
+    assert mock_all_items.call_args.args[0].endswith("/issues/1/comments")
+    assert mock_all_items.call_args.kwargs["params"] == {"since": "2023-01-02T00:00:00Z"}
+
+    # 削除と追加が同時にあった場合は統合すると件数が合わないため、すべて取得し直す
+    added = {"id": 999, "body": "新しいコメント"}
+    mock_all_items.reset_mock()
+    mock_all_items.side_effect = [[added], [added]]
+    refreshed = collector.merge_pr_data(stored, latest)
+    assert refreshed["comments"] == [added]
+    assert [call.kwargs["params"] for call in mock_all_items.call_args_list] == [{"since": "2023-01-02T00:00:00Z"}, None]
+
+
+@patch("src.collectors.pr_collector.check_rate_limit")
+def test_change_feed(mock_rate_limit, config_fixture, temp_data_dir):
+    """変更フィードでPRだけを since 以降の古い順に取得し、最大の更新日時を記録するテスト"""
+    from src.collectors.crawl_journal import CrawlJournal
+    from src.collectors.pr_collector import to_utc
+    
+    config_fixture["collectors"]["change_feed"] = True
+    collector = PRCollector(config_fixture)
+    items = [
+        {"number": 7, "updated_at": "2023-01-02T00:00:00Z", "pull_request": {}},
+        {"number": 8, "updated_at": "2023-01-03T00:00:00Z"},
+        {"number": 9, "updated_at": "2023-01-04T00:00:00Z", "pull_request": {}},
+    ]
+    fetched = []
+    
+    def fake_fetch_prs(prs, executor=None, output_dir=None):
+        fetched.extend(pr["number"] for pr in prs)
+        return [{"basic_info": {"number": pr["number"]}, "updated_at": pr["updated_at"]} for pr in prs]
+    
+    journal = CrawlJournal.start(CrawlJournal.path_for(temp_data_dir))
+    with patch.object(collector, "_request", return_value=items) as mock_request, \
+            patch.object(collector, "fetch_prs", side_effect=fake_fetch_prs):
+        collector.update_pr_data(
+            last_updated_at=to_utc("2023-01-01T09:00:00+09:00"), output_dir=temp_data_dir, journal=journal
+        )
+    
+    url, = mock_request.call_args.args
+    assert url.endswith("/repos/test-owner/test-repo/issues")
+    assert mock_request.call_args.kwargs["params"]["since"] == "2023-01-01T00:00:00Z"
+    assert mock_request.call_args.kwargs["params"]["direction"] == "asc"
+    assert mock_request.call_count == 1
+    assert fetched == [7, 9]
+    assert journal.max_updated_at == "2023-01-04T00:00:00Z"
+
+
+def test_change_feed_survives_updates_between_pages(config_fixture):
+    """取得中に前のページのPRが更新されて末尾に移っても、次のページの先頭を取りこぼさないテスト"""
+    from src.collectors.pr_collector import to_utc
+
+    collector = PRCollector(config_fixture)
+    feed = {
+        number: {"number": number, "updated_at": f"2023-01-01T00:{number // 60:02d}:{number % 60:02d}Z", "pull_request": {}}
+        for number in range(1, 251)
+    }
+    calls = []
+
+    def fake_request(url, params=None):
+        """GitHubと同じく since 以降を更新日時の古い順に並べてページに分ける"""
+        calls.append(params)
+        items = sorted(
+            (item for item in feed.values() if item["updated_at"] >= params["since"]), key=lambda item: item["updated_at"]
+        )
+        page = items[(params["page"] - 1) * params["per_page"]:params["page"] * params["per_page"]]
+        if len(calls) == 1:
+            # 1ページ目を返した後に #10 が更新され、一覧の末尾に移る
+            feed[10] = dict(feed[10], updated_at="2023-01-02T00:00:00Z")
+        return [dict(item) for item in page]
+
+    with patch.object(collector, "_request", side_effect=fake_request):
+        pages = list(collector.iter_changed_pr_pages(to_utc("2023-01-01T00:00:00Z")))
+
+    numbers = [pr["number"] for prs in pages for pr in prs]
+    assert set(numbers) == set(range(1, 251))
+    assert numbers.count(10) == 2, "更新された #10 はもう一度返す"
+    assert all(params["page"] == 1 for params in calls)
+
+
+def test_change_feed_pages_within_same_updated_at(config_fixture):
+    """1ページを超える項目が同じ更新日時の場合は、同じ since のままページ番号を進めるテスト"""
+    from src.collectors.pr_collector import to_utc
+
+    collector = PRCollector(config_fixture)
+    items = [{"number": number, "updated_at": "2023-01-01T00:00:00Z", "pull_request": {}} for number in range(1, 151)]
+
+    def fake_request(url, params=None):
+        return items[(params["page"] - 1) * params["per_page"]:params["page"] * params["per_page"]]
+
+    with patch.object(collector, "_request", side_effect=fake_request) as mock_request:
+        pages = list(collector.iter_changed_pr_pages(to_utc("2023-01-01T00:00:00Z")))
+
+    assert [pr["number"] for prs in pages for pr in prs] == list(range(1, 151))
+    assert [call.kwargs["params"]["page"] for call in mock_request.call_args_list] == [1, 2]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+PRデータ収集スクリプトのテスト
+"""
+
+import argparse
+import json
+from unittest.mock import patch
+
+from src.collectors import pr_collector_main
+from src.collectors.pr_collector import PRCollector
+from src.collectors.scheduler import CollectionBudget
+
+
+def _args(**overrides):
+    """collect_repository に渡すコマンドライン引数"""
+    values = {"limit": 0, "resume": False, "force_full": False}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def _collect(config, output_dir, pages):
+    """一覧のページを pages に差し替えて1回収集し、(終了コード, 一覧の取得に渡された引数) を返す"""
+    collector = PRCollector(config)
+    calls = []
+
+    def list_pages(**kwargs):
+        calls.append(("pulls", kwargs))
+        yield from pages
+
+    def changed_pages(since, limit=None):
+        calls.append(("issues", {"since": since}))
+        yield from pages
+
+    def fake_fetch_prs(prs, executor=None, output_dir=None):
+        return [
+            {"basic_info": {"number": pr["number"], "updated_at": pr["updated_at"]}, "updated_at": pr["updated_at"]}
+            for pr in prs
+        ]
+
+    with patch.object(pr_collector_main, "create_collector", return_value=collector), \
+            patch("src.collectors.pr_collector.check_rate_limit"), \
+            patch.object(collector, "iter_pull_request_pages", side_effect=list_pages), \
+            patch.object(collector, "iter_changed_pr_pages", side_effect=changed_pages), \
+            patch.object(collector, "fetch_prs", side_effect=fake_fetch_prs):
+        exit_code = pr_collector_main.collect_repository(config, None, output_dir, _args(), CollectionBudget())
+    return exit_code, calls
+
+
+def test_empty_repository_runs_twice(config_fixture, tmp_path):
+    """PRが1件もないリポジトリで続けて実行しても、前回の実行情報が破損扱いにならないテスト"""
+    config_fixture["data"]["base_dir"] = str(tmp_path)
+
+    assert _collect(config_fixture, tmp_path, [])[0] == 0
+    last_run_info = json.loads((tmp_path / "last_run_info.json").read_text(encoding="utf-8"))
+    assert "last_updated_at" not in last_run_info
+
+    exit_code, calls = _collect(config_fixture, tmp_path, [])
+    assert exit_code == 0
+    assert calls == [("pulls", {"limit": None, "last_updated_at": None, "start_page": 1})]
+
+
+def test_null_watermark_is_treated_as_full_crawl(config_fixture, tmp_path):
+    """以前の形式の "last_updated_at": null は最終更新日時なしとして全取得するテスト"""
+    config_fixture["data"]["base_dir"] = str(tmp_path)
+    (tmp_path / "last_run_info.json").write_text('{"last_updated_at": null, "updated_count": 0}', encoding="utf-8")
+
+    exit_code, calls = _collect(config_fixture, tmp_path, [])
+
+    assert exit_code == 0
+    assert calls[0][1]["last_updated_at"] is None
+
+
+def test_change_feed_resumes_after_empty_runs(config_fixture, tmp_path):
+    """変更フィードで何も見つからなかった実行の後も、次回は記録済みの最終更新日時から再開するテスト"""
+    config_fixture["data"]["base_dir"] = str(tmp_path)
+    config_fixture["collectors"]["change_feed"] = True
+
+    # 最終更新日時がない間は一覧から全取得する
+    assert _collect(config_fixture, tmp_path, [])[1][0][0] == "pulls"
+    pr = {"number": 1, "updated_at": "2023-01-02T00:00:00Z", "pull_request": {}}
+    assert _collect(config_fixture, tmp_path, [[pr]])[1][0][0] == "pulls"
+
+    # 以降は変更フィードを使い、何も見つからなかった実行の後も同じ日時から再開する
+    for _ in range(2):
+        exit_code, calls = _collect(config_fixture, tmp_path, [])
+        assert exit_code == 0
+        assert [(kind, params["since"].isoformat()) for kind, params in calls] == [
+            ("issues", "2023-01-02T00:00:00+00:00")
+        ]
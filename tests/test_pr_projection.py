@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+PRデータの項目選択のテスト
+"""
+
+import copy
+import gzip
+import json
+
+from scripts.reproject_pr_store import reproject_prs
+from src.analyzers.section_analyzer import SectionAnalyzer
+from src.collectors.pr_collector import PRCollector
+from src.utils.pr_projection import PRProjection, build_key_tree
+from src.utils.pr_store import FilePerPRStore
+
+
+def _full_payload(sample_pr_details):
+    """REST APIのレスポンスのように分析に使わない項目を含むPRデータを作成する"""
+    pr_data = copy.deepcopy(sample_pr_details)
+    basic_info = pr_data["basic_info"]
+    basic_info["_links"] = {"self": {"href": basic_info["url"]}}
+    basic_info["head"] = {"ref": "feature", "sha": "abc123", "repo": {"full_name": "test-owner/test-repo", "private": False}}
+    basic_info["base"] = {"ref": "main", "sha": "def456", "repo": {"full_name": "test-owner/test-repo", "private": False}}
+    basic_info["comments"] = 1
+    basic_info["user"]["avatar_url"] = "https://avatars.example.com/u/1234567"
+    pr_data["comments"][0]["user"]["avatar_url"] = "https://avatars.example.com/u/1234567"
+    return pr_data
+
+
+def test_build_key_tree():
+    """値全体を残す指定はそれより細かい指定より優先されるテスト"""
+    assert build_key_tree(["user.login", "user.id", "title"]) == {"user": {"login": {}, "id": {}}, "title": {}}
+    assert build_key_tree(["user", "user.login"]) == {"user": {}}
+    assert build_key_tree(["user.login", "user"]) == {"user": {}}
+
+
+def test_projection_keeps_analysis_fields(sample_pr_details, config_fixture):
+    """分析に使う項目だけが残り、分析結果と増分更新の判定が変わらないテスト"""
+    pr_data = _full_payload(sample_pr_details)
+    projected = PRProjection().apply(pr_data)
+
+    basic_info = projected["basic_info"]
+    assert "url" not in basic_info and "_links" not in basic_info and "assignees" not in basic_info
+    assert basic_info["user"] == {"login": "test-user"}
+    assert basic_info["head"] == {"ref": "feature", "sha": "abc123"}
+    assert projected["comments"][0]["user"] == {"login": "test-user"}
+    assert projected["labels"][0] == {
+        "id": 123456, "node_id": "label_123456", "name": "test-label", "color": "ff0000", "description": "テスト用ラベル",
+    }
+    assert projected["files"][0]["patch"] == pr_data["files"][0]["patch"]
+    assert (projected["state"], projected["updated_at"]) == (pr_data["state"], pr_data["updated_at"])
+    assert pr_data["basic_info"]["_links"], "元のPRデータは変更しない"
+
+    assert PRProjection().apply(projected) == projected
+    assert len(json.dumps(projected)) < len(json.dumps(pr_data))
+    assert PRCollector.detect_changed_sub_resources(projected, pr_data["basic_info"]) == \
+        PRCollector.detect_changed_sub_resources(pr_data, pr_data["basic_info"])
+
+    analyzer = SectionAnalyzer(config_fixture)
+    assert analyzer.analyze_prs([projected]) == analyzer.analyze_prs([pr_data])
+
+
+def test_projection_keep_override():
+    """keep で指定したサブリソースの項目だけを上書きするテスト"""
+    projection = PRProjection(keep={"comments": ["id", "body"]})
+    projected = projection.apply({"comments": [{"id": 1, "body": "本文", "user": {"login": "a"}}]})
+    assert projected == {"comments": [{"id": 1, "body": "本文"}]}
+    assert projection.keep["files"] == PRProjection().keep["files"]
+
+
+def test_collector_saves_projected_data(config_fixture, tmp_path, sample_pr_details):
+    """data.projection が有効な場合は項目を選んで保存し、raw_archive では元のデータも保存するテスト"""
+    config_fixture["data"]["projection"] = {"enabled": True, "raw_archive": True}
+    collector = PRCollector(config_fixture)
+    pr_data = _full_payload(sample_pr_details)
+
+    assert collector.save_pr_to_file(pr_data, tmp_path)
+    assert collector.load_pr_from_file(1, tmp_path) == PRProjection().apply(pr_data)
+    with gzip.open(tmp_path / "raw" / "1.json.gz", "rt", encoding="utf-8") as f:
+        assert json.load(f) == pr_data
+
+    config_fixture["data"]["projection"]["enabled"] = False
+    assert PRCollector(config_fixture).projection is None
+
+
+def test_reproject_existing_store(tmp_path, sample_pr_details):
+    """保存済みのPRデータに項目選択を適用し、2回目は何も書き換えないテスト"""
+    store = FilePerPRStore(tmp_path)
+    store.save(_full_payload(sample_pr_details))
+    store.pop_changes()
+
+    stats = reproject_prs(store, store, PRProjection())
+    assert stats["count"] == 1 and stats["changed"] == 1
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert "_links" not in store.load(1)["basic_info"]
+
+    assert reproject_prs(store, store, PRProjection())["changed"] == 0
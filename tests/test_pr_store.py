@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+PRデータ保存先のテスト
+"""
+
+import copy
+import json
+
+from src.analyzers.section_analyzer import SectionAnalyzer
+from src.collectors.pr_collector import PRCollector
+from src.generators.label_report import LabelReportGenerator
+from src.utils.pr_store import FilePerPRStore, SQLitePRStore, copy_prs, create_pr_store
+
+
+def _pr(sample_pr_details, number, labels=("bug",), state="open"):
+    """番号とラベルを変えたPRデータを作成する"""
+    pr_data = copy.deepcopy(sample_pr_details)
+    pr_data["basic_info"]["number"] = number
+    pr_data["basic_info"]["title"] = f"PR {number}"
+    pr_data["state"] = state
+    pr_data["labels"] = [{"name": label} for label in labels]
+    return pr_data
+
+
+def test_sqlite_store_round_trip(tmp_path, sample_pr_details):
+    """保存したPRデータがそのまま読み込め、上書きでインデックスも更新されるテスト"""
+    store = SQLitePRStore(tmp_path / "prs.sqlite3")
+    pr_data = _pr(sample_pr_details, 2)
+    pr_data["repository_note"] = "追加のキー"
+    store.save(pr_data)
+    store.save(_pr(sample_pr_details, 1, labels=("docs",)))
+
+    assert store.load(2) == pr_data
+    assert store.load(3) is None
+    assert store.numbers() == [1, 2]
+    assert store.label_numbers("bug") == [2]
+
+    store.save(_pr(sample_pr_details, 2, labels=("docs",), state="closed"))
+    assert store.label_numbers("bug") == []
+    assert store.label_numbers("docs") == [1, 2]
+    store.close()
+
+    # 開き直しても同じデータを読み込める
+    assert SQLitePRStore(tmp_path / "prs.sqlite3").load(2)["state"] == "closed"
+
+
+def test_sqlite_store_reads_only_requested_columns(tmp_path, sample_pr_details):
+    """include を指定するとインデックスの列と指定したサブリソースだけを読み込むテスト"""
+    store = SQLitePRStore(tmp_path / "prs.sqlite3")
+    store.save(_pr(sample_pr_details, 1))
+
+    pr_data = next(store.iter_prs(include=("labels",)))
+    assert set(pr_data) == {"basic_info", "state", "updated_at", "labels"}
+    assert pr_data["basic_info"] == {
+        "number": 1, "title": "PR 1", "html_url": sample_pr_details["basic_info"]["html_url"], "state": "open",
+        "updated_at": "2023-01-02T00:00:00Z",
+    }
+
+
+def test_section_index_matches_patch_analysis(tmp_path, sample_pr_details, config_fixture):
+    """SQLiteのセクションのインデックスからの分析結果がパッチからの分析と同じになるテスト"""
+    file_store = FilePerPRStore(tmp_path / "files")
+    sqlite_store = SQLitePRStore(tmp_path / "db" / "prs.sqlite3")
+    for number in (1, 2):
+        file_store.save(_pr(sample_pr_details, number))
+        sqlite_store.save(_pr(sample_pr_details, number))
+
+    analyzer = SectionAnalyzer(config_fixture)
+    expected = analyzer.analyze_prs(list(file_store.iter_prs()))
+    assert expected
+    assert analyzer.analyze_store(sqlite_store) == expected
+    assert analyzer.analyze_store(file_store) == expected
+
+
+def test_export_reproduces_file_layout(tmp_path, sample_pr_details):
+    """SQLiteから書き出したファイルが直接保存したファイルと同じ内容になるテスト"""
+    direct = FilePerPRStore(tmp_path / "direct")
+    sqlite_store = SQLitePRStore(tmp_path / "db" / "prs.sqlite3")
+    for number in (1, 2, 3):
+        direct.save(_pr(sample_pr_details, number))
+        sqlite_store.save(_pr(sample_pr_details, number))
+
+    exported = FilePerPRStore(tmp_path / "exported")
+    assert copy_prs(sqlite_store, exported) == 3
+    for number in (1, 2, 3):
+        assert exported.path_for(number).read_bytes() == direct.path_for(number).read_bytes()
+
+
+def test_collector_and_reports_use_sqlite_storage(tmp_path, sample_pr_details, config_fixture):
+    """storage_type: sqlite でコレクターの保存とラベルレポートがデータベースを使うテスト"""
+    config_fixture["data"]["storage_type"] = "sqlite"
+    collector = PRCollector(config_fixture)
+    assert collector.save_pr_to_file(_pr(sample_pr_details, 5), tmp_path)
+    assert collector.load_pr_from_file(5, tmp_path)["basic_info"]["number"] == 5
+    assert not list(tmp_path.glob("*.json"))
+    store = create_pr_store(config_fixture, tmp_path)
+    assert isinstance(store, SQLitePRStore)
+    store.close()
+    collector.close_stores()
+
+    generator = LabelReportGenerator(config_fixture)
+    assert generator.generate_reports(tmp_path, tmp_path / "reports")
+    assert "[PR #5]" in (tmp_path / "reports" / "bug.md").read_text(encoding="utf-8")
+    # レポートの生成後はデータベースが閉じられ、WALのファイルが残らない
+    assert not list(tmp_path.glob("prs.sqlite3-*"))
+
+
+def test_file_store_skips_unchanged_writes(tmp_path, sample_pr_details):
+    """内容が同じ保存は書き込まず、変わったファイルだけを一時ファイル経由で書き込んで報告するテスト"""
+    store = FilePerPRStore(tmp_path)
+    store.save(_pr(sample_pr_details, 1))
+    store.save(_pr(sample_pr_details, 2))
+    assert store.changed_paths(store.pop_changes()) == [tmp_path / "1.json", tmp_path / "2.json"]
+    store.close()
+    mtime_ns = (tmp_path / "1.json").stat().st_mtime_ns
+
+    store = FilePerPRStore(tmp_path)
+    store.save(_pr(sample_pr_details, 1))
+    store.save(_pr(sample_pr_details, 2, state="closed"))
+    assert store.pop_changes() == [2]
+    assert (tmp_path / "1.json").stat().st_mtime_ns == mtime_ns
+    assert store.load(2)["state"] == "closed"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_file_store_compares_content_without_digest_index(tmp_path, sample_pr_details):
+    """ダイジェストの記録がない場合（checkout 直後など）もファイルの内容を比べて書き込みを省くテスト"""
+    FilePerPRStore(tmp_path).save(_pr(sample_pr_details, 1))
+    assert not (tmp_path / ".pr_digests").exists()
+
+    store = FilePerPRStore(tmp_path)
+    store.save(_pr(sample_pr_details, 1))
+    assert store.pop_changes() == []
+    store.save(_pr(sample_pr_details, 1, labels=("docs",)))
+    assert store.pop_changes() == [1]
+
+
+def test_sqlite_store_skips_unchanged_writes(tmp_path, sample_pr_details):
+    """SQLiteでも内容が同じ保存は書き込まず、変わった場合はデータベースのファイルを報告するテスト"""
+    store = SQLitePRStore(tmp_path / "prs.sqlite3")
+    store.save(_pr(sample_pr_details, 1))
+    store.pop_changes()
+
+    store.save(_pr(sample_pr_details, 1))
+    assert store.changed_paths(store.pop_changes()) == []
+    store.save(_pr(sample_pr_details, 1, state="closed"))
+    assert store.changed_paths(store.pop_changes()) == [tmp_path / "prs.sqlite3"]
+
+
+def test_sqlite_store_flush_checkpoints_wal(tmp_path, sample_pr_details):
+    """flush でWALの内容がデータベースのファイルに書き戻され、close で閉じた後も読み込めるテスト"""
+    path = tmp_path / "prs.sqlite3"
+    wal_path = tmp_path / "prs.sqlite3-wal"
+    store = SQLitePRStore(path)
+    store.save(_pr(sample_pr_details, 1))
+    assert wal_path.stat().st_size > 0
+
+    store.flush()
+    assert wal_path.stat().st_size == 0
+    store.close()
+
+    reopened = SQLitePRStore(path)
+    assert reopened.numbers() == [1]
+    reopened.close()
+
+
+def test_collector_closes_stores(tmp_path, sample_pr_details, config_fixture):
+    """close_stores で開いた保存先が閉じられ、次の get_store では開き直されるテスト"""
+    config_fixture["data"]["storage_type"] = "sqlite"
+    collector = PRCollector(config_fixture)
+    store = collector.get_store(tmp_path)
+    store.save(_pr(sample_pr_details, 1))
+
+    collector.close_stores()
+    assert collector.get_store(tmp_path) is not store
+    assert collector.get_store(tmp_path).numbers() == [1]
+    collector.close_stores()
+
+
+def test_file_store_interns_repeated_objects(tmp_path, sample_pr_details):
+    """繰り返し現れるユーザーとラベルを1つずつ保存し、読み込むと元のPRデータに戻るテスト"""
+    store = FilePerPRStore(tmp_path, intern=True)
+    originals = [_pr(sample_pr_details, number) for number in (1, 2)]
+    for pr_data in originals:
+        store.save(pr_data)
+
+    stored = json.loads(store.path_for(1).read_text(encoding="utf-8"))
+    assert list(stored["basic_info"]["user"]) == ["$ref"]
+    assert list(stored["comments"][0]["user"]) == ["$ref"]
+    interned_files = sorted(path.relative_to(tmp_path).as_posix() for path in (tmp_path / "_interned").rglob("*.json"))
+    # 内容の違うユーザー3種類（基本情報・コメント・コミット）と、基本情報とサブリソースのラベル2種類
+    assert [name.split("/")[1] for name in interned_files] == ["labels", "labels", "users", "users", "users"]
+    assert store.changed_paths(store.pop_changes()) == [store.path_for(1), store.path_for(2)] + [
+        tmp_path / name for name in interned_files
+    ]
+
+    # intern の設定に関係なく参照を戻して読み込み、同じオブジェクトは共有する
+    reader = FilePerPRStore(tmp_path)
+    loaded = [reader.load(1), reader.load(2)]
+    assert loaded == originals
+    assert loaded[0]["labels"][0] is loaded[1]["labels"][0]
+    assert reader.label_numbers("bug") == [1, 2]
+
+    # 内容が同じ保存は書き込まず、新しいオブジェクトもない
+    store.save(_pr(sample_pr_details, 1))
+    assert store.changed_paths(store.pop_changes()) == []
+
+
+def test_sqlite_store_interns_repeated_objects(tmp_path, sample_pr_details):
+    """SQLiteでも重複を interned テーブルに分けて保存し、インデックスと読み込みが変わらないテスト"""
+    store = SQLitePRStore(tmp_path / "prs.sqlite3", intern=True)
+    pr_data = _pr(sample_pr_details, 1)
+    store.save(pr_data)
+
+    assert store.load(1) == pr_data
+    assert store.label_numbers("bug") == [1]
+    assert next(store.iter_prs(include=("labels",)))["labels"] == pr_data["labels"]
+    assert store._query("SELECT COUNT(*) FROM interned")[0][0] == 5
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+レート制限スケジューラーのテスト
+"""
+
+import pytest
+
+from src.utils.rate_limiter import RateLimitScheduler
+
+
+class FakeClock:
+    """sleepすると進む疑似時計"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """疑似時計を提供する"""
+    return FakeClock()
+
+
+def _scheduler(clock, **kwargs):
+    """疑似時計を使うスケジューラーを作成する"""
+    return RateLimitScheduler(clock=clock.time, sleep=clock.sleep, **kwargs)
+
+
+def test_no_wait_without_rate_limit_headers(clock):
+    """予算が不明な間は待機しないテスト"""
+    scheduler = _scheduler(clock)
+    
+    for _ in range(10):
+        assert scheduler.acquire() == 0
+    assert clock.sleeps == []
+
+
+def test_no_wait_with_plenty_of_budget(clock):
+    """予算が十分ならバースト分は待機せずに送れるテスト"""
+    scheduler = _scheduler(clock, reserve=100, burst=50)
+    scheduler.update_from_headers({"X-RateLimit-Remaining": "4900", "X-RateLimit-Reset": str(int(clock.now) + 3600)})
+    
+    for _ in range(50):
+        scheduler.acquire()
+    
+    assert clock.sleeps == []
+
+
+def test_paces_to_last_until_reset(clock):
+    """バーストを使い切ると残り予算がリセットまでもつ間隔で待機するテスト"""
+    scheduler = _scheduler(clock, reserve=0, burst=1)
+    scheduler.update_from_headers({"X-RateLimit-Remaining": "11", "X-RateLimit-Reset": str(int(clock.now) + 100)})
+    
+    scheduler.acquire()
+    waited = scheduler.acquire()
+    
+    assert waited == pytest.approx(10.0, rel=0.1)
+    assert scheduler.get_stats()["wait_count"] == 1
+
+
+def test_waits_for_reset_when_exhausted(clock):
+    """残り予算が reserve 以下ならリセット時刻まで待機するテスト"""
+    scheduler = _scheduler(clock, reserve=100)
+    reset = int(clock.now) + 60
+    scheduler.update_from_headers({"X-RateLimit-Remaining": "50", "X-RateLimit-Reset": str(reset)})
+    
+    scheduler.acquire()
+    
+    assert clock.now >= reset
+
+
+def test_retry_after_pauses_all_requests(clock):
+    """Retry-After を受け取ると指定秒数だけ待機するテスト"""
+    scheduler = _scheduler(clock)
+    scheduler.update_from_headers({"Retry-After": "30"})
+    
+    waited = scheduler.acquire()
+    
+    assert waited == pytest.approx(30.0)
+
+
+def test_resources_are_tracked_separately(clock):
+    """core と graphql の予算が別々に管理されるテスト"""
+    scheduler = _scheduler(clock, reserve=100)
+    scheduler.update_from_headers({
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(int(clock.now) + 600),
+        "X-RateLimit-Resource": "graphql",
+    })
+    
+    assert scheduler.acquire("core") == 0
+    assert scheduler.get_stats()["resources"]["graphql"]["remaining"] == 0
+
+
+def test_fair_share_between_tenants(clock):
+    """トークンを待っているテナントの間では、取得数の少ないテナントから順に割り当てるテスト"""
+    scheduler = _scheduler(clock, reserve=0, burst=1)
+    scheduler.update("core", remaining=100, reset=clock.now + 100)
+    scheduler.acquire("core", tenant="a")
+
+    # a のほかの2スレッドがトークンを待っている状態を作る
+    with scheduler._lock:
+        scheduler._start_waiting((None, "core"), "a")
+        scheduler._start_waiting((None, "core"), "a")
+
+    # b は待ち始めた時点で a と同じ取得数から数え、a より多くは取得できない
+    scheduler.acquire("core", tenant="b")
+    with pytest.raises(RuntimeError):
+        _acquire_with_limit(scheduler, "b", max_sleeps=3)
+    scheduler.acquire("core", tenant="a")
+    scheduler.acquire("core", tenant="b")
+
+    assert scheduler.get_stats()["tenants"] == {"a": 2, "b": 3}
+    # テナントを指定しない場合は順番を待たない
+    assert scheduler.acquire("core") >= 0
+
+
+def _acquire_with_limit(scheduler, tenant, max_sleeps):
+    """指定回数より多く待機した場合に RuntimeError を送出して acquire() を呼ぶ"""
+    original_sleep = scheduler._sleep
+    count = [0]
+
+    def limited_sleep(seconds):
+        count[0] += 1
+        if count[0] > max_sleeps:
+            raise RuntimeError("待機が続いています")
+        original_sleep(seconds)
+
+    scheduler._sleep = limited_sleep
+    try:
+        return scheduler.acquire("core", tenant=tenant)
+    finally:
+        scheduler._sleep = original_sleep
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+収集対象リポジトリ管理のテスト
+"""
+
+import json
+
+import pytest
+
+from src.analyzers.section_analyzer import SectionAnalyzer
+from src.collectors.repositories import load_repository_prs, parse_repository, repository_configs
+from src.generators.label_report import LabelReportGenerator
+
+
+def _write_pr(directory, number, title, labels=()):
+    """PRデータをファイルに書き込む"""
+    directory.mkdir(parents=True, exist_ok=True)
+    pr_data = {
+        "basic_info": {"number": number, "title": title, "html_url": f"https://example.com/{title}/{number}"},
+        "state": "open",
+        "labels": [{"name": label} for label in labels],
+        "files": [{"filename": "README.md", "patch": "@@ -1 +1 @@\n+## 目的\n"}],
+    }
+    with open(directory / f"{number}.json", "w", encoding="utf-8") as f:
+        json.dump(pr_data, f)
+
+
+def test_parse_repository():
+    """owner/name 形式以外はエラーになるテスト"""
+    assert parse_repository("team-mirai/policy") == ("team-mirai", "policy")
+    with pytest.raises(ValueError):
+        parse_repository("policy")
+
+
+def test_repository_configs(config_fixture, tmp_path):
+    """リポジトリごとの出力先を持つ設定を作り、指定がなければ元の設定の1リポジトリだけにするテスト"""
+    single = repository_configs(config_fixture, base_dir=tmp_path)
+    assert len(single) == 1
+    assert single[0]["github"]["repo_name"] == "test-repo"
+    assert single[0]["data"]["base_dir"] == str(tmp_path)
+
+    config_fixture["repositories"] = [
+        {"repo": "o/a"}, "o/b", {"repo": "o/a"}, {"repo": "p/c", "base_dir": "c-prs", "reports_dir": "c-reports"},
+    ]
+    configs = repository_configs(config_fixture, base_dir=tmp_path)
+
+    assert [(c["github"]["repo_owner"], c["github"]["repo_name"]) for c in configs] == [("o", "a"), ("o", "b"), ("p", "c")]
+    assert configs[0]["data"]["base_dir"] == str(tmp_path / "o" / "a")
+    assert configs[0]["data"]["reports_dir"] == "reports/o/a"
+    assert (configs[2]["data"]["base_dir"], configs[2]["data"]["reports_dir"]) == ("c-prs", "c-reports")
+    assert "repositories" not in configs[0]
+    assert config_fixture["github"]["repo_name"] == "test-repo"
+
+    # コマンドラインで指定したリポジトリは設定ファイルの repositories より優先する
+    assert [c["github"]["repo_name"] for c in repository_configs(config_fixture, ["x/y"], tmp_path)] == ["y"]
+
+
+def test_cross_repository_reports(config_fixture, tmp_path):
+    """すべてのリポジトリをまとめたレポートでは同じ番号のPRをリポジトリ名で区別するテスト"""
+    config_fixture["repositories"] = ["o/a", "o/b"]
+    configs = repository_configs(config_fixture, base_dir=tmp_path)
+    _write_pr(tmp_path / "o" / "a", 1, "first", ["bug"])
+    _write_pr(tmp_path / "o" / "b", 1, "second", ["bug"])
+
+    generator = LabelReportGenerator(config_fixture)
+    all_prs = load_repository_prs(configs, generator.load_pr_data_from_directory)
+    assert generator.generate_reports(all_prs, tmp_path / "reports")
+
+    report = (tmp_path / "reports" / "bug.md").read_text(encoding="utf-8")
+    assert "[o/a#1](https://example.com/first/1) first" in report
+    assert "[o/b#1](https://example.com/second/1) second" in report
+
+    results = SectionAnalyzer(config_fixture).analyze_prs(all_prs)
+    assert [(pr["repository"], pr["number"]) for pr in results["目的"]] == [("o/a", 1), ("o/b", 1)]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+再試行ポリシーとサーキットブレーカーのテスト
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from src.utils.github_api import configure_rate_limiter, configure_retry_policy, make_github_api_request
+from src.utils.rate_limiter import RateLimitScheduler
+from src.utils.retry_policy import (
+    CLIENT_ERROR,
+    FORBIDDEN,
+    NETWORK_ERROR,
+    PRIMARY_RATE_LIMIT,
+    SECONDARY_RATE_LIMIT,
+    SERVER_ERROR,
+    CircuitBreaker,
+    RetryPolicy,
+    classify_response,
+)
+
+
+class FakeClock:
+    """sleepすると進む疑似時計"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(status_code, headers=None, text=""):
+    """ダミーのレスポンスを作成する"""
+    response = MagicMock(status_code=status_code, headers=headers or {}, text=text, content=text.encode("utf-8"))
+    response.json.return_value = {"ok": True}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+    return response
+
+
+def test_classify_response():
+    """403と429の種類を見分けるテスト"""
+    assert classify_response(200) is None
+    assert classify_response(403, {"Retry-After": "30"}) == SECONDARY_RATE_LIMIT
+    assert classify_response(403, {}, '{"message": "You have exceeded a secondary rate limit."}') == SECONDARY_RATE_LIMIT
+    assert classify_response(429, {}) == SECONDARY_RATE_LIMIT
+    assert classify_response(403, {"X-RateLimit-Remaining": "0"}) == PRIMARY_RATE_LIMIT
+    assert classify_response(403, {"X-RateLimit-Remaining": "4000"}, "Resource not accessible") == FORBIDDEN
+    assert classify_response(404) == CLIENT_ERROR
+    assert classify_response(502) == SERVER_ERROR
+
+
+def test_retry_delay():
+    """失敗の種類に応じた待機時間と、諦める条件のテスト"""
+    clock = FakeClock()
+    policy = RetryPolicy(max_retries=3, max_elapsed=120, clock=clock.time, jitter=lambda: 0.5)
+
+    assert policy.retry_delay(SECONDARY_RATE_LIMIT, 1, 0, {"Retry-After": "30"}) == 30
+    assert policy.retry_delay(SECONDARY_RATE_LIMIT, 1, 0, {}) == 60
+    assert policy.retry_delay(PRIMARY_RATE_LIMIT, 1, 0, {"X-RateLimit-Reset": "1010"}) == 11
+    assert policy.retry_delay(SERVER_ERROR, 3, 0) == 2.0
+    assert policy.retry_delay(NETWORK_ERROR, 4, 0) is None
+    assert policy.retry_delay(FORBIDDEN, 1, 0) is None
+    # Retry-After を待つと max_elapsed を超える場合は諦める
+    assert policy.retry_delay(SECONDARY_RATE_LIMIT, 1, 100, {"Retry-After": "30"}) is None
+    assert RetryPolicy(wait_for_reset=False).retry_delay(PRIMARY_RATE_LIMIT, 1, 0, {}) is None
+
+
+def test_circuit_breaker():
+    """連続した失敗で開き、開くたびに止める時間が伸び、成功で元に戻るテスト"""
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10, max_cooldown=30)
+    assert breaker.record_failure() == 0
+    assert breaker.record_failure() == 10
+    assert breaker.record_failure() == 0
+    assert breaker.record_failure() == 20
+    breaker.record_failure()
+    assert breaker.record_failure() == 30
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.record_failure() == 10
+    assert breaker.get_stats()["trips"] == 4
+
+
+@patch("src.utils.github_api.get_session_pool")
+def test_secondary_rate_limit_is_retried(mock_get_session_pool):
+    """Retry-After 付きの403は待ってから送り直し、権限エラーの403は送り直さないテスト"""
+    clock = FakeClock()
+    configure_rate_limiter(RateLimitScheduler(clock=clock.time, sleep=clock.sleep))
+    configure_retry_policy(RetryPolicy(clock=clock.time, sleep=clock.sleep))
+    mock_request = mock_get_session_pool.return_value.request
+    mock_request.side_effect = [_response(403, {"Retry-After": "5"}), _response(200)]
+
+    assert make_github_api_request("https://api.github.com/repos/o/r/pulls/1") == {"ok": True}
+    assert mock_request.call_count == 2
+    assert clock.sleeps == [5.0]
+
+    mock_request.reset_mock()
+    mock_request.side_effect = [_response(403, {"X-RateLimit-Remaining": "4000"}, "Forbidden")]
+    with pytest.raises(requests.exceptions.HTTPError):
+        make_github_api_request("https://api.github.com/repos/o/r/pulls/1")
+    assert mock_request.call_count == 1
+
+
+@patch("src.utils.github_api.get_session_pool")
+def test_circuit_breaker_pauses_all_requests(mock_get_session_pool):
+    """サーバーエラーが続くとレート制限スケジューラーで全リクエストを止めるテスト"""
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(clock=clock.time, sleep=clock.sleep)
+    configure_rate_limiter(scheduler)
+    configure_retry_policy(RetryPolicy(
+        max_retries=2, breaker=CircuitBreaker(failure_threshold=3, cooldown=120), clock=clock.time,
+        sleep=clock.sleep, jitter=lambda: 0.0,
+    ))
+    mock_request = mock_get_session_pool.return_value.request
+    mock_request.side_effect = [_response(502) for _ in range(3)] + [_response(200)]
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        make_github_api_request("https://api.github.com/repos/o/r/pulls/1")
+    assert mock_request.call_count == 3
+
+    # ブレーカーが開いたため、次のリクエストは120秒待ってから送られる
+    assert make_github_api_request("https://api.github.com/repos/o/r/pulls/2") == {"ok": True}
+    assert scheduler.get_stats()["total_wait_seconds"] == pytest.approx(120)
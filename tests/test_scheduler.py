@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+収集スケジューラーのテスト
+"""
+
+import datetime
+
+import pytest
+
+from src.collectors.crawl_journal import CrawlJournal
+from src.collectors.pipeline import CollectionPipeline
+from src.collectors.scheduler import CollectionBudget, pr_priority
+
+
+NOW = datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingCollector:
+    """取得のたびに時計とリクエスト数を進めるコレクター"""
+
+    max_workers = 1
+    pipeline_batch_size = 1
+
+    def __init__(self, clock, seconds_per_pr=10, requests_per_pr=6):
+        self.clock = clock
+        self.seconds_per_pr = seconds_per_pr
+        self.requests_per_pr = requests_per_pr
+        self.requests = 0
+        self.fetched = []
+
+    def fetch_prs(self, prs, executor=None, output_dir=None):
+        self.fetched.extend(pr["number"] for pr in prs)
+        self.clock.now += self.seconds_per_pr * len(prs)
+        self.requests += self.requests_per_pr * len(prs)
+        return [{"basic_info": {"number": pr["number"]}, "updated_at": pr.get("updated_at")} for pr in prs]
+
+    def save_pr_to_file(self, pr_details, output_dir=None):
+        return True
+
+
+def _pr(number, state="closed", days_ago=30):
+    """一覧のPRを作成する"""
+    updated = datetime.datetime.fromtimestamp(NOW - days_ago * 86400, datetime.timezone.utc)
+    return {"number": number, "state": state, "updated_at": updated.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+
+def test_pr_priority_order():
+    """オープン・最近更新・データの欠けたPR・その他の順に並ぶテスト"""
+    stored = {3: None, 4: {"labels": [], "comments": [], "review_comments": [], "commits": [], "files": []}}
+    prs = [_pr(4, days_ago=3), _pr(3, days_ago=5), _pr(2, days_ago=0.5), _pr(1, "open", days_ago=60), _pr(5, "open")]
+
+    ranked = sorted(prs, key=lambda pr: pr_priority(pr, now=NOW, load_stored=stored.get))
+
+    assert [pr["number"] for pr in ranked] == [5, 1, 2, 3, 4]
+
+
+def test_budget_stops_before_deadline():
+    """実績から見込んだ所要時間が期限を超える取得は始めないテスト"""
+    clock = FakeClock()
+    budget = CollectionBudget(deadline=35, clock=clock)
+
+    assert budget.can_start()
+    clock.now = 10
+    budget.finish(1, 10)
+    assert budget.can_start(2)
+    clock.now = 30
+    budget.finish(2, 20)
+    assert not budget.can_start()
+    assert budget.exhausted_reason == "deadline"
+    assert not budget.can_start()
+
+
+def test_budget_requires_request_counter():
+    """リクエスト数の上限にはリクエスト数を数える関数が必要なテスト"""
+    with pytest.raises(ValueError):
+        CollectionBudget(max_requests=100)
+
+
+def test_pipeline_prioritizes_and_defers(tmp_path):
+    """優先順位の高いPRから取得し、リクエスト数の予算に達したPRをジャーナルに持ち越すテスト"""
+    clock = FakeClock()
+    collector = CountingCollector(clock)
+    budget = CollectionBudget(max_requests=20, request_counter=lambda: collector.requests, clock=clock)
+    journal = CrawlJournal.start(CrawlJournal.path_for(tmp_path))
+    prs = [_pr(1), _pr(2, "open"), _pr(3, days_ago=0.1), _pr(4), _pr(5, "open", days_ago=1)]
+    journal.add_pending(prs)
+
+    pipeline = CollectionPipeline(
+        collector, budget=budget, priority=lambda pr: pr_priority(pr, now=NOW),
+        on_saved=lambda pr_details: journal.mark_completed(pr_details["basic_info"]["number"]),
+    )
+    results = pipeline.run([prs])
+    journal.settle(deferred=[pr["number"] for pr in pipeline.deferred])
+
+    assert collector.fetched == [5, 2, 3]
+    assert [pr["basic_info"]["number"] for pr in results] == [2, 3, 5]
+    assert sorted(pr["number"] for pr in pipeline.deferred) == [1, 4]
+    assert budget.exhausted_reason == "request_budget"
+    summary = journal.get_summary()
+    assert (summary["completed"], summary["pending"], summary["failed"]) == (3, 2, 0)
+    assert [pr["number"] for pr in journal.resume_prs()] == [4, 1]
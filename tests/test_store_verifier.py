@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+PRデータ検証のテスト
+"""
+
+import json
+
+from src.collectors.pr_collector import PRCollector, SubResourceError
+from src.collectors.store_verifier import StoreVerifier, inspect_pr_data
+
+
+class FakeCollector(PRCollector):
+    """一覧と詳細をAPIを使わずに返すコレクター"""
+
+    def __init__(self, config, listed, failing=()):
+        super().__init__(config)
+        self.listed = listed
+        self.failing = set(failing)
+        self.fetched = []
+
+    def iter_pull_request_pages(self, limit=None, sort_by="updated", direction="desc", last_updated_at=None,
+                                state="all", start_page=1):
+        for start in range(0, len(self.listed), 100):
+            yield [{"number": number} for number in self.listed[start:start + 100]]
+
+    def get_pr_details(self, pr_number, executor=None, **kwargs):
+        self.fetched.append(pr_number)
+        if pr_number in self.failing:
+            raise SubResourceError(pr_number, {"files": RuntimeError("502")}, {})
+        return _pr_data(pr_number, comments=1)
+
+
+def _pr_data(number, comments=0):
+    """保存されるPRデータを作成する"""
+    return {
+        "basic_info": {"number": number, "comments": comments, "review_comments": 0, "commits": 1,
+                       "changed_files": 1, "labels": []},
+        "labels": [],
+        "comments": [{"id": i} for i in range(comments)],
+        "review_comments": [],
+        "commits": [{"sha": "abc"}],
+        "files": [{"filename": "README.md"}],
+    }
+
+
+def _write(directory, number, data):
+    """PRデータをファイルに書き込む"""
+    with open(directory / f"{number}.json", "w", encoding="utf-8") as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+
+
+def test_inspect_pr_data():
+    """基本情報の件数が0でないのに空になっているサブリソースを見つけるテスト"""
+    assert inspect_pr_data(_pr_data(1, comments=2)) == []
+
+    pr_data = _pr_data(1, comments=2)
+    pr_data["comments"] = []
+    pr_data["files"] = []
+    del pr_data["commits"]
+    assert inspect_pr_data(pr_data) == ["commits", "comments", "files"]
+
+    pr_data = _pr_data(1)
+    pr_data["basic_info"]["labels"] = [{"name": "bug"}]
+    assert inspect_pr_data(pr_data) == ["labels"]
+
+
+def test_verify_and_backfill(tmp_path, config_fixture):
+    """欠けている・壊れている・不完全なPRだけを取得し直すテスト"""
+    for number in range(1, 8):
+        _write(tmp_path, number, _pr_data(number))
+    _write(tmp_path, 2, "{\"basic_info\": ")
+    incomplete = _pr_data(3, comments=4)
+    incomplete["comments"] = []
+    _write(tmp_path, 3, incomplete)
+    _write(tmp_path, 5, _pr_data(6))
+    (tmp_path / "6.json").unlink()
+    (tmp_path / "run_metrics.json").write_text("{}", encoding="utf-8")
+
+    collector = FakeCollector(config_fixture, listed=[1, 2, 3, 4, 5, 6, 7, 9], failing=[9])
+    verifier = StoreVerifier(collector, tmp_path, workers=2)
+    report = verifier.verify()
+
+    assert report["scanned"] == 6
+    assert report["missing"] == [6, 9]
+    assert sorted(report["unreadable"]) == [2, 5]
+    assert report["incomplete"] == {3: ["comments"]}
+    assert report["to_backfill"] == [2, 3, 5, 6, 9]
+
+    result = verifier.backfill(report["to_backfill"])
+
+    assert sorted(collector.fetched) == [2, 3, 5, 6, 9]
+    assert result == {"repaired": [2, 3, 5, 6], "failed": [9]}
+    assert not (tmp_path / "9.json").exists()
+    after = verifier.verify()
+    assert after["to_backfill"] == [9]
+
+
+def test_scan_in_parallel(tmp_path, config_fixture):
+    """ファイルが多い場合は別プロセスで検査しても同じ結果になるテスト"""
+    for number in range(1, 201):
+        _write(tmp_path, number, _pr_data(number))
+    _write(tmp_path, 150, "not json")
+
+    verifier = StoreVerifier(FakeCollector(config_fixture, listed=[]), tmp_path, workers=2)
+    report = verifier.verify(online=False)
+
+    assert report["scanned"] == 200
+    assert list(report["unreadable"]) == [150]
+    assert report["missing"] == []
+    assert report["to_backfill"] == [150]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+トークンプールのテスト
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.github_api import CredentialProvider, configure_rate_limiter, make_github_api_request
+from src.utils.rate_limiter import RateLimitScheduler
+from src.utils.token_pool import NoAvailableTokenError, TokenPool
+
+
+def test_acquire_prefers_most_headroom():
+    """残り予算の最も多いトークンが選ばれるテスト"""
+    pool = TokenPool(["a", "b"])
+    pool.update("a", remaining=10, reset=9999999999)
+    pool.update("b", remaining=4000, reset=9999999999)
+    
+    assert pool.acquire() == "b"
+
+
+def test_acquire_spreads_across_unknown_tokens():
+    """予算が不明なトークン同士では交互に使われるテスト"""
+    pool = TokenPool(["a", "b"])
+    for token in ("a", "b"):
+        pool.update(token, remaining=100, reset=9999999999)
+    
+    used = Counter(pool.acquire() for _ in range(10))
+    
+    assert used == {"a": 5, "b": 5}
+
+
+def test_quarantine_on_auth_errors():
+    """401とトークン自体の問題による403は隔離され、レート制限やリソースの権限による403は隔離されないテスト"""
+    pool = TokenPool(["a", "b"])
+    
+    assert pool.record_response("a", 401, {}) is True
+    assert pool.record_response("b", 403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1"}) is False
+    assert pool.record_response("b", 403, {}, body='{"message": "Must have admin rights to Repository."}') is False
+    assert pool.record_response("b", 403, {}) is False
+    assert pool.acquire() == "b"
+    
+    saml_body = '{"message": "Resource protected by organization SAML enforcement. You must grant your Personal Access token access to this organization."}'
+    assert pool.record_response("b", 403, {}, body=saml_body) is True
+    with pytest.raises(NoAvailableTokenError):
+        pool.acquire()
+
+
+class _BudgetHandler(BaseHTTPRequestHandler):
+    """トークンごとの予算をヘッダーで返すローカルのダミーAPI"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    budgets = {}
+    used = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        token = self.headers.get("Authorization", "").replace("token ", "")
+        with self.lock:
+            self.used[token] += 1
+            if token not in self.budgets:
+                status, remaining = 401, 0
+            else:
+                self.budgets[token] -= 1
+                status, remaining = 200, self.budgets[token]
+        
+        body = json.dumps({"token": token}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_pool_routes_requests_with_fake_api(config_fixture):
+    """ローカルのダミーAPIで予算に応じた振り分けと無効トークンの隔離を確認するテスト"""
+    _BudgetHandler.budgets = {"big": 250, "small": 150}
+    _BudgetHandler.used = Counter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BudgetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/repos/o/r/pulls/1"
+    
+    configure_rate_limiter(RateLimitScheduler(reserve=0, burst=1000))
+    credentials = CredentialProvider(config_fixture, tokens=["revoked", "big", "small"])
+    try:
+        results = [make_github_api_request(url, credentials=credentials) for _ in range(200)]
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    assert all(result["token"] in ("big", "small") for result in results)
+    assert _BudgetHandler.used["revoked"] == 1
+    assert _BudgetHandler.used["big"] > _BudgetHandler.used["small"]
+    assert _BudgetHandler.budgets["big"] == pytest.approx(_BudgetHandler.budgets["small"], abs=2)
+    stats = {entry["quarantine_reason"] for entry in credentials.get_token_pool().get_stats()}
+    assert "401 Unauthorized" in stats
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Webhook受信のテスト
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from src.collectors.pr_collector import PRCollector
+from src.collectors.webhook_server import (
+    DebouncedQueue,
+    WebhookIngestor,
+    compute_signature,
+    create_webhook_server,
+    verify_signature,
+)
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _comment_payload(pr_number, comment_id, body, action="created"):
+    """issue_comment イベントのペイロードを作成する"""
+    return {
+        "action": action,
+        "issue": {"number": pr_number, "pull_request": {}, "updated_at": f"2023-01-03T00:00:0{comment_id}Z"},
+        "comment": {"id": comment_id, "body": body},
+    }
+
+
+def _store_pr(collector, output_dir, sample_pr_details):
+    """保存済みのPRデータを用意する"""
+    sample_pr_details["basic_info"].update({"comments": 1, "review_comments": 0, "commits": 1, "changed_files": 1})
+    collector.save_pr_to_file(sample_pr_details, output_dir)
+
+
+def test_verify_signature():
+    """正しいシークレットで計算した署名だけを受け付けるテスト"""
+    body = b'{"action": "opened"}'
+    signature = compute_signature("secret", body)
+    assert verify_signature("secret", body, signature)
+    assert not verify_signature("other", body, signature)
+    assert not verify_signature("secret", body + b" ", signature)
+    assert not verify_signature("secret", body, None)
+
+
+def test_debounced_queue_coalesces_bursts():
+    """同じキーの連続した項目がまとめて渡され、max_delay を超えては待たないテスト"""
+    clock = FakeClock()
+    batches = []
+    queue = DebouncedQueue(batches.append, delay=2, max_delay=5, clock=clock)
+
+    queue.put(1, "a")
+    clock.now = 1.5
+    queue.put(1, "b")
+    queue.put(2, "c")
+    clock.now = 3.0
+    assert queue.flush() == 0
+
+    clock.now = 3.5
+    queue.put(1, "d")
+    clock.now = 5.0
+    assert queue.flush() == 2
+    assert batches == [[(1, ["a", "b", "d"]), (2, ["c"])]]
+
+
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+@patch("src.collectors.pr_collector.make_github_api_request")
+def test_comment_events_applied_without_api(mock_api_request, mock_all_items, config_fixture, sample_pr_details,
+                                            temp_data_dir, tmp_path):
+    """コメントのイベントはAPIを呼ばずに反映され、影響のあったラベルのレポートだけが生成されるテスト"""
+    collector = PRCollector(config_fixture)
+    _store_pr(collector, temp_data_dir, sample_pr_details)
+    reports_dir = tmp_path / "reports"
+    ingestor = WebhookIngestor(collector, temp_data_dir, reports_dir, clock=FakeClock())
+
+    existing_id = sample_pr_details["comments"][0]["id"]
+    assert ingestor.handle_event("issue_comment", _comment_payload(1, 7, "追加")) == [1]
+    deleted = _comment_payload(1, 8, "", action="deleted")
+    deleted["comment"]["id"] = existing_id
+    ingestor.handle_event("issue_comment", deleted)
+    ingestor.handle_event("issue_comment", {"action": "created", "issue": {"number": 2}, "comment": {"id": 1}})
+    ingestor.queue.flush(force=True)
+
+    stored = collector.load_pr_from_file(1, temp_data_dir)
+    assert [comment["id"] for comment in stored["comments"]] == [7]
+    assert stored["basic_info"]["comments"] == 1
+    assert mock_api_request.call_count == 0
+    assert mock_all_items.call_count == 0
+    assert ingestor.stats == {"received": 3, "ignored": 1, "applied": 1, "fetched": 0}
+    assert sorted(path.name for path in reports_dir.glob("*.md")) == ["index.md", "test-label.md"]
+
+
+@patch("src.collectors.pr_collector.get_all_github_api_items")
+def test_pull_request_event_refetches_changed(mock_all_items, config_fixture, sample_pr_details, temp_data_dir):
+    """pull_request イベントでheadが変わった場合はコミットとファイルだけを取得し直すテスト"""
+    collector = PRCollector(config_fixture)
+    _store_pr(collector, temp_data_dir, sample_pr_details)
+    mock_all_items.return_value = [{"sha": "new"}]
+    ingestor = WebhookIngestor(collector, temp_data_dir, clock=FakeClock())
+
+    pull_request = dict(sample_pr_details["basic_info"], head={"sha": "new"}, labels=[], updated_at="2023-01-05T00:00:00Z")
+    ingestor.handle_event("pull_request", {"action": "synchronize", "pull_request": pull_request})
+    ingestor.queue.flush(force=True)
+
+    stored = collector.load_pr_from_file(1, temp_data_dir)
+    assert stored["updated_at"] == "2023-01-05T00:00:00Z"
+    assert stored["labels"] == []
+    assert stored["commits"] == [{"sha": "new"}]
+    assert [call.args[0].rsplit("/", 1)[1] for call in mock_all_items.call_args_list] == ["commits", "files"]
+
+
+def test_stale_events_do_not_overwrite_newer_data(sample_pr_details):
+    """保存済みより古い pull_request イベントやコメントの更新日時では、新しいデータを上書きしないテスト"""
+    sample_pr_details["basic_info"]["updated_at"] = "2023-01-05T00:00:00Z"
+    sample_pr_details["comments"] = [{"id": 7, "body": "新しい本文", "updated_at": "2023-01-05T00:00:00Z"}]
+
+    stale_pull_request = dict(sample_pr_details["basic_info"], title="古いタイトル", updated_at="2023-01-04T00:00:00Z")
+    assert WebhookIngestor.apply_event(sample_pr_details, "pull_request", {"pull_request": stale_pull_request}) is False
+    assert sample_pr_details["basic_info"]["title"] != "古いタイトル"
+
+    payload = _comment_payload(1, 7, "古い本文", action="edited")
+    payload["comment"]["updated_at"] = "2023-01-04T00:00:00Z"
+    WebhookIngestor.apply_event(sample_pr_details, "issue_comment", payload)
+    assert sample_pr_details["comments"][0]["body"] == "新しい本文"
+    assert sample_pr_details["basic_info"]["updated_at"] == "2023-01-05T00:00:00Z"
+
+
+def test_label_event_updates_labelled_prs(config_fixture, sample_pr_details, temp_data_dir):
+    """ラベル名の変更が、そのラベルの付いた保存済みのPRに反映されるテスト"""
+    collector = PRCollector(config_fixture)
+    sample_pr_details["labels"] = [{"name": "old-name"}]
+    _store_pr(collector, temp_data_dir, sample_pr_details)
+    ingestor = WebhookIngestor(collector, temp_data_dir, clock=FakeClock())
+
+    payload = {"action": "edited", "label": {"name": "new-name"}, "changes": {"name": {"from": "old-name"}}}
+    with patch.object(collector, "get_store", wraps=collector.get_store) as mock_get_store:
+        # ラベルの付いたPRはリクエストを受けたスレッドではなく、反映のときに探す
+        assert ingestor.handle_event("label", payload) == [("label", "old-name")]
+        assert mock_get_store.call_count == 0
+    ingestor.queue.flush(force=True)
+
+    assert collector.load_pr_from_file(1, temp_data_dir)["labels"] == [{"name": "new-name"}]
+
+
+def test_malformed_payloads_are_ignored(config_fixture, temp_data_dir):
+    """必要な項目のないペイロードは例外にならずに無視されるテスト"""
+    ingestor = WebhookIngestor(PRCollector(config_fixture), temp_data_dir, clock=FakeClock())
+
+    assert ingestor.handle_event("pull_request", {"action": "opened"}) == []
+    assert ingestor.handle_event("pull_request_review_comment", {"pull_request": None}) == []
+    assert ingestor.handle_event("issue_comment", {"issue": {"pull_request": {}}}) == []
+    assert ingestor.handle_event("label", {"action": "deleted"}) == []
+    assert ingestor.handle_event("pull_request", ["not", "an", "object"]) == []
+    assert ingestor.stats["ignored"] == 5
+    assert len(ingestor.queue) == 0
+
+
+def test_reports_use_label_index(config_fixture, sample_pr_details, temp_data_dir, tmp_path):
+    """レポートは最初の反映で作ったラベルの一覧から生成し、以降の反映では保存先全体を読み込まないテスト"""
+    collector = PRCollector(config_fixture)
+    sample_pr_details["labels"] = [{"name": "old-name"}]
+    _store_pr(collector, temp_data_dir, sample_pr_details)
+    reports_dir = tmp_path / "reports"
+    ingestor = WebhookIngestor(collector, temp_data_dir, reports_dir, clock=FakeClock())
+    store = collector.get_store(temp_data_dir)
+
+    with patch.object(store, "iter_prs", wraps=store.iter_prs) as mock_iter_prs:
+        payload = {"action": "edited", "label": {"name": "new-name"}, "changes": {"name": {"from": "old-name"}}}
+        ingestor.handle_event("label", payload)
+        ingestor.queue.flush(force=True)
+        ingestor.handle_event("issue_comment", _comment_payload(1, 7, "追加"))
+        ingestor.queue.flush(force=True)
+
+    assert mock_iter_prs.call_count == 1
+    assert "[PR #1]" in (reports_dir / "new-name.md").read_text(encoding="utf-8")
+    index = (reports_dir / "index.md").read_text(encoding="utf-8")
+    assert "new-name" in index and "old-name" not in index
+
+
+def test_webhook_server_checks_signature(config_fixture, sample_pr_details, temp_data_dir):
+    """署名の正しいリクエストだけをキューに入れるテスト"""
+    collector = PRCollector(config_fixture)
+    _store_pr(collector, temp_data_dir, sample_pr_details)
+    ingestor = WebhookIngestor(collector, temp_data_dir, clock=FakeClock())
+    server = create_webhook_server(ingestor, "secret", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(body, signature):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/", data=body, method="POST",
+            headers={"X-GitHub-Event": "issue_comment", "X-Hub-Signature-256": signature,
+                     "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    try:
+        body = json.dumps(_comment_payload(1, 9, "署名あり")).encode("utf-8")
+        assert post(body, compute_signature("wrong", body)) == 401
+        assert post(body, compute_signature("secret", body)) == 202
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(ingestor.queue) == 1
+    assert ingestor.stats["received"] == 1